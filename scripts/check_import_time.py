@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+# Cold-start budget in seconds per module, measured in a fresh interpreter.
+# The scoring entry points must come up well under a second; the numbers
+# include the pandas/NumPy import that every module pays.
+IMPORT_BUDGETS = {
+    'src': 0.1,
+    'src.logger': 0.1,
+    'src.instrumentation': 0.2,
+    'src.tree_compiler': 0.5,
+    'src.batch_scoring': 0.8,
+    'src.scoring_service': 0.8,
+    'src.data_modelling': 0.8
+}
+# Modules that must not be loaded by the import above (they are imported on use)
+FORBIDDEN_MODULES = ['sklearn', 'scipy']
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeats, cwd):
+    """
+    Best-of-`repeats` import time of a module in fresh interpreters, plus the forbidden
+    modules it pulled in.
+    """
+    best = None
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', MEASURE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+                                cwd=cwd, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of the src package against its budget.")
+    parser.add_argument('--repeats', type=int, default=3, help="Fresh interpreters per module; the fastest run counts")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply every budget, e.g. on slow CI machines")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    failures = []
+    for module, budget in IMPORT_BUDGETS.items():
+        result = measure(module, args.repeats, root)
+        over_budget = result['seconds'] > budget * args.scale
+        status = 'FAIL' if over_budget or result['loaded'] else 'ok'
+        print(f"{status:4} {module:24} {result['seconds'] * 1000:8.1f} ms (budget {budget * args.scale * 1000:.0f} ms)"
+              + (f" loaded {', '.join(result['loaded'])}" if result['loaded'] else ''))
+        if status == 'FAIL':
+            failures.append(module)
+
+    if failures:
+        print(f"Import-time check failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,188 @@
 # src/pipeline.py
+import argparse
+import hashlib
+import json
 import sys
 
 sys.path.append('../fraud_detection_system')
 
 from src.data_ingestion import DataIngestion
-from src.feature_engineering import FeatureEngineering
-from src.data_modelling import DataModelling
+from src.feature_engineering import FeatureTransformer
+from src.velocity_features import VelocityFeatures
+from src.data_modelling import DEFAULT_MODELS, DataModelling, create_model, downsample_negatives, evaluate_model, fit_model
+from src.model_evaluation import ThresholdSweep
+from src.data_store import fingerprint_file
+from src.model_registry import ModelRegistry
+from src.stage_cache import FileInput, Stage, StagePipeline, code_fingerprint
+from src.instrumentation import add_metrics_arguments, configure_metrics, report_metrics
 import os
 
-def run_pipeline(data_file, model_output_path):
-    # Step 1: Data Ingestion
-    ingestion = DataIngestion(file_path=data_file)
-    data = ingestion.load_data()
+LABEL_COLUMN = 'isFraud'
+
+
+def ingest(data_file):
+    data = DataIngestion(file_path=data_file).load_data()
 
     # Debugging: Print out the columns in the dataset
     print("Columns in the dataset:", data.columns)
+    return data
+
+
+def drop_unlabelled(data):
+    # Rows without a label cannot be used for training
+    return data.dropna(subset=[LABEL_COLUMN])
+
+
+def fit_transformer(data):
+    # Fit a transformer that freezes fill values, category vocabularies and column order,
+    # so the saved model can score any later batch or single transaction consistently
+    return FeatureTransformer().fit(data)
+
+
+def build_features(data, transformer):
+    # Missing-value handling, feature creation and encoding, with the frozen transformer
+    features = transformer.transform(data)
+    features[LABEL_COLUMN] = data[LABEL_COLUMN].to_numpy()
+    return features
+
+
+def split_features(features, test_size):
+    from sklearn.model_selection import train_test_split
+
+    X = features.drop(columns=[LABEL_COLUMN])  # Features
+    y = features[LABEL_COLUMN]                 # Target
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+    return {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+
 
-    # Step 2: Feature Engineering
-    engineering = FeatureEngineering()
-    data = engineering.check_and_handle_missing_values(data)
-    data = engineering.create_features(data)
-    # Drop unnecessary columns
-    columns_to_drop = ['Unnamed: 0', 'nameOrig', 'nameDest', 'Date of transaction', 'Time of day', 'transaction_date']
-    data = data.drop(columns=columns_to_drop)
+def downsample_split(split, negative_rate):
+    # Keep every fraud and a sample of the legitimate transactions, stratified by transaction type
+    strata = [column for column in split['X_train'].columns if column.startswith('type_')]
+    X_train, y_train, rate = downsample_negatives(split['X_train'], split['y_train'], negative_rate, strata=strata or None)
+    return {**split, 'X_train': X_train, 'y_train': y_train, 'negative_rate': rate}
 
-    # Adjust categorical columns based on the actual columns in the dataset
-    categorical_columns = ['type', 'branch', 'Acct type']  # Make sure these match exactly with data.columns
-    data = engineering.encode_categorical(data, categorical_columns)  # Encode categorical columns
 
-    # Step 3: Model Training
-    modelling = DataModelling()
-    X = data.drop(columns=['isFraud'])  # Features
-    y = data['isFraud']                # Target
+def train_model(split, model_name, params):
+    model = create_model(model_name, **params)
+    return evaluate_model(model_name, model, split['X_train'], split['y_train'], split['X_test'], split['y_test'],
+                          negative_rate=split.get('negative_rate'))
 
-    results = modelling.train_and_evaluate_models(X, y)
 
-    # Step 4: Save the best model
-    best_model_name = max(results, key=lambda name: results[name]['accuracy'])
+def training_params(result):
+    # Prior-corrected models wrap the fitted estimator, which holds the params
+    model = result['model']
+    estimator = getattr(model, 'model', model)
+    get_params = getattr(estimator, 'get_params', None)
+    params = get_params(deep=False) if get_params else {}
+    return {**params, 'negative_rate': result.get('negative_rate')}
+
+
+def publish_best_model(data_file, data, transformer, selection_metric, costs, **results):
+    modelling = DataModelling(models={name: result['model'] for name, result in results.items()}, selection_metric=selection_metric)
+    modelling.results = results
+
+    best_model_name = modelling.best_model_name()
     best_model_path = f'../fraud_detection_system/models/pipeline_{best_model_name.replace(" ", "_").lower()}.pkl'
     modelling.save_best_model(model_path=best_model_path)
+    transformer.save(FeatureTransformer.path_for_model(best_model_path))
+
+    # This stage is never cached, so a rerun of an unchanged pipeline would register an
+    # identical version. The production version is kept when it was trained on the same
+    # data, feature code, models, params, negative rates, selection metric and costs.
+    registry = ModelRegistry()
+    data_fingerprint = fingerprint_file(data_file)
+    training_key = hashlib.sha256(json.dumps({
+        'data_fingerprint': data_fingerprint,
+        'code': code_fingerprint([FeatureTransformer, VelocityFeatures, evaluate_model, fit_model]),
+        'models': {name: training_params(result) for name, result in results.items()},
+        'selection_metric': selection_metric,
+        'costs': costs
+    }, sort_keys=True, default=repr).encode('utf-8')).hexdigest()[:32]
+    production = registry.production_version('fraud_detection')
+    if production is not None and registry.metadata('fraud_detection', production).get('training_key') == training_key:
+        print(f"fraud_detection version {production} was trained from the same inputs; not registering a new version.")
+        return best_model_name
+
+    # Register and promote a new version with its feature schema, metrics and data fingerprint
+    # The cost-optimal threshold is read from the cached test scores of the training stages,
+    # so changing the costs re-runs only this stage, without retraining or re-scoring.
+    # The training data and test scores also give the reference profile for drift monitoring.
+    version = modelling.register_best_model(registry, 'fraud_detection', transformer=transformer,
+                                            data_fingerprint=data_fingerprint, costs=costs,
+                                            reference_data=data, training_key=training_key)
+    print(f"Registered and promoted fraud_detection version {version}.")
+    return best_model_name
+
+
+def build_pipeline(data_file, models=None, model_params=None, test_size=0.2, cache_dir=None, max_workers=None,
+                   negative_rate=None, selection_metric='accuracy', costs=None):
+    """
+    Declare the training pipeline as cached stages. Each model trains in its own stage,
+    so changing one model's params only retrains that model. With negative_rate < 1 the
+    training split is reduced by a downsample_negatives stage before training. costs
+    ({'fn_cost', 'fp_cost'}) select the decision threshold recorded with the published model.
+    """
+    models = models or DEFAULT_MODELS
+    model_params = model_params or {}
+    train_stages = {name: f"train_{name.replace(' ', '_').replace('-', '_').lower()}" for name in models}
+
+    stages = [
+        Stage('ingest', ingest, inputs={'data_file': FileInput(data_file)}, code=[DataIngestion]),
+        Stage('drop_unlabelled', drop_unlabelled, inputs={'data': 'ingest'}),
+        Stage('fit_transformer', fit_transformer, inputs={'data': 'drop_unlabelled'}, code=[FeatureTransformer, VelocityFeatures]),
+        Stage('build_features', build_features, inputs={'data': 'drop_unlabelled', 'transformer': 'fit_transformer'}),
+        Stage('split_features', split_features, inputs={'features': 'build_features'}, params={'test_size': test_size})
+    ]
+    training_split = 'split_features'
+    if negative_rate and negative_rate < 1:
+        stages.append(Stage('downsample_negatives', downsample_split, inputs={'split': 'split_features'},
+                            params={'negative_rate': negative_rate}, code=[downsample_negatives]))
+        training_split = 'downsample_negatives'
+    for name, stage_name in train_stages.items():
+        stages.append(Stage(stage_name, train_model, inputs={'split': training_split}, code=[evaluate_model, fit_model, create_model, ThresholdSweep],
+                            params={'model_name': name, 'params': model_params.get(name, {})}))
+    stages.append(Stage('publish_best_model', publish_best_model, cache=False, params={'selection_metric': selection_metric, 'costs': costs},
+                        inputs={'data_file': FileInput(data_file), 'data': 'drop_unlabelled', 'transformer': 'fit_transformer',
+                                **{name: stage_name for name, stage_name in train_stages.items()}}))
+
+    options = {'max_workers': max_workers}
+    if cache_dir:
+        options['cache_dir'] = cache_dir
+    return StagePipeline(stages, **options)
+
+
+def run_pipeline(data_file, model_output_path, models=None, model_params=None, force=(), max_workers=None,
+                 negative_rate=None, selection_metric='accuracy', costs=None):
+    pipeline = build_pipeline(data_file, models=models, model_params=model_params, max_workers=max_workers,
+                              negative_rate=negative_rate, selection_metric=selection_metric, costs=costs)
+    best_model_name = pipeline.run(force=force)['publish_best_model']
 
     print(f"Best model ({best_model_name}) saved to {model_output_path}.")
 
 if __name__ == '__main__':
-    data_file = '../fraud_detection_system/data/raw/Datasets.csv'
+    parser = argparse.ArgumentParser(description="Run the training pipeline, reusing cached stages whose inputs, params and code are unchanged.")
+    parser.add_argument('--data-file', default='../fraud_detection_system/data/raw/Datasets.csv')
+    parser.add_argument('--models', nargs='+', default=None, help="Model names from data_modelling.MODEL_REGISTRY")
+    parser.add_argument('--force', nargs='+', default=(), help="Stages to recompute even if cached")
+    parser.add_argument('--workers', type=int, default=None, help="Stages run concurrently")
+    parser.add_argument('--negative-rate', type=float, default=None, help="Fraction of legitimate transactions kept for training")
+    parser.add_argument('--selection-metric', default='accuracy', help="accuracy, average_precision or recall_at_precision")
+    parser.add_argument('--fn-cost', type=float, default=None, help="Cost of a missed fraud, to pick the decision threshold")
+    parser.add_argument('--fp-cost', type=float, default=1.0, help="Cost of a legitimate transaction flagged as fraud")
+    parser.add_argument('--explain', action='store_true', help="Show which stages would be recomputed and why, without running")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
     model_output_path = '../fraud_detetection_system/models/fraud_detection_model.pkl'
-    run_pipeline(data_file, model_output_path)
+    costs = {'fn_cost': args.fn_cost, 'fp_cost': args.fp_cost} if args.fn_cost is not None else None
+    if args.explain:
+        for entry in build_pipeline(args.data_file, models=args.models, negative_rate=args.negative_rate,
+                                    selection_metric=args.selection_metric, costs=costs).explain():
+            print(f"{entry['stage']:32} {entry['status']:10} {entry['reason']}")
+    else:
+        configure_metrics(args)
+        try:
+            run_pipeline(args.data_file, model_output_path, models=args.models, force=args.force, max_workers=args.workers,
+                         negative_rate=args.negative_rate, selection_metric=args.selection_metric, costs=costs)
+        finally:
+            report_metrics(args)
@@ -0,0 +1,47 @@
+import argparse
+import json
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+from src.benchmark import MIN_P99_RUNS, BenchmarkSuite, compare_results
+from src.logger import get_logger
+from src.exception import FraudDetectionException
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion, feature engineering and modelling stages.")
+    parser.add_argument('--rows', type=int, default=1000000, help="Rows of synthetic data to generate")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-path', default=None, help="Benchmark an existing CSV instead of synthetic data")
+    parser.add_argument('--model', default="Decision Tree Classifier", help="Model name from data_modelling.MODEL_REGISTRY")
+    parser.add_argument('--repeats', type=int, default=5, help=f"Timed runs per stage, reported by the fastest; p99 is reported and compared from {MIN_P99_RUNS} runs")
+    parser.add_argument('--latency-samples', type=int, default=200, help="Records timed one at a time for the single-record latencies")
+    parser.add_argument('--output', default='artifacts/benchmarks/results.json')
+    parser.add_argument('--compare', default=None, help="Baseline results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="Allowed relative change before flagging a regression, widened to the run-to-run noise")
+    args = parser.parse_args()
+
+    try:
+        suite = BenchmarkSuite(rows=args.rows, seed=args.seed, data_path=args.data_path,
+                               model_name=args.model, repeats=args.repeats, latency_samples=args.latency_samples)
+        results = suite.run()
+        suite.save(args.output)
+    except FraudDetectionException as e:
+        logger.error(f"Benchmark run failed: {str(e)}")
+        sys.exit(1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            logger.warning(f"Regression in {regression['stage']} {regression['metric']}: "
+                           f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.1%}, allowed {regression['allowed']:.1%})")
+        if regressions:
+            sys.exit(1)
+        logger.info(f"No regressions against {args.compare} beyond {args.tolerance:.0%} or the run-to-run noise.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import argparse
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+from src.batch_scoring import BatchScorer
+from src.instrumentation import add_metrics_arguments, configure_metrics, report_metrics
+from src.logger import get_logger
+from src.exception import ScoringException
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a file of transactions with a saved model.")
+    parser.add_argument('input_path', help="CSV file or columnar dataset directory to score")
+    parser.add_argument('output_path', help="CSV file to write row_id, fraud_probability and is_fraud to")
+    parser.add_argument('--model-path', default='../fraud_detection_system/models/pipeline_decision_tree_classifier.pkl')
+    parser.add_argument('--transformer-path', default=None, help="Defaults to the transformer saved next to the model")
+    parser.add_argument('--threshold', type=float, default=None, help="Defaults to the decision threshold recorded with a registry version, else 0.5")
+    parser.add_argument('--chunksize', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--drift-profile', default=None, help="Reference drift profile JSON; registry versions carry their own")
+    parser.add_argument('--no-resume', action='store_true', help="Ignore any checkpoint and start from the first row")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    configure_metrics(args)
+    try:
+        scorer = BatchScorer(args.model_path, transformer_path=args.transformer_path, threshold=args.threshold,
+                             chunksize=args.chunksize, n_workers=args.workers,
+                             drift_profile_path=args.drift_profile)
+        scorer.score_file(args.input_path, args.output_path, resume=not args.no_resume)
+    except ScoringException as e:
+        logger.error(f"Batch scoring failed: {str(e)}")
+        sys.exit(1)
+    finally:
+        report_metrics(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+from src.scoring_service import serve
+from src.model_registry import ModelRegistry
+from src.instrumentation import add_metrics_arguments, configure_metrics, report_metrics
+from src.logger import get_logger
+from src.exception import FraudDetectionException
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fraud scores for raw transaction records over HTTP.")
+    parser.add_argument('--model-path', default='../fraud_detection_system/models/pipeline_decision_tree_classifier.pkl')
+    parser.add_argument('--registry-dir', default=None, help="Serve the promoted version from this model registry instead of --model-path")
+    parser.add_argument('--model-name', default='fraud_detection', help="Registry model name")
+    parser.add_argument('--poll-interval', type=float, default=None, help="Seconds between checks for a newly promoted version")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--threshold', type=float, default=None, help="Defaults to the decision threshold recorded with the served registry version, else 0.5")
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--drift-profile', default=None, help="Reference drift profile JSON; registry versions carry their own")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    configure_metrics(args)
+    try:
+        registry = ModelRegistry(args.registry_dir) if args.registry_dir else None
+        serve(args.model_path, host=args.host, port=args.port, threshold=args.threshold,
+              max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+              registry=registry, model_name=args.model_name, poll_interval=args.poll_interval,
+              drift_profile_path=args.drift_profile)
+    except FraudDetectionException as e:
+        logger.error(f"Scoring service failed: {str(e)}")
+    finally:
+        report_metrics(args)
+
+if __name__ == '__main__':
+    main()
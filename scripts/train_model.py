@@ -4,8 +4,9 @@ import sys
 sys.path.append('../fraud_detection_system')
 
 from src.data_modelling import DataModelling
+from src.data_store import DataStore, fingerprint_dataset
 from src.logger import get_logger
-from src.exception import DataModellingException
+from src.exception import DataModellingException, DataStoreException
 
 logger = get_logger(__name__)
 
@@ -13,10 +14,20 @@ def main():
     try:
         logger.info("Starting the model training process...")
 
-        # Load the preprocessed and engineered data
+        # Load the preprocessed and engineered data, reopening the columnar cache when the
+        # raw input and feature config are unchanged instead of re-parsing the CSV
         sys.path.append('../fraud_detection_system')
+        raw_data_path = '../fraud_detection_system/data/raw/Datasets.csv'
         data_path = '../fraud_detection_system/data/processed/processed_transaction_data.csv'
-        data = pd.read_csv(data_path)
+        categorical_columns = ['type', 'branch', 'Acct type']
+
+        store = DataStore()
+        dataset_key = fingerprint_dataset(raw_data_path, config={'categorical_columns': categorical_columns})
+        if store.exists(dataset_key):
+            data = store.load(dataset_key)
+        else:
+            logger.info(f"No cached dataset for key {dataset_key}, reading {data_path}")
+            data = pd.read_csv(data_path)
 
         # Drop unnecessary columns
         columns_to_drop = ['Unnamed: 0', 'nameOrig', 'nameDest', 'Date of transaction', 'Time of day', 'transaction_date']
@@ -33,14 +44,14 @@ def main():
         results = modelling.train_and_evaluate_models(X, y)
 
         # Save the best model based on accuracy
-        best_model_name = max(results, key=lambda name: results[name]['accuracy'])
+        best_model_name = modelling.best_model_name()
         best_model_path = f'../fraud_detection_system/models/{best_model_name.replace(" ", "_").lower()}.pkl'
         modelling.save_best_model(model_path=best_model_path)
 
         logger.info(f"Model training process completed successfully.")
         logger.info(f"Best model: {best_model_name} with accuracy: {results[best_model_name]['accuracy']:.4f}")
 
-    except DataModellingException as e:
+    except (DataModellingException, DataStoreException) as e:
         logger.error(f"Model training process failed: {str(e)}")
 
 if __name__ == '__main__':
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.data_ingestion import DataIngestion
+from src.data_store import fingerprint_file
+from src.feature_engineering import FeatureTransformer
+from src.model_registry import ModelRegistry
+from src.sharded_training import ShardWriter, ShardedForestTrainer
+from src.instrumentation import add_metrics_arguments, configure_metrics, report_metrics
+from src.logger import get_logger
+from src.exception import FraudDetectionException
+
+logger = get_logger(__name__)
+
+LABEL_COLUMN = 'isFraud'
+TRANSFORMER_FILE = 'features.pkl'
+
+
+def shard(args):
+    # The transformer is fitted on the first fit_rows rows, so only that sample and one
+    # chunk at a time are ever held in memory
+    sample = pd.read_csv(args.data_file, nrows=args.fit_rows).dropna(subset=[LABEL_COLUMN])
+    transformer = FeatureTransformer().fit(sample)
+    del sample
+    transformer.save(os.path.join(args.shard_dir, TRANSFORMER_FILE))
+
+    with ShardWriter(args.shard_dir, args.shards) as writer:
+        for chunk in DataIngestion(file_path=args.data_file).stream_data(chunksize=args.chunksize, usecols=lambda column: True):
+            chunk = chunk.dropna(subset=[LABEL_COLUMN])
+            writer.write(transformer.transform(chunk), chunk[LABEL_COLUMN])
+
+
+def trainer(args):
+    params = {'n_jobs': args.jobs} if args.jobs else {}
+    return ShardedForestTrainer(args.shard_dir, n_estimators=args.estimators, model_params=params,
+                                lease_seconds=args.lease_seconds)
+
+
+def publish(args, forest):
+    registry = ModelRegistry(args.registry_dir)
+    transformer = FeatureTransformer.load(os.path.join(args.shard_dir, TRANSFORMER_FILE))
+    data_fingerprint = fingerprint_file(args.data_file) if args.data_file else None
+    version = registry.register(args.model_name, forest, transformer=transformer, data_fingerprint=data_fingerprint,
+                                metrics={'model_name': 'Random Forest Classifier', 'shards': trainer(args).manifest()['n_shards']},
+                                promote=not args.no_promote)
+    logger.info(f"Registered sharded forest as {args.model_name} version {version}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a random forest on row shards. Shard once, run workers on any "
+                                                 "number of nodes sharing --shard-dir, then merge and register.")
+    parser.add_argument('command', choices=['shard', 'worker', 'merge', 'train'],
+                        help="train runs shard, local workers and merge in one go")
+    parser.add_argument('--data-file', default='../fraud_detection_system/data/raw/Datasets.csv')
+    parser.add_argument('--shard-dir', default='../fraud_detection_system/artifacts/shards')
+    parser.add_argument('--shards', type=int, default=8)
+    parser.add_argument('--chunksize', type=int, default=500000)
+    parser.add_argument('--fit-rows', type=int, default=1000000, help="Rows used to fit the feature transformer")
+    parser.add_argument('--estimators', type=int, default=100, help="Trees in the merged forest")
+    parser.add_argument('--jobs', type=int, default=None, help="n_jobs of each sub-forest")
+    parser.add_argument('--workers', type=int, default=None, help="Local worker processes for the train command")
+    parser.add_argument('--lease-seconds', type=float, default=3600, help="Age after which a shard claim is taken over")
+    parser.add_argument('--registry-dir', default='../fraud_detection_system/models/registry')
+    parser.add_argument('--model-name', default='fraud_detection')
+    parser.add_argument('--no-promote', action='store_true', help="Register the merged forest without promoting it")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    configure_metrics(args)
+    try:
+        if args.command in ('shard', 'train'):
+            shard(args)
+        if args.command == 'worker':
+            trained = trainer(args).run_worker()
+            logger.info(f"Worker trained shards {trained}.")
+        elif args.command == 'merge':
+            publish(args, trainer(args).merge())
+        elif args.command == 'train':
+            publish(args, trainer(args).train(n_workers=args.workers))
+    except FraudDetectionException as e:
+        logger.error(f"Sharded training failed: {str(e)}")
+        sys.exit(1)
+    finally:
+        report_metrics(args)
+
+if __name__ == '__main__':
+    main()
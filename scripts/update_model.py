@@ -0,0 +1,45 @@
+import argparse
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+from src.data_ingestion import DataIngestion
+from src.data_modelling import DataModelling
+from src.model_registry import ModelRegistry
+from src.logger import get_logger
+from src.exception import FraudDetectionException
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold a new batch of labeled transactions into the promoted registry model.")
+    parser.add_argument('batch_path', help="CSV file of new transactions with an isFraud label")
+    parser.add_argument('--registry-dir', default='../fraud_detection_system/models/registry')
+    parser.add_argument('--model-name', default='fraud_detection')
+    parser.add_argument('--scoring', default='accuracy', help="sklearn scorer used for the validation check")
+    parser.add_argument('--max-degradation', type=float, default=0.005, help="Largest allowed drop of the validation score")
+    parser.add_argument('--new-estimators', type=int, default=10, help="Trees or boosting stages appended to warm-started ensembles")
+    parser.add_argument('--no-promote', action='store_true', help="Register the updated version without promoting it")
+    args = parser.parse_args()
+
+    try:
+        registry = ModelRegistry(args.registry_dir)
+        data = DataIngestion(file_path=args.batch_path).load_data()
+        data = data.dropna(subset=['isFraud'])
+
+        # Features are built with the transformer frozen at the promoted version's training time
+        transformer = registry.load(args.model_name).transformer
+        X = transformer.transform(data)
+        y = data['isFraud']
+
+        result = DataModelling().update_registered_model(registry, args.model_name, X, y, scoring=args.scoring,
+                                                         max_degradation=args.max_degradation,
+                                                         n_new_estimators=args.new_estimators,
+                                                         promote=not args.no_promote)
+        logger.info(f"Incremental update result: {result}")
+    except FraudDetectionException as e:
+        logger.error(f"Incremental update failed: {str(e)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,24 @@
 # src/__init__.py
 
-from .data_ingestion import DataIngestion
-from .feature_engineering import FeatureEngineering
-from .data_modelling import DataModelling
+# The pipeline classes are imported on first access (PEP 562), so importing a single
+# submodule such as src.batch_scoring does not load pandas, sklearn and every stage.
+_LAZY_ATTRIBUTES = {
+    'DataIngestion': 'src.data_ingestion',
+    'FeatureEngineering': 'src.feature_engineering',
+    'DataModelling': 'src.data_modelling'
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import warnings
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import ScoringException
+from src.data_store import SCHEMA_FILE, fingerprint_file, read_columnar
+from src.model_registry import DRIFT_PROFILE_FILE, TRANSFORMER_FILE, VERSION_FILE, decision_threshold, is_version_dir, load_version_model
+from src.model_evaluation import DEFAULT_THRESHOLD
+from src.feature_engineering import FeatureTransformer
+from src.drift_monitoring import DriftMonitor
+from src.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+# Per-process model and transformer, loaded once by _init_worker
+_worker_state = {}
+
+
+def load_scoring_model(model_path):
+    """
+    Load a pickled sklearn model, a compiled tree model directory (see src.tree_compiler) or a
+    model registry version directory. Each worker holds its own copy of an estimator; only
+    compiled node arrays are memory-mapped and shared. Version directories are still scored
+    with the estimator, even when compiled arrays are stored: on chunks of this size sklearn's
+    predict_proba is 2-6x faster than the compiled traversal.
+    """
+    if is_version_dir(model_path):
+        return load_version_model(model_path)
+    if os.path.isdir(model_path):
+        from src.tree_compiler import CompiledTreeEnsemble
+        return CompiledTreeEnsemble.load(model_path)
+    from src.data_modelling import DataModelling
+    return DataModelling().load_model(model_path)
+
+
+def _init_worker(model_path, transformer_path, drift_profile_path=None, profiled=None):
+    from src.scoring_service import load_feature_transform
+
+    metrics.profiled.update(profiled or {})
+
+    _worker_state['model'] = load_scoring_model(model_path)
+    # Models saved without a transformer (e.g. the legacy pipeline pickle) use column alignment
+    _worker_state['transformer'] = load_feature_transform(_worker_state['model'], model_path, transformer_path)
+    _worker_state['drift_profile'] = DriftMonitor.load(drift_profile_path) if drift_profile_path else None
+
+
+def _score_chunk(chunk, threshold, history=None):
+    """
+    Score one chunk. history holds the preceding rows its velocity features need.
+    Returns the result frame, the to_dict() state of a DriftMonitor over the chunk when
+    there is a drift profile, and the stage metrics of the chunk, to be merged by the
+    parent process.
+    """
+    transformer = _worker_state['transformer']
+    with metrics.capture() as snapshot, metrics.stage('score_chunk', rows=len(chunk)):
+        features = (transformer.transform(chunk) if history is None else transformer.transform(chunk, history=history)).to_numpy()
+        with warnings.catch_warnings():
+            # Models fitted on DataFrames warn when scored with a plain array
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            scores = _worker_state['model'].predict_proba(features)[:, 1]
+    drift_state = None
+    if _worker_state['drift_profile'] is not None:
+        monitor = _worker_state['drift_profile'].empty_like(threshold=threshold)
+        monitor.update(chunk, scores=scores)
+        drift_state = monitor.to_dict()
+    return pd.DataFrame({
+        'row_id': chunk.index.to_numpy(),
+        'fraud_probability': scores,
+        'is_fraud': (scores >= threshold).astype(np.int8)
+    }), drift_state, snapshot
+
+
+def _input_fingerprint(input_path):
+    if not os.path.isdir(input_path):
+        return fingerprint_file(input_path)
+    return {name: fingerprint_file(os.path.join(input_path, name)) for name in sorted(os.listdir(input_path))
+            if os.path.isfile(os.path.join(input_path, name))}
+
+
+class BatchScorer:
+    def __init__(self, model_path, transformer_path=None, threshold=None, chunksize=100000, n_workers=None,
+                 drift_profile_path=None):
+        """
+        Score large transaction files in fixed-size chunks across a process pool.
+        Results are written in input order as chunks complete. A checkpoint next to the
+        output records the last completed chunk, so an interrupted run resumes from there.
+        With a drift profile (by default the one of a registry version directory), each
+        worker sketches its chunks and the merged drift report is written next to the output.
+        Transactions are flagged at threshold, by default the decision threshold recorded with
+        a registry version (0.5 for other models).
+        """
+        self.model_path = model_path
+        if transformer_path is None and is_version_dir(model_path):
+            transformer_path = os.path.join(model_path, TRANSFORMER_FILE)
+        if drift_profile_path is None and is_version_dir(model_path) and os.path.exists(os.path.join(model_path, DRIFT_PROFILE_FILE)):
+            drift_profile_path = os.path.join(model_path, DRIFT_PROFILE_FILE)
+        self.drift_profile_path = drift_profile_path
+        self.transformer_path = transformer_path or FeatureTransformer.path_for_model(model_path.rstrip(os.sep))
+        if threshold is None:
+            threshold = DEFAULT_THRESHOLD
+            if is_version_dir(model_path):
+                with open(os.path.join(model_path, VERSION_FILE)) as f:
+                    threshold = decision_threshold(json.load(f), DEFAULT_THRESHOLD)
+        self.threshold = threshold
+        self.chunksize = chunksize
+        self.n_workers = n_workers or os.cpu_count() or 1
+        logger.info(f"BatchScorer initialized with model {self.model_path} and {self.n_workers} workers.")
+
+    def _read_chunks(self, input_path, skip_rows):
+        """
+        Yield input chunks with a global row index, skipping rows already scored.
+        Skipped CSV rows are parsed chunk by chunk and dropped, so memory stays bounded by
+        the chunk size (a skiprows range is turned into a set of every skipped row).
+        """
+        if os.path.isdir(input_path) and os.path.exists(os.path.join(input_path, SCHEMA_FILE)):
+            data = read_columnar(input_path)
+            for start in range(skip_rows, len(data), self.chunksize):
+                yield data.iloc[start:start + self.chunksize]
+            return
+
+        reader = pd.read_csv(input_path, chunksize=self.chunksize)
+        start = 0
+        with reader:
+            for chunk in reader:
+                end = start + len(chunk)
+                if end > skip_rows:
+                    chunk.index = pd.RangeIndex(start, end)
+                    yield chunk.iloc[max(skip_rows - start, 0):]
+                start = end
+
+    def _load_checkpoint(self, checkpoint_path, run_key):
+        if not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('run') != run_key:
+            logger.warning(f"Ignoring checkpoint {checkpoint_path} written for a different run.")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint_path, checkpoint):
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def score_file(self, input_path, output_path, resume=True):
+        """
+        Score every row of a CSV file or columnar artifact and write row_id, fraud_probability
+        and is_fraud to a CSV output. Returns the number of rows scored in total.
+        """
+        checkpoint_path = f"{output_path}.checkpoint.json"
+        # An input rewritten at the same path must not resume the checkpoint of its old content
+        run_key = {'input': os.path.abspath(input_path), 'input_fingerprint': _input_fingerprint(input_path),
+                   'model': os.path.abspath(self.model_path),
+                   'chunksize': self.chunksize, 'threshold': self.threshold, 'drift_profile': self.drift_profile_path}
+
+        try:
+            checkpoint = self._load_checkpoint(checkpoint_path, run_key) if resume else None
+            if checkpoint is not None and checkpoint['bytes'] and \
+                    (not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint['bytes']):
+                logger.warning(f"Output {output_path} is missing or truncated, discarding checkpoint {checkpoint_path}.")
+                checkpoint = None
+            if checkpoint is None:
+                checkpoint = {'run': run_key, 'chunks': 0, 'rows': 0, 'bytes': 0}
+            else:
+                logger.info(f"Resuming from chunk {checkpoint['chunks']} ({checkpoint['rows']} rows already scored).")
+
+            # Drift sketches of the chunks written so far travel in the checkpoint
+            reference = DriftMonitor.load(self.drift_profile_path) if self.drift_profile_path else None
+            monitor = None
+            if reference is not None:
+                monitor = DriftMonitor.from_dict(checkpoint['drift']) if checkpoint.get('drift') else reference.empty_like(threshold=self.threshold)
+
+            # Velocity windows reach back into earlier chunks, so every chunk is sent with the
+            # tail of the rows before it. A resumed run re-reads that tail from history_start.
+            velocity = None
+            if os.path.exists(self.transformer_path):
+                velocity = getattr(FeatureTransformer.load(self.transformer_path), 'velocity_', None)
+            history = None
+            position = checkpoint.get('history_start', checkpoint['rows']) if velocity is not None else checkpoint['rows']
+
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            with open(output_path, 'r+b' if checkpoint['bytes'] else 'wb') as output, \
+                    ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                        initargs=(self.model_path, self.transformer_path, self.drift_profile_path,
+                                                  dict(metrics.profiled))) as pool:
+                # Drop anything written after the last checkpoint
+                output.seek(checkpoint['bytes'])
+                output.truncate()
+
+                in_flight = deque()
+                chunks = self._read_chunks(input_path, position)
+
+                def write_next():
+                    future, history_start = in_flight.popleft()
+                    result, drift_state, snapshot = future.result()
+                    metrics.merge(snapshot)
+                    if monitor is not None:
+                        monitor.merge(DriftMonitor.from_dict(drift_state))
+                        checkpoint['drift'] = monitor.to_dict()
+                    header = checkpoint['bytes'] == 0
+                    output.write(result.to_csv(index=False, header=header).encode('utf-8'))
+                    output.flush()
+                    os.fsync(output.fileno())
+                    checkpoint['chunks'] += 1
+                    checkpoint['rows'] += len(result)
+                    checkpoint['bytes'] = output.tell()
+                    if history_start is not None:
+                        checkpoint['history_start'] = history_start
+                    self._save_checkpoint(checkpoint_path, checkpoint)
+                    logger.info(f"Scored chunk {checkpoint['chunks']} ({checkpoint['rows']} rows total).")
+
+                def extend_history(history, events):
+                    return velocity.trim_history(events if history is None else pd.concat([history, events]))
+
+                # Keep at most two chunks per worker in memory at a time
+                for chunk in chunks:
+                    start, position = position, position + len(chunk)
+                    chunk_history, history_start = None, None
+                    if velocity is not None:
+                        events = chunk[velocity.history_columns].set_axis(pd.RangeIndex(start, position))
+                        # Rows scored before a resume only feed the history
+                        skip = max(checkpoint['rows'] - start, 0)
+                        if skip:
+                            history = extend_history(history, events.iloc[:skip])
+                            chunk, events = chunk.iloc[skip:], events.iloc[skip:]
+                            if not len(chunk):
+                                continue
+                        chunk_history = history
+                        history = extend_history(history, events)
+                        history_start = int(history.index.min()) if len(history) else position
+                    in_flight.append((pool.submit(_score_chunk, chunk, self.threshold, chunk_history), history_start))
+                    if len(in_flight) >= 2 * self.n_workers:
+                        write_next()
+                while in_flight:
+                    write_next()
+
+            os.remove(checkpoint_path)
+            if monitor is not None:
+                report = monitor.compare(reference)
+                with open(f"{output_path}.drift.json", 'w') as f:
+                    json.dump(report, f, indent=2)
+                if report['alerts']:
+                    logger.warning(f"Scored data drifted from the training profile on {report['alerts']}.")
+            logger.info(f"Batch scoring completed: {checkpoint['rows']} rows written to {output_path}")
+            return checkpoint['rows']
+
+        except Exception as e:
+            logger.error(f"An error occurred during batch scoring: {str(e)}")
+            raise ScoringException(f"Failed to score {input_path}.", errors=e)
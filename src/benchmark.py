@@ -0,0 +1,262 @@
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import FraudDetectionException
+from src.data_ingestion import DataIngestion
+from src.feature_engineering import FeatureEngineering, FeatureTransformer
+from src.data_modelling import DataModelling
+from src.synthetic_data import SyntheticTransactionGenerator
+
+logger = get_logger(__name__)
+
+LABEL_COLUMN = 'isFraud'
+# Metrics where a higher value is better; every other compared metric is better when lower
+HIGHER_IS_BETTER = {'rows_per_s'}
+COMPARED_METRICS = ['rows_per_s', 'peak_rss_mb', 'p99_ms']
+# Timed runs needed before a p99 is reported and compared; below that it is just the slowest run
+MIN_P99_RUNS = 100
+# A change only counts as a regression beyond this many times the spread seen between runs
+NOISE_FACTOR = 3
+# Peak RSS of identical runs in separate processes differs by up to ~20 MB (allocator and
+# garbage collection timing), which repeats within one process do not show
+RSS_NOISE_MB = 32
+
+
+def current_rss_mb():
+    """
+    Resident set size of this process in MB, read from /proc on Linux.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        # ru_maxrss is the lifetime peak (KB on Linux, bytes on macOS); better than nothing
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class StageMonitor:
+    def __init__(self, interval=0.005):
+        """
+        Context manager that samples RSS in a background thread to report a stage's peak memory.
+        """
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+
+    def __enter__(self):
+        self.start_rss_mb = self.peak_rss_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_s = time.perf_counter() - self.start
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+        return False
+
+
+class BenchmarkSuite:
+    def __init__(self, rows=1000000, seed=42, data_path=None, model_name="Decision Tree Classifier",
+                 repeats=5, latency_samples=200):
+        """
+        End-to-end benchmark of the DataIngestion, FeatureEngineering, FeatureTransformer and
+        DataModelling stages on a seeded synthetic dataset (or an existing CSV via data_path).
+        Stages are timed `repeats` times and report the fastest run, the least disturbed by
+        other load; single-record latencies are timed on latency_samples records per round.
+        """
+        self.rows = rows
+        self.seed = seed
+        self.data_path = data_path
+        self.model_name = model_name
+        self.repeats = repeats
+        self.latency_samples = latency_samples
+        self.results = {}
+
+    @staticmethod
+    def _percentiles(walls):
+        percentiles = {'runs': len(walls), 'p50_ms': round(float(np.percentile(walls, 50) * 1000), 3)}
+        if len(walls) >= MIN_P99_RUNS:
+            percentiles['p95_ms'] = round(float(np.percentile(walls, 95) * 1000), 3)
+            percentiles['p99_ms'] = round(float(np.percentile(walls, 99) * 1000), 3)
+        return percentiles
+
+    @staticmethod
+    def _spread(values):
+        """
+        Relative range of repeated measurements, used to tell noise from regressions.
+        """
+        values = np.asarray(values, dtype=float)
+        middle = np.median(values)
+        return round(float((values.max() - values.min()) / middle), 4) if middle > 0 else 0.0
+
+    def _record(self, name, n_rows, runs):
+        walls = np.array([run.wall_s for run in runs])
+        peaks = np.array([run.peak_rss_mb for run in runs])
+        wall = float(walls.min())
+        self.results[name] = {
+            'rows': int(n_rows),
+            'wall_s': round(wall, 6),
+            'rows_per_s': round(float(n_rows / wall) if wall > 0 else 0.0, 2),
+            'peak_rss_mb': round(float(np.median(peaks)), 2),
+            'rss_delta_mb': round(max(run.peak_rss_mb - run.start_rss_mb for run in runs), 2),
+            **self._percentiles(walls),
+            'spread': {'rows_per_s': self._spread(walls), 'peak_rss_mb': self._spread(peaks)}
+        }
+        logger.info(f"Benchmark {name}: {self.results[name]}")
+
+    def _record_latencies(self, name, func, inputs):
+        """
+        Time func on each input, in `repeats` rounds over all inputs. Throughput is taken from
+        the fastest round's median latency; spreads are between rounds.
+        """
+        rounds = []
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            for _ in range(self.repeats):
+                latencies = []
+                for value in inputs:
+                    start = time.perf_counter()
+                    func(value)
+                    latencies.append(time.perf_counter() - start)
+                rounds.append(np.array(latencies))
+        medians = [np.median(latencies) for latencies in rounds]
+        self.results[name] = {
+            'rows': len(inputs),
+            'rows_per_s': round(float(1 / min(medians)), 2),
+            **self._percentiles(np.concatenate(rounds)),
+            'spread': {'rows_per_s': self._spread(medians),
+                       'p99_ms': self._spread([np.percentile(latencies, 99) for latencies in rounds])}
+        }
+        logger.info(f"Benchmark {name}: {self.results[name]}")
+
+    def _run_stage(self, name, n_rows, func, setup=None):
+        """
+        Time func `repeats` times. If setup is given, its (untimed) result is passed to func,
+        e.g. a fresh copy of a frame func modifies in place.
+        """
+        runs, output = [], None
+        for _ in range(self.repeats):
+            args = (setup(),) if setup else ()
+            with StageMonitor() as run:
+                output = func(*args)
+            runs.append(run)
+        self._record(name, n_rows, runs)
+        return output
+
+    def run(self):
+        """
+        Run every stage and return {stage: metrics}.
+        """
+        try:
+            data_path = self.data_path
+            if data_path is None:
+                data_path = os.path.join('artifacts', 'benchmarks', f"synthetic_{self.rows}_{self.seed}.csv")
+                if not os.path.exists(data_path):
+                    SyntheticTransactionGenerator(seed=self.seed).write_csv(data_path, self.rows)
+
+            ingestion = DataIngestion(file_path=data_path)
+            data = self._run_stage('load', self.rows, ingestion.load_data)
+            n_rows = len(data)
+            self._run_stage('validate', n_rows, lambda: ingestion.validate_data(data))
+
+            data = data.dropna(subset=[LABEL_COLUMN])
+            n_rows = len(data)
+            # The legacy FeatureEngineering steps of scripts/pipeline.py
+            feature_engineering = FeatureEngineering()
+            features = self._run_stage('create_features', n_rows, feature_engineering.create_features, setup=data.copy)
+            self._run_stage('encode', n_rows,
+                            lambda: feature_engineering.encode_categorical(features, FeatureTransformer.CATEGORICAL_COLUMNS))
+            del features
+            transformer = self._run_stage('fit_transformer', n_rows, lambda: FeatureTransformer().fit(data))
+            X = self._run_stage('transform', n_rows, lambda: transformer.transform(data))
+            y = data[LABEL_COLUMN]
+
+            model = DataModelling([self.model_name]).models[self.model_name]
+            self._run_stage('fit', n_rows, lambda: model.fit(X, y))
+            self._run_stage('predict', n_rows, lambda: model.predict(X))
+
+            # Single-record latency distributions of the serving path: the fitted transformer
+            # on raw records and the model on one feature row
+            records = data.iloc[:self.latency_samples].to_dict('records')
+            self._record_latencies('transform_single_record', transformer.transform_records, records)
+            rows = X.iloc[:self.latency_samples].to_numpy()
+            self._record_latencies('predict_single_row', lambda row: model.predict(row.reshape(1, -1)), rows)
+            return self.results
+
+        except Exception as e:
+            logger.error(f"An error occurred while running benchmarks: {str(e)}")
+            raise FraudDetectionException("Failed to run benchmarks.", errors=e)
+
+    def save(self, output_path):
+        """
+        Write the results with run metadata to a JSON file.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        report = {
+            'meta': {
+                'rows': self.rows,
+                'seed': self.seed,
+                'data_path': self.data_path,
+                'model': self.model_name,
+                'repeats': self.repeats,
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+                'machine': platform.machine(),
+                'cpu_count': os.cpu_count()
+            },
+            'stages': self.results
+        }
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark results saved to {output_path}")
+        return report
+
+
+def compare_results(results, baseline, tolerance=0.1, noise_factor=NOISE_FACTOR):
+    """
+    Compare stage metrics to a baseline report and return the regressions, as a list of
+    {stage, metric, baseline, current, change, allowed} dicts. A change is allowed up to
+    tolerance, or noise_factor times the larger run-to-run spread of the two reports when
+    that is wider; peak RSS changes under RSS_NOISE_MB are ignored. p99 latencies are only compared when both sides were timed at least
+    MIN_P99_RUNS times.
+    """
+    regressions = []
+    baseline_stages = baseline.get('stages', baseline)
+    for stage, metrics in results.items():
+        for metric in COMPARED_METRICS:
+            if metric not in metrics or metric not in baseline_stages.get(stage, {}):
+                continue
+            if metric == 'p99_ms' and min(metrics.get('runs', 0), baseline_stages[stage].get('runs', 0)) < MIN_P99_RUNS:
+                continue
+            old, new = baseline_stages[stage][metric], metrics[metric]
+            if not old or (metric == 'peak_rss_mb' and abs(new - old) < RSS_NOISE_MB):
+                continue
+            change = (new - old) / old
+            spread = max(metrics.get('spread', {}).get(metric, 0.0), baseline_stages[stage].get('spread', {}).get(metric, 0.0))
+            allowed = max(tolerance, noise_factor * spread)
+            worse = change < -allowed if metric in HIGHER_IS_BETTER else change > allowed
+            if worse:
+                regressions.append({'stage': stage, 'metric': metric, 'baseline': old, 'current': new,
+                                    'change': round(change, 4), 'allowed': round(allowed, 4)})
+    return regressions
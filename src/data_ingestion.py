@@ -6,9 +6,44 @@ sys.path.append('../fraud_detection_system')
 
 from src.logger import get_logger
 from src.exception import DataIngestionException
+from src.instrumentation import metrics
+from src.data_store import write_columnar
+from src.data_validation import DataValidator
 
 logger = get_logger(__name__)
 
+# Declared column schema used by the streaming ingestion mode. Low-cardinality
+# string columns are read as categoricals and numeric columns are downcast so
+# that a chunk costs a fraction of the memory of an inferred-dtype frame. Integer
+# columns use the nullable Int dtypes, so an empty cell reads as <NA> instead of
+# aborting the stream.
+# 'type', 'Acct type' and 'Time of day' have fixed vocabularies; the vocabulary of
+# open-ended categoricals such as 'branch' is resolved by a single-column pre-scan
+# (see DataIngestion.resolve_schema) so that every chunk one-hot encodes identically.
+COLUMN_SCHEMA = {
+    'step': 'Int32',
+    'type': pd.CategoricalDtype(['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']),
+    'branch': 'category',
+    'amount': 'float32',
+    'nameOrig': 'str',
+    'oldbalanceOrg': 'float32',
+    'newbalanceOrig': 'float32',
+    'nameDest': 'str',
+    'oldbalanceDest': 'float32',
+    'newbalanceDest': 'float32',
+    'unusuallogin': 'Int8',
+    'isFlaggedFraud': 'Int8',
+    'Acct type': pd.CategoricalDtype(['Current', 'Savings']),
+    'Date of transaction': 'str',
+    'Time of day': pd.CategoricalDtype(['Afternoon', 'Morning', 'Night']),
+    'isFraud': 'float32'
+}
+
+# Columns the downstream pipeline never uses; pruned at parse time when streaming.
+UNUSED_COLUMNS = ['Unnamed: 0', 'nameOrig', 'nameDest']
+
+DEFAULT_CHUNKSIZE = 100000
+
 class DataIngestion:
     def __init__(self, file_path):
         """
@@ -18,11 +53,18 @@ class DataIngestion:
         self.file_path = file_path
         logger.info(f"DataIngestion initialized with file path: {self.file_path}")
 
-    def load_data(self):
+    def load_data(self, chunksize=None, usecols=None):
         """
         Load the dataset from a CSV file.
+        If a chunksize is given, return a generator of schema-typed chunks instead (see stream_data).
         
         """
+        if chunksize:
+            return self.stream_data(chunksize=chunksize, usecols=usecols)
+        return self._read_data()
+
+    @metrics.instrument('load_data')
+    def _read_data(self):
         try:
             if not os.path.exists(self.file_path):
                 logger.error(f"File not found: {self.file_path}")
@@ -37,35 +79,104 @@ class DataIngestion:
             logger.error(f"An error occurred while loading data: {str(e)}")
             raise DataIngestionException(f"Failed to load data from {self.file_path}", errors=e)
 
-    def validate_data(self, data):
+    def stream_data(self, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
         """
-        Validate the loaded dataset by checking for missing values, duplicate entries, and other potential issues.
+        Stream the dataset as chunks of at most `chunksize` rows, parsed with COLUMN_SCHEMA.
+        Columns in UNUSED_COLUMNS are skipped unless `usecols` lists the columns to keep,
+        so peak memory depends on the chunk size rather than the file size.
+        Parsing every chunk is recorded as a call of the load_data stage.
         
         """
+        if not os.path.exists(self.file_path):
+            logger.error(f"File not found: {self.file_path}")
+            raise DataIngestionException(f"File not found: {self.file_path}")
+
+        if usecols is None:
+            usecols = lambda column: column not in UNUSED_COLUMNS
+
         try:
-            logger.info("Starting data validation...")
+            schema = self.resolve_schema(chunksize=chunksize)
+            logger.info(f"Streaming data from {self.file_path} in chunks of {chunksize} rows")
+            reader = pd.read_csv(self.file_path, dtype=schema, usecols=usecols, chunksize=chunksize)
+            total_rows = 0
+            with reader:
+                chunks = iter(reader)
+                while True:
+                    # Time the parsing of each chunk, not the caller's work between chunks
+                    with metrics.stage('load_data') as call:
+                        chunk = next(chunks, None)
+                        call.rows = 0 if chunk is None else len(chunk)
+                    if chunk is None:
+                        break
+                    total_rows += len(chunk)
+                    yield chunk
+            logger.info(f"Finished streaming {total_rows} records from {self.file_path}.")
 
-            # Check for missing values
-            missing_values = data.isnull().sum().sum()
-            if missing_values > 0:
-                logger.warning(f"Data contains {missing_values} missing values. Consider handling them in preprocessing.")
+        except Exception as e:
+            logger.error(f"An error occurred while streaming data: {str(e)}")
+            raise DataIngestionException(f"Failed to stream data from {self.file_path}", errors=e)
+
+    def resolve_schema(self, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Return COLUMN_SCHEMA with the vocabulary of every open-ended 'category' column fixed.
+        Only those columns are parsed, so the pre-scan is cheap compared to a full load.
+        
+        """
+        open_columns = [column for column, dtype in COLUMN_SCHEMA.items() if dtype == 'category']
+        if not open_columns:
+            return dict(COLUMN_SCHEMA)
+
+        vocabularies = {column: set() for column in open_columns}
+        reader = pd.read_csv(self.file_path, usecols=open_columns, dtype='category', chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                for column in open_columns:
+                    vocabularies[column].update(chunk[column].cat.categories)
+
+        schema = dict(COLUMN_SCHEMA)
+        for column, values in vocabularies.items():
+            schema[column] = pd.CategoricalDtype(sorted(values))
+        logger.info(f"Resolved categorical vocabularies: { {column: len(values) for column, values in vocabularies.items()} }")
+        return schema
+
+    def process_in_chunks(self, chunksize=DEFAULT_CHUNKSIZE, usecols=None):
+        """
+        Validate and preprocess the dataset chunk by chunk without materializing the full frame.
+        Duplicates are detected across chunks; the summary report is logged at the end and
+        kept in self.validation_report.
+        
+        """
+        validator = DataValidator()
+        for chunk in self.stream_data(chunksize=chunksize, usecols=usecols):
+            self.validate_data(chunk, validator=validator)
+            yield self.preprocess_data(chunk)
+        self.validation_report = validator.log_report()
 
-            # Check for duplicate records
-            duplicates = data.duplicated().sum()
-            if duplicates > 0:
-                logger.warning(f"Data contains {duplicates} duplicate records. Consider handling them in preprocessing.")
+    @metrics.instrument()
+    def validate_data(self, data, validator=None):
+        """
+        Validate the loaded dataset by checking for missing values, duplicate entries, and other potential issues.
+        Checks dtypes, value ranges, allowed categories and the date format (see src.data_validation).
+        Pass a shared DataValidator to validate a stream chunk by chunk; its report accumulates
+        across calls. Without one, the report of this frame is logged and returned.
+        
+        """
+        try:
+            logger.info("Starting data validation...")
 
-            # Validate specific columns (e.g., checking that numerical columns contain only valid values)
-            if not pd.api.types.is_numeric_dtype(data['amount']):
-                logger.error("The 'amount' column contains non-numeric values.")
-                raise DataIngestionException("Invalid data type in 'amount' column.")
+            standalone = validator is None
+            if standalone:
+                validator = DataValidator()
+            validator.validate_chunk(data)
 
             logger.info("Data validation completed successfully.")
+            return validator.log_report() if standalone else validator.report()
 
         except Exception as e:
             logger.error(f"An error occurred during data validation: {str(e)}")
             raise DataIngestionException("Failed to validate data.", errors=e)
 
+    @metrics.instrument()
     def preprocess_data(self, data):
         """
         Perform basic preprocessing on the data, including handling missing values and encoding categorical variables.
@@ -91,20 +202,43 @@ class DataIngestion:
             logger.error(f"An error occurred during data preprocessing: {str(e)}")
             raise DataIngestionException("Failed to preprocess data.", errors=e)
 
-    def save_preprocessed_data(self, data, output_path):
+    def save_preprocessed_data(self, data, output_path, file_format='csv'):
         """
         Save the preprocessed data to a specified output path.
+        With file_format='columnar' the path is a directory of memory-mappable .npy columns (see src.data_store).
         
         """
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            data.to_csv(output_path, index=False)
+            if file_format == 'columnar':
+                write_columnar(data, output_path)
+            else:
+                data.to_csv(output_path, index=False)
             logger.info(f"Preprocessed data saved to {output_path}")
 
         except Exception as e:
             logger.error(f"An error occurred while saving preprocessed data: {str(e)}")
             raise DataIngestionException("Failed to save preprocessed data.", errors=e)
 
+    def save_preprocessed_chunks(self, chunks, output_path):
+        """
+        Save an iterable of preprocessed chunks to a single CSV file, writing the header once.
+        
+        """
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            total_rows = 0
+            for i, chunk in enumerate(chunks):
+                chunk.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+                total_rows += len(chunk)
+            logger.info(f"{total_rows} preprocessed records saved to {output_path}")
+
+        except DataIngestionException:
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred while saving preprocessed chunks: {str(e)}")
+            raise DataIngestionException("Failed to save preprocessed data.", errors=e)
+
 if __name__ == '__main__':
     # Example usage of the DataIngestion class
     try:
@@ -1,10 +1,12 @@
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+import numpy as np
+import pandas as pd
+import copy
+import importlib
 import joblib
+import multiprocessing
+import shutil
+import tempfile
+import time
 import sys
 import os
 
@@ -12,75 +14,524 @@ sys.path.append('../fraud_detection_system')
 
 from src.logger import get_logger
 from src.exception import DataModellingException
+from src.instrumentation import metrics
+from src.model_evaluation import DEFAULT_THRESHOLD, ThresholdSweep, positive_scores
 
 logger = get_logger(__name__)
 
+# Models by name: (module, class, constructor arguments). sklearn is only
+# imported when a model is created, and then only the module of that model.
+MODEL_REGISTRY = {
+    "Logistic Regression": ('sklearn.linear_model', 'LogisticRegression', {'random_state': 42}),
+    "Gradient Boosting": ('sklearn.ensemble', 'GradientBoostingClassifier', {'random_state': 42}),
+    "k-Neighbors Classifier": ('sklearn.neighbors', 'KNeighborsClassifier', {}),
+    "Decision Tree Classifier": ('sklearn.tree', 'DecisionTreeClassifier', {'random_state': 42}),
+    "Random Forest Classifier": ('sklearn.ensemble', 'RandomForestClassifier', {'random_state': 42}),
+    # Models that can be updated incrementally with partial_fit (see incremental_fit)
+    "SGD Classifier": ('sklearn.linear_model', 'SGDClassifier', {'loss': 'log_loss', 'random_state': 42}),
+    "Naive Bayes": ('sklearn.naive_bayes', 'GaussianNB', {})
+}
+DEFAULT_MODELS = ["Logistic Regression", "Gradient Boosting", "k-Neighbors Classifier",
+                  "Decision Tree Classifier", "Random Forest Classifier"]
+# Ensembles that grow by appending estimators fitted on the new batch (warm_start)
+WARM_START_ENSEMBLES = {'RandomForestClassifier', 'ExtraTreesClassifier', 'GradientBoostingClassifier'}
+
+
+def create_model(model_name, **params):
+    """
+    Instantiate a registered model, importing its class on first use.
+    Keyword arguments override the registry's constructor arguments.
+    """
+    if model_name not in MODEL_REGISTRY:
+        raise DataModellingException(f"Unknown model: {model_name}")
+    module_name, class_name, defaults = MODEL_REGISTRY[model_name]
+    model_class = getattr(importlib.import_module(module_name), class_name)
+    return model_class(**{**defaults, **params})
+
+
+def supports_incremental_update(model):
+    """
+    True if incremental_fit can fold a new batch into the model.
+    """
+    if isinstance(model, PriorCorrectedClassifier):
+        model = model.model
+    return hasattr(model, 'partial_fit') or type(model).__name__ in WARM_START_ENSEMBLES
+
+
+def incremental_fit(model, X, y, n_new_estimators=10):
+    """
+    Return a copy of a fitted model updated with one new labeled batch, in time proportional
+    to the batch: partial_fit for SGD and naive Bayes models, or n_new_estimators extra trees
+    or boosting stages fitted on the batch for warm-startable ensembles.
+    The given model is left untouched, so it can keep serving (or stay memory-mapped).
+    A PriorCorrectedClassifier updates its wrapped model on the batch with negatives
+    downsampled at the same rate, so the prior correction still holds.
+    """
+    if not supports_incremental_update(model):
+        raise DataModellingException(f"{type(model).__name__} does not support incremental updates.")
+    if isinstance(model, PriorCorrectedClassifier):
+        X, y, _ = downsample_negatives(X, y, model.negative_rate)
+        return PriorCorrectedClassifier(incremental_fit(model.model, X, y, n_new_estimators=n_new_estimators),
+                                        model.negative_rate)
+    updated = copy.deepcopy(model)
+
+    if hasattr(updated, 'partial_fit'):
+        updated.partial_fit(X, y, classes=getattr(model, 'classes_', None))
+        return updated
+
+    if not np.array_equal(np.unique(y), model.classes_):
+        # New trees must see every class, or their outputs cannot be averaged with the old ones
+        raise DataModellingException(f"Batch must contain every class {model.classes_.tolist()} to append trees.")
+    updated.set_params(warm_start=True, n_estimators=updated.n_estimators + n_new_estimators)
+    updated.fit(X, y)
+    return updated
+
+
+def downsample_negatives(X, y, rate, strata=None, random_state=42):
+    """
+    Keep every positive row and a `rate` fraction of the negative rows, sampled without
+    replacement within each stratum so that the mix of negatives is preserved. strata is an
+    array aligned with X, a column of X, or a list of columns (e.g. the one-hot columns of
+    'type'). Returns the reduced X and y in their original row order, and the effective
+    negative rate (kept negatives / all negatives) for weighting or calibration.
+    """
+    y_values = np.asarray(y)
+    negatives = np.flatnonzero(y_values == 0)
+    if isinstance(strata, (str, list)):
+        columns = [strata] if isinstance(strata, str) else strata
+        strata = pd.util.hash_pandas_object(X[columns], index=False).to_numpy()
+    groups = np.zeros(len(negatives), dtype=np.int64) if strata is None else pd.factorize(np.asarray(strata)[negatives])[0]
+
+    # Shuffle within strata, then keep the first round(rate * size) negatives of each stratum
+    rng = np.random.default_rng(random_state)
+    order = np.lexsort((rng.random(len(negatives)), groups))
+    sorted_groups = groups[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_groups, sorted_groups, side='left')
+    keep_per_group = np.maximum(np.round(np.bincount(groups) * rate), 1).astype(np.int64)
+    kept_negatives = negatives[order[rank < keep_per_group[sorted_groups]]]
+
+    keep = np.sort(np.concatenate([np.flatnonzero(y_values != 0), kept_negatives]))
+    effective_rate = len(kept_negatives) / len(negatives) if len(negatives) else 1.0
+    logger.info(f"Downsampled negatives from {len(negatives)} to {len(kept_negatives)} rows "
+                f"(rate {effective_rate:.4f}); kept all {len(y_values) - len(negatives)} positives.")
+    X_sampled = X.iloc[keep] if hasattr(X, 'iloc') else np.asarray(X)[keep]
+    y_sampled = y.iloc[keep] if hasattr(y, 'iloc') else y_values[keep]
+    return X_sampled, y_sampled, effective_rate
+
+
+class PriorCorrectedClassifier:
+    """
+    Wraps a binary classifier fitted on negatives downsampled at negative_rate and maps its
+    probabilities back to the full class prior: odds are multiplied by negative_rate.
+    Used for estimators whose fit does not accept sample weights.
+    """
+
+    def __init__(self, model, negative_rate):
+        self.model = model
+        self.negative_rate = negative_rate
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        if hasattr(model, 'feature_names_in_'):
+            self.feature_names_in_ = model.feature_names_in_
+
+    def predict_proba(self, X):
+        positive = self.model.predict_proba(X)[:, 1]
+        corrected = self.negative_rate * positive / (self.negative_rate * positive + 1.0 - positive)
+        return np.column_stack([1.0 - corrected, corrected])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+    def __sklearn_tags__(self):
+        # Lets sklearn scorers treat the wrapper as the classifier it wraps
+        return self.model.__sklearn_tags__()
+
+
+def supports_sample_weight(model):
+    import inspect
+
+    return 'sample_weight' in inspect.signature(model.fit).parameters
+
+
+def imbalance_metrics(y_true, scores, min_precision=0.9):
+    """
+    PR-AUC (average precision) and the best recall reachable at precision >= min_precision.
+    """
+    sweep = ThresholdSweep(y_true, scores)
+    return {
+        'average_precision': sweep.average_precision(),
+        'recall_at_precision': sweep.recall_at_precision(min_precision)
+    }
+
+
+def fit_model(model, X_train, y_train, negative_rate=None, correction='calibration'):
+    """
+    Fit a model, correcting for negatives downsampled at negative_rate (see evaluate_model).
+    Returns the fitted model, wrapped in a PriorCorrectedClassifier when prior-corrected.
+    """
+    fit_params, calibrate = {}, False
+    if negative_rate and negative_rate < 1:
+        if correction == 'weights' and supports_sample_weight(model):
+            fit_params['sample_weight'] = np.where(np.asarray(y_train) == 0, 1.0 / negative_rate, 1.0)
+        else:
+            calibrate = True
+    model.fit(X_train, y_train, **fit_params)
+    return PriorCorrectedClassifier(model, negative_rate) if calibrate else model
+
+
+def evaluate_model(model_name, model, X_train, y_train, X_test, y_test, negative_rate=None, correction='calibration',
+                   min_precision=0.9):
+    """
+    Fit one model and evaluate it on the test split, returning its results entry.
+    If the training negatives were downsampled at negative_rate, the model's probabilities
+    are prior-corrected (correction='calibration', see PriorCorrectedClassifier), or it is
+    fitted with negative sample weights of 1 / negative_rate (correction='weights', when its
+    fit accepts them). Prior correction keeps the ranking quality of tree models better,
+    since weighted negatives coarsen their leaf probabilities.
+    The model scores the test split once; accuracy, the classification report and the
+    confusion matrix (at the default threshold), PR-AUC, ROC-AUC and recall at min_precision
+    all come from the ThresholdSweep of those scores, which is kept in the entry ('sweep')
+    for threshold and cost analysis without further inference.
+    """
+    logger.info(f"Training {model_name}...")
+    with metrics.stage('fit', rows=len(X_train), model=model_name):
+        model = fit_model(model, X_train, y_train, negative_rate=negative_rate, correction=correction)
+    with metrics.stage('predict', rows=len(X_test), model=model_name):
+        scores, threshold = positive_scores(model, X_test)
+
+    sweep = ThresholdSweep(y_test, scores, positive_label=model.classes_[1])
+    evaluation = sweep.summary(threshold, min_precision=min_precision)
+
+    logger.info(f"{model_name} completed with accuracy: {evaluation['accuracy']:.4f}")
+    logger.info(f"{model_name} PR-AUC: {evaluation['average_precision']:.4f}, ROC-AUC: {evaluation['roc_auc']:.4f}, "
+                f"recall at precision {min_precision}: {evaluation['recall_at_precision']:.4f}")
+    logger.info(f"Classification Report for {model_name}:\n{evaluation['classification_report']}")
+    logger.info(f"Confusion Matrix for {model_name}:\n{evaluation['confusion_matrix']}\n")
+
+    return {
+        'model': model,
+        **evaluation,
+        'threshold': threshold,
+        'sweep': sweep,
+        'train_rows': len(X_train),
+        'negative_rate': negative_rate
+    }
+
+
+def _fold_scores(model, X, y, train_index, test_index, negative_rate=None, strata=None, correction='calibration'):
+    """
+    Fit a clone of the model on one cross-validation fold and score its held-out rows once.
+    Returns (scores, default threshold, positive label, stage metrics of the fold).
+    """
+    from sklearn.base import clone
+
+    take = (lambda data, rows: data.iloc[rows]) if hasattr(X, 'iloc') else (lambda data, rows: np.asarray(data)[rows])
+    with metrics.capture() as snapshot:
+        X_train, y_train = take(X, train_index), np.asarray(y)[train_index]
+        rate = None
+        if negative_rate and negative_rate < 1:
+            if strata is not None and not isinstance(strata, (str, list)):
+                strata = np.asarray(strata)[train_index]
+            X_train, y_train, rate = downsample_negatives(X_train, y_train, negative_rate, strata=strata)
+        fitted = fit_model(clone(model), X_train, y_train, negative_rate=rate, correction=correction)
+        scores, threshold = positive_scores(fitted, take(X, test_index))
+    return scores, threshold, fitted.classes_[1], snapshot
+
+
+def _aligned_costs(cost, index):
+    # Costs given as a Series over X (e.g. transaction amounts) are aligned with the scored rows
+    if isinstance(cost, pd.Series) and index is not None:
+        return cost.loc[index].to_numpy()
+    return cost
+
+
+def _train_worker(model_name, model, data_dir, feature_names, result_path, evaluation_options=None):
+    """
+    Process-pool entry point: open the shared splits memory-mapped, train and evaluate one
+    model and dump its results entry (or the error) to result_path, with the stage
+    metrics of the worker under 'metrics'.
+    """
+    metrics.reset()
+    try:
+        X_train = pd.DataFrame(np.load(os.path.join(data_dir, 'X_train.npy'), mmap_mode='r'), columns=feature_names, copy=False)
+        X_test = pd.DataFrame(np.load(os.path.join(data_dir, 'X_test.npy'), mmap_mode='r'), columns=feature_names, copy=False)
+        y_train = np.load(os.path.join(data_dir, 'y_train.npy'), mmap_mode='r')
+        y_test = np.load(os.path.join(data_dir, 'y_test.npy'), mmap_mode='r')
+        result = evaluate_model(model_name, model, X_train, y_train, X_test, y_test, **(evaluation_options or {}))
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    result['metrics'] = metrics.snapshot()
+    joblib.dump(result, result_path)
+
+
+def model_cpu_cost(model, cpu_budget):
+    """
+    Number of cores a model will occupy while fitting, from its own n_jobs setting.
+    """
+    n_jobs = getattr(model, 'n_jobs', None)
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(cpu_budget + 1 + n_jobs, 1)
+    return min(max(n_jobs, 1), cpu_budget)
+
+
 class DataModelling:
-    def __init__(self, models=None):
+    def __init__(self, models=None, selection_metric='accuracy'):
         """
-        Initialize the DataModelling class with a dictionary of models.
-        If no models are provided, use the default set of classification models.
+        Initialize the DataModelling class with a dictionary of models, or a list of
+        MODEL_REGISTRY names. If no models are provided, use the default set of
+        classification models, created on first access of self.models.
+        selection_metric is the results entry used to pick the best model, e.g.
+        'average_precision' (PR-AUC) or 'recall_at_precision' for imbalanced data.
         """
-        self.models = models if models else self.get_default_models()
+        if models and not isinstance(models, dict):
+            models = {model_name: create_model(model_name) for model_name in models}
+        self._models = models
+        self.selection_metric = selection_metric
         self.results = {}
+        self.cv_results = {}
+        self.test_index = None
+
+    @property
+    def models(self):
+        if not self._models:
+            self._models = self.get_default_models()
+        return self._models
+
+    @models.setter
+    def models(self, models):
+        self._models = models
 
     def get_default_models(self):
         """
         Return a dictionary of default classification models.
         """
-        return {
-            "Logistic Regression": LogisticRegression(random_state=42),
-            "Gradient Boosting": GradientBoostingClassifier(random_state=42),
-            "k-Neighbors Classifier": KNeighborsClassifier(),
-            "Decision Tree Classifier": DecisionTreeClassifier(random_state=42),
-            "Random Forest Classifier": RandomForestClassifier(random_state=42)
-        }
+        return {model_name: create_model(model_name) for model_name in DEFAULT_MODELS}
+
+    def tune_models(self, X, y, budget_seconds=None, budget_type='wall', n_candidates=50, scoring='accuracy', **search_options):
+        """
+        Search hyperparameters for the models in self.models with successive halving
+        (see src.hyperparameter_search) and replace each model with its best configuration.
+        Returns the {model name: (params, score, rows)} summary of the search.
+        """
+        from sklearn.base import clone
+        from src.hyperparameter_search import HyperparameterSearch
+
+        logger.info("Starting hyperparameter search...")
+        search = HyperparameterSearch(self.models, n_candidates=n_candidates, scoring=scoring,
+                                      budget_seconds=budget_seconds, budget_type=budget_type, **search_options)
+        best = search.search(X, y)
+        for model_name, (params, score, rows) in best.items():
+            self.models[model_name] = clone(self.models[model_name]).set_params(**params)
+            logger.info(f"Best {model_name} configuration {params} scored {score:.4f} on {rows} rows.")
+        self.search_history = search.history
+        return best
 
-    def train_and_evaluate_models(self, X, y, test_size=0.2):
+    def train_and_evaluate_models(self, X, y, test_size=0.2, n_workers=1, cpu_budget=None, timeout=None,
+                                  negative_rate=None, strata=None, correction='calibration', min_precision=0.9):
         """
         Train and evaluate all models in the self.models dictionary.
         Store the results for each model including accuracy, classification report, and confusion matrix.
+        With n_workers > 1 the models are trained in parallel worker processes (see train_in_parallel).
+        With negative_rate < 1 the models are trained on all positives and a stratified sample of
+        the negatives of the training split (see downsample_negatives), corrected by prior
+        correction or sample weights; the test split keeps the full class balance. Results also
+        hold PR-AUC and recall at min_precision.
         """
+        from sklearn.model_selection import train_test_split
+
         try:
             logger.info("Starting the training and evaluation of models...")
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+            if strata is not None and not isinstance(strata, (str, list)):
+                # Strata given as an array aligned with X are split along with it
+                X_train, X_test, y_train, y_test, strata, _ = train_test_split(X, y, np.asarray(strata), test_size=test_size,
+                                                                               random_state=42)
+            else:
+                X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+
+            self.test_index = X_test.index if hasattr(X_test, 'index') else None
+            evaluation_options = {'correction': correction, 'min_precision': min_precision}
+            if negative_rate and negative_rate < 1:
+                X_train, y_train, evaluation_options['negative_rate'] = downsample_negatives(X_train, y_train, negative_rate, strata=strata)
+
+            if n_workers and n_workers > 1:
+                return self.train_in_parallel(X_train, X_test, y_train, y_test, n_workers=n_workers,
+                                              cpu_budget=cpu_budget, timeout=timeout, evaluation_options=evaluation_options)
 
             for model_name, model in self.models.items():
-                logger.info(f"Training {model_name}...")
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-
-                accuracy = accuracy_score(y_test, y_pred)
-                report = classification_report(y_test, y_pred)
-                confusion = confusion_matrix(y_test, y_pred)
-
-                logger.info(f"{model_name} completed with accuracy: {accuracy:.4f}")
-                logger.info(f"Classification Report for {model_name}:\n{report}")
-                logger.info(f"Confusion Matrix for {model_name}:\n{confusion}\n")
-
-                self.results[model_name] = {
-                    'model': model,
-                    'accuracy': accuracy,
-                    'classification_report': report,
-                    'confusion_matrix': confusion
-                }
+                self.results[model_name] = evaluate_model(model_name, model, X_train, y_train, X_test, y_test, **evaluation_options)
 
             return self.results
 
+        except DataModellingException:
+            raise
         except Exception as e:
             logger.error(f"An error occurred during model training and evaluation: {str(e)}")
             raise DataModellingException("Failed to train and evaluate models.", errors=e)
 
+    def train_in_parallel(self, X_train, X_test, y_train, y_test, n_workers=None, cpu_budget=None, timeout=None,
+                          evaluation_options=None):
+        """
+        Train every model in its own worker process, at most n_workers at a time.
+        The splits are written once as .npy files and memory-mapped by each worker instead of
+        being pickled to it. A model is only started while the cores claimed by running models,
+        counting each estimator's own n_jobs, fit within cpu_budget. Models still running after
+        `timeout` seconds are terminated. Once all models are done, failed or timed-out models
+        raise DataModellingException with their errors; the others are kept in self.results.
+        """
+        cpu_budget = cpu_budget or os.cpu_count() or 1
+        n_workers = n_workers or cpu_budget
+        data_dir = tempfile.mkdtemp(prefix='fraud_models_')
+
+        try:
+            feature_names = list(X_train.columns) if hasattr(X_train, 'columns') else None
+            np.save(os.path.join(data_dir, 'X_train.npy'), np.ascontiguousarray(X_train, dtype=np.float64))
+            np.save(os.path.join(data_dir, 'X_test.npy'), np.ascontiguousarray(X_test, dtype=np.float64))
+            np.save(os.path.join(data_dir, 'y_train.npy'), np.asarray(y_train))
+            np.save(os.path.join(data_dir, 'y_test.npy'), np.asarray(y_test))
+
+            pending = list(self.models.items())
+            running = {}
+            failures = {}
+            used_cpus = 0
+            context = multiprocessing.get_context()
+
+            while pending or running:
+                # Start as many pending models as the worker and CPU budgets allow
+                while pending and len(running) < n_workers:
+                    model_name, model = pending[0]
+                    cost = model_cpu_cost(model, cpu_budget)
+                    if running and used_cpus + cost > cpu_budget:
+                        break
+                    pending.pop(0)
+                    result_path = os.path.join(data_dir, f"result_{len(running)}_{time.time_ns()}.pkl")
+                    process = context.Process(target=_train_worker, args=(model_name, model, data_dir, feature_names, result_path, evaluation_options))
+                    process.start()
+                    running[model_name] = (process, result_path, cost, time.monotonic())
+                    used_cpus += cost
+                    logger.info(f"Started {model_name} in worker process {process.pid} ({cost} CPU).")
+
+                time.sleep(0.05)
+                for model_name, (process, result_path, cost, started) in list(running.items()):
+                    if process.is_alive():
+                        if timeout is not None and time.monotonic() - started > timeout:
+                            process.terminate()
+                            process.join()
+                            failures[model_name] = f"exceeded the {timeout}s timeout and was terminated"
+                            logger.error(f"{model_name} exceeded the {timeout}s timeout and was terminated.")
+                        else:
+                            continue
+                    else:
+                        process.join()
+                        result = joblib.load(result_path) if os.path.exists(result_path) else {'error': f"worker exited with code {process.exitcode}"}
+                        metrics.merge(result.pop('metrics', None))
+                        if 'error' in result:
+                            failures[model_name] = result['error']
+                            logger.error(f"{model_name} failed: {result['error']}")
+                        else:
+                            self.results[model_name] = result
+                            self.models[model_name] = result['model']
+                            logger.info(f"{model_name} completed with accuracy: {result['accuracy']:.4f}")
+                    del running[model_name]
+                    used_cpus -= cost
+
+            if failures:
+                raise DataModellingException(f"Failed to train models: {', '.join(failures)}", errors=failures)
+            return self.results
+
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    def cross_validate(self, X, y, n_splits=5, n_jobs=-1, negative_rate=None, strata=None, correction='calibration',
+                       min_precision=0.9):
+        """
+        Stratified k-fold evaluation of every model in self.models. All (model, fold) fits run
+        in parallel joblib workers (n_jobs, all cores by default), and each fold is scored once.
+        The out-of-fold scores of a model give one ThresholdSweep over all rows of X; its
+        summary, the per-fold PR-AUC and the scores are stored in self.cv_results.
+        """
+        from joblib import Parallel, delayed
+        from sklearn.model_selection import StratifiedKFold
+
+        try:
+            y_values = np.asarray(y)
+            folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42).split(np.zeros(len(y_values)), y_values))
+            tasks = [(model_name, fold) for model_name in self.models for fold in range(n_splits)]
+            logger.info(f"Cross-validating {len(self.models)} models on {n_splits} folds ({len(tasks)} fits)...")
+            with metrics.stage('cross_validate', rows=len(y_values) * len(self.models)):
+                fold_results = Parallel(n_jobs=n_jobs)(
+                    delayed(_fold_scores)(self.models[model_name], X, y_values, *folds[fold], negative_rate=negative_rate,
+                                          strata=strata, correction=correction)
+                    for model_name, fold in tasks)
+            # The fits ran in joblib workers, whose stage metrics come back with the scores
+            for *_, snapshot in fold_results:
+                metrics.merge(snapshot)
+
+            for model_name in self.models:
+                scores = np.empty(len(y_values))
+                fold_average_precision = []
+                for (task_model, fold), (fold_scores, threshold, positive_label, _) in zip(tasks, fold_results):
+                    if task_model != model_name:
+                        continue
+                    test_index = folds[fold][1]
+                    scores[test_index] = fold_scores
+                    fold_average_precision.append(ThresholdSweep(y_values[test_index], fold_scores, positive_label).average_precision())
+                sweep = ThresholdSweep(y_values, scores, positive_label=positive_label)
+                self.cv_results[model_name] = {
+                    **sweep.summary(threshold, min_precision=min_precision),
+                    'fold_average_precision': fold_average_precision,
+                    'threshold': threshold,
+                    'scores': scores,
+                    'sweep': sweep
+                }
+                logger.info(f"{model_name} cross-validated PR-AUC: {self.cv_results[model_name]['average_precision']:.4f} "
+                            f"(folds: {', '.join(f'{value:.4f}' for value in fold_average_precision)})")
+            return self.cv_results
+
+        except Exception as e:
+            logger.error(f"An error occurred during cross-validation: {str(e)}")
+            raise DataModellingException("Failed to cross-validate models.", errors=e)
+
+    def optimal_thresholds(self, fn_cost, fp_cost, tp_cost=0.0, tn_cost=0.0, cross_validated=False):
+        """
+        Cost-minimizing decision threshold of every evaluated model, read from the cached
+        ThresholdSweeps of its test split (or out-of-fold scores), so new business costs
+        need no inference. Costs are scalars, or Series over the rows of X such as the
+        amount lost per missed fraud. Returns {model name: ThresholdSweep.optimal_threshold}.
+        """
+        results = self.cv_results if cross_validated else self.results
+        if not results:
+            raise DataModellingException("No evaluated models to choose thresholds for.")
+        index = None if cross_validated else self.test_index
+        costs = {name: _aligned_costs(cost, index) for name, cost in
+                 (('fn_cost', fn_cost), ('fp_cost', fp_cost), ('tp_cost', tp_cost), ('tn_cost', tn_cost))}
+        thresholds = {}
+        for model_name, result in results.items():
+            thresholds[model_name] = result['sweep'].optimal_threshold(**costs)
+            logger.info(f"{model_name}: cost-optimal threshold {thresholds[model_name]['threshold']:.4f} "
+                        f"with cost {thresholds[model_name]['cost']:.2f}")
+        return thresholds
+
+    def best_model_name(self):
+        """
+        Name of the best trained model by self.selection_metric.
+        """
+        if not self.results:
+            raise DataModellingException("No trained models to select from.")
+        return max(self.results, key=lambda name: self.results[name].get(self.selection_metric, float('-inf')))
+
     def save_best_model(self, model_path='../fraud_detection_system/models/fraud_detection_model.pkl'):
         """
-        Save the best model based on accuracy to the specified file path.
+        Save the best model by self.selection_metric (accuracy by default) to the specified file path.
         """
         try:
-            # Identify the best model based on accuracy
-            best_model_name = max(self.results, key=lambda name: self.results[name]['accuracy'])
+            # Identify the best model based on the selection metric (accuracy by default)
+            best_model_name = self.best_model_name()
             best_model = self.results[best_model_name]['model']
 
-            logger.info(f"Best model identified: {best_model_name} with accuracy: {self.results[best_model_name]['accuracy']:.4f}")
+            logger.info(f"Best model identified: {best_model_name} with {self.selection_metric}: "
+                        f"{self.results[best_model_name][self.selection_metric]:.4f}")
 
             # Ensure the directory exists
             directory = os.path.dirname(model_path)
@@ -97,13 +548,126 @@ class DataModelling:
             logger.error(f"An error occurred while saving the best model: {str(e)}")
             raise DataModellingException("Failed to save the best model.", errors=e)
 
-    def load_model(self, model_path):
+    def register_best_model(self, registry, name, transformer=None, data_fingerprint=None, compile_model=False, promote=True,
+                            costs=None, reference_data=None, training_key=None):
+        """
+        Store the best model by self.selection_metric as a new version in a ModelRegistry, with its
+        FeatureTransformer, test metrics and data fingerprint, and return the version number.
+        With costs (keyword arguments of optimal_thresholds), the cost-optimal decision threshold
+        is recorded in the metrics as well. With reference_data (raw training transactions), a
+        drift profile of the data and of the model's test scores is stored for monitoring.
+        training_key is recorded in the version metadata (see ModelRegistry.register).
+        """
+        try:
+            best_model_name = self.best_model_name()
+            result = self.results[best_model_name]
+            metrics = {'model_name': best_model_name, 'accuracy': float(result['accuracy']),
+                       'confusion_matrix': np.asarray(result['confusion_matrix']).tolist(),
+                       'selection_metric': self.selection_metric}
+            for metric in ('average_precision', 'roc_auc', 'recall_at_precision', 'negative_rate', 'train_rows'):
+                if result.get(metric) is not None:
+                    metrics[metric] = float(result[metric])
+            # Serving and batch scoring flag transactions at the recorded decision threshold
+            metrics['decision_threshold'] = {'threshold': float(result.get('threshold', DEFAULT_THRESHOLD))}
+            if costs:
+                metrics['decision_threshold'] = self.optimal_thresholds(**costs)[best_model_name]
+            threshold = metrics['decision_threshold']['threshold']
+            drift_profile = None
+            if reference_data is not None:
+                from src.drift_monitoring import DriftMonitor
+                scores = result['sweep'].sorted_scores if 'sweep' in result else None
+                drift_profile = DriftMonitor.fit(reference_data, scores=scores, threshold=threshold)
+            return registry.register(name, result['model'], transformer=transformer, metrics=metrics,
+                                     data_fingerprint=data_fingerprint, compile_model=compile_model, promote=promote,
+                                     drift_profile=drift_profile, training_key=training_key)
+
+        except Exception as e:
+            logger.error(f"An error occurred while registering the best model: {str(e)}")
+            raise DataModellingException("Failed to register the best model.", errors=e)
+
+    def update_registered_model(self, registry, name, X, y, validation_data=None, validation_fraction=0.2,
+                                scoring='accuracy', max_degradation=0.005, n_new_estimators=10, promote=True):
+        """
+        Fold a new labeled batch of features into the promoted version of a registry model.
+        A holdout of the batch (or validation_data=(X_val, y_val)) is scored with the current
+        and the updated model. The update is registered as a new version either way, and is
+        promoted only if it scores no more than max_degradation below the current model.
+        Returns {'version', 'parent_version', 'promoted', 'score_before', 'score_after', 'rows'}.
+        """
+        from sklearn.metrics import get_scorer
+        from sklearn.model_selection import train_test_split
+
+        try:
+            current = registry.load(name)
+            if validation_data is None:
+                X, X_val, y, y_val = train_test_split(X, y, test_size=validation_fraction, random_state=42)
+            else:
+                X_val, y_val = validation_data
+
+            start = time.perf_counter()
+            with metrics.stage('incremental_fit', rows=len(X), model=name):
+                updated = incremental_fit(current.model, X, y, n_new_estimators=n_new_estimators)
+            fit_seconds = time.perf_counter() - start
+
+            scorer = get_scorer(scoring)
+            score_before = float(scorer(current.model, X_val, y_val))
+            score_after = float(scorer(updated, X_val, y_val))
+            passed = score_after >= score_before - max_degradation
+            logger.info(f"Incremental update of {name} v{current.version} on {len(X)} rows took {fit_seconds:.2f}s: "
+                        f"{scoring} {score_before:.4f} -> {score_after:.4f} on {len(y_val)} validation rows.")
+
+            update_metrics = {
+                'model_name': current.meta.get('metrics', {}).get('model_name'),
+                scoring: score_after,
+                'validation': {'scoring': scoring, 'score_before': score_before, 'score_after': score_after,
+                               'rows': int(len(y_val)), 'passed': passed},
+                'update_rows': int(len(X))
+            }
+            # The update keeps the parent's decision threshold and drift reference
+            if 'decision_threshold' in current.meta.get('metrics', {}):
+                update_metrics['decision_threshold'] = current.meta['metrics']['decision_threshold']
+            version = registry.register(name, updated, transformer=current.transformer, metrics=update_metrics,
+                                        data_fingerprint=current.meta.get('data_fingerprint'),
+                                        parent_version=current.version, promote=promote and passed,
+                                        drift_profile=current.drift_profile)
+            if not passed:
+                logger.warning(f"{name} version {version} failed validation and was not promoted.")
+            return {'version': version, 'parent_version': current.version, 'promoted': promote and passed,
+                    'score_before': score_before, 'score_after': score_after, 'rows': int(len(X))}
+
+        except DataModellingException:
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred while updating the model incrementally: {str(e)}")
+            raise DataModellingException("Failed to update the model incrementally.", errors=e)
+
+    def export_compiled_model(self, output_dir, model=None):
+        """
+        Compile a fitted tree model (the best model by default) into flat NumPy node arrays
+        for fast batched inference (see src.tree_compiler).
+        """
+        from src.tree_compiler import CompiledTreeEnsemble
+
+        try:
+            if model is None:
+                model = self.results[self.best_model_name()]['model']
+
+            compiled = CompiledTreeEnsemble.from_model(model)
+            compiled.save(output_dir)
+            return compiled
+
+        except Exception as e:
+            logger.error(f"An error occurred while exporting the compiled model: {str(e)}")
+            raise DataModellingException("Failed to export the compiled model.", errors=e)
+
+    def load_model(self, model_path, mmap_mode=None):
         """
         Load a pre-trained model from the specified file path.
+        With mmap_mode='r' the model's arrays are memory-mapped instead of read into memory.
         """
         try:
             logger.info(f"Loading model from {model_path}...")
-            model = joblib.load(model_path)
+            model = joblib.load(model_path, mmap_mode=mmap_mode)
             logger.info("Model loaded successfully.")
             return model
 
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataStoreException
+
+logger = get_logger(__name__)
+
+SCHEMA_FILE = 'schema.json'
+FORMAT_VERSION = 1
+
+
+def fingerprint_file(file_path, block_size=1 << 20):
+    """
+    Return the SHA-256 hex digest of a file's content, read in fixed-size blocks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_dataset(raw_path, config=None):
+    """
+    Return a key identifying a processed dataset: the raw input content plus the
+    feature-engineering config that produced it.
+    """
+    payload = {
+        'format_version': FORMAT_VERSION,
+        'raw': fingerprint_file(raw_path),
+        'config': config or {}
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def _write_column(series, tmp_dir, prefix):
+    """
+    Save one column as a fixed-width .npy array and return its schema entry.
+    """
+    entry = {'file': f"{prefix}.npy"}
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        entry['kind'] = 'category'
+        entry['categories'] = f"{prefix}_categories.npy"
+        np.save(os.path.join(tmp_dir, entry['file']), series.cat.codes.to_numpy())
+        np.save(os.path.join(tmp_dir, entry['categories']), series.cat.categories.to_numpy(dtype=str))
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        entry['kind'] = 'datetime'
+        np.save(os.path.join(tmp_dir, entry['file']), series.to_numpy(dtype='datetime64[ns]'))
+    elif pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+        entry['kind'] = 'numeric'
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            # Nullable dtypes (e.g. Int32) are stored as float64 with NaN and restored on read
+            entry['dtype'] = str(series.dtype)
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            values = series.to_numpy()
+        np.save(os.path.join(tmp_dir, entry['file']), values)
+    else:
+        entry['kind'] = 'string'
+        entry['categories'] = f"{prefix}_categories.npy"
+        codes, uniques = pd.factorize(series)
+        np.save(os.path.join(tmp_dir, entry['file']), codes.astype(np.int32))
+        np.save(os.path.join(tmp_dir, entry['categories']), np.asarray(uniques, dtype=str))
+    return entry
+
+
+def _read_column(artifact_dir, entry, mmap_mode):
+    values = np.load(os.path.join(artifact_dir, entry['file']), mmap_mode=mmap_mode)
+    if entry['kind'] == 'category':
+        categories = np.load(os.path.join(artifact_dir, entry['categories']))
+        return pd.Categorical.from_codes(values, categories=categories)
+    if entry['kind'] == 'string':
+        categories = np.load(os.path.join(artifact_dir, entry['categories'])).astype(object)
+        codes = np.asarray(values)
+        values = np.full(len(codes), None, dtype=object)
+        values[codes >= 0] = categories[codes[codes >= 0]]
+        return values
+    if entry.get('dtype'):
+        return pd.array(np.asarray(values), dtype=entry['dtype'])
+    return values
+
+
+def write_columnar(data, artifact_dir):
+    """
+    Write a DataFrame as one .npy file per column plus a JSON schema.
+    String and categorical columns are stored as integer codes and a vocabulary,
+    so every file is a fixed-width array that can be memory-mapped.
+    The index is stored too: a RangeIndex by its bounds, any other index as columns.
+    The artifact is written to a temporary directory and renamed into place.
+    """
+    parent = os.path.dirname(os.path.abspath(artifact_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        columns = []
+        for i, column in enumerate(data.columns):
+            columns.append({'name': column, **_write_column(data[column], tmp_dir, f"col_{i:04d}")})
+
+        index = data.index
+        if isinstance(index, pd.RangeIndex):
+            index_schema = {'kind': 'range', 'start': index.start, 'stop': index.stop, 'step': index.step,
+                            'name': index.name}
+        else:
+            levels = [{'name': index.names[i], **_write_column(index.get_level_values(i).to_series(), tmp_dir, f"index_{i:02d}")}
+                      for i in range(index.nlevels)]
+            index_schema = {'kind': 'levels', 'levels': levels}
+
+        schema = {'format_version': FORMAT_VERSION, 'num_rows': len(data), 'columns': columns, 'index': index_schema}
+        with open(os.path.join(tmp_dir, SCHEMA_FILE), 'w') as f:
+            json.dump(schema, f, indent=2, default=str)
+
+        if os.path.exists(artifact_dir):
+            shutil.rmtree(artifact_dir)
+        os.rename(tmp_dir, artifact_dir)
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_columnar(artifact_dir, mmap_mode='r'):
+    """
+    Open a columnar artifact as a DataFrame.
+    Numeric, boolean and datetime columns are memory-mapped and not copied.
+    """
+    with open(os.path.join(artifact_dir, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+
+    columns = {entry['name']: _read_column(artifact_dir, entry, mmap_mode) for entry in schema['columns']}
+
+    index_schema = schema.get('index')
+    if index_schema is None or index_schema['kind'] == 'range':
+        index_schema = index_schema or {'start': 0, 'stop': schema['num_rows'], 'step': 1, 'name': None}
+        index = pd.RangeIndex(index_schema['start'], index_schema['stop'], index_schema['step'], name=index_schema['name'])
+    else:
+        levels = [_read_column(artifact_dir, entry, mmap_mode) for entry in index_schema['levels']]
+        names = [entry['name'] for entry in index_schema['levels']]
+        index = pd.Index(levels[0], name=names[0]) if len(levels) == 1 else pd.MultiIndex.from_arrays(levels, names=names)
+
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+class DataStore:
+    def __init__(self, root_dir='../fraud_detection_system/data/processed/store'):
+        """
+        Initialize a store of columnar datasets keyed by content fingerprint.
+        """
+        self.root_dir = root_dir
+        logger.info(f"DataStore initialized at {self.root_dir}")
+
+    def path_for(self, key):
+        """
+        Return the artifact directory for a dataset key.
+        """
+        return os.path.join(self.root_dir, key)
+
+    def exists(self, key):
+        """
+        Check whether a complete artifact is stored under the key.
+        """
+        return os.path.exists(os.path.join(self.path_for(key), SCHEMA_FILE))
+
+    def save(self, data, key):
+        """
+        Save a DataFrame under the key and return the artifact directory.
+        """
+        try:
+            artifact_dir = self.path_for(key)
+            write_columnar(data, artifact_dir)
+            logger.info(f"Dataset with {data.shape[0]} records saved to {artifact_dir}")
+            return artifact_dir
+
+        except Exception as e:
+            logger.error(f"An error occurred while saving dataset {key}: {str(e)}")
+            raise DataStoreException(f"Failed to save dataset {key}.", errors=e)
+
+    def load(self, key, mmap_mode='r'):
+        """
+        Load the dataset stored under the key, memory-mapped by default.
+        """
+        try:
+            if not self.exists(key):
+                raise DataStoreException(f"No dataset stored under key {key}")
+
+            data = read_columnar(self.path_for(key), mmap_mode=mmap_mode)
+            logger.info(f"Dataset {key} opened with {data.shape[0]} records and {data.shape[1]} columns.")
+            return data
+
+        except DataStoreException:
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred while loading dataset {key}: {str(e)}")
+            raise DataStoreException(f"Failed to load dataset {key}.", errors=e)
@@ -0,0 +1,274 @@
+import math
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataIngestionException
+
+logger = get_logger(__name__)
+
+# Declarative rules for the Datasets.csv schema. 'numeric' columns must have a numeric dtype
+# and lie in [min, max]; 'category' columns must take one of `allowed` (None accepts any
+# value, see DataValidator's allowed_values); 'date' columns must parse with `format`;
+# 'string' columns must match `pattern`. Columns absent from a chunk are skipped.
+VALIDATION_RULES = {
+    'step': {'kind': 'numeric', 'min': 1},
+    'type': {'kind': 'category', 'allowed': ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']},
+    'branch': {'kind': 'category', 'allowed': None},
+    'amount': {'kind': 'numeric', 'min': 0},
+    'nameOrig': {'kind': 'string', 'pattern': r'C\d+'},
+    'oldbalanceOrg': {'kind': 'numeric', 'min': 0},
+    'newbalanceOrig': {'kind': 'numeric', 'min': 0},
+    'nameDest': {'kind': 'string', 'pattern': r'[CM]\d+'},
+    'oldbalanceDest': {'kind': 'numeric', 'min': 0},
+    'newbalanceDest': {'kind': 'numeric', 'min': 0},
+    'unusuallogin': {'kind': 'numeric', 'min': 0},
+    'isFlaggedFraud': {'kind': 'numeric', 'allowed': [0, 1]},
+    'Acct type': {'kind': 'category', 'allowed': ['Current', 'Savings']},
+    'Date of transaction': {'kind': 'date', 'format': '%d/%m/%Y'},
+    'Time of day': {'kind': 'category', 'allowed': ['Afternoon', 'Morning', 'Night']},
+    'isFraud': {'kind': 'numeric', 'allowed': [0, 1]}
+}
+
+# Number of offending values kept per rule as examples in the report
+MAX_EXAMPLES = 5
+
+
+class SortedRunKeySet:
+    def __init__(self):
+        """
+        Exact set of 64-bit row hashes stored as sorted uint64 runs of doubling size
+        (8 bytes per key). Lookups binary-search each of the O(log n) runs, and inserts
+        merge equal-sized runs, so the amortized cost per key is O(log n).
+        """
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self.runs:
+            if not len(run):
+                continue
+            positions = np.minimum(np.searchsorted(run, keys), len(run) - 1)
+            found |= run[positions] == keys
+        return found
+
+    def add(self, keys):
+        """
+        Add sorted, unique keys that are not in the set yet.
+        """
+        if not len(keys):
+            return
+        run = keys
+        while self.runs and len(self.runs[-1]) <= len(run):
+            # Both runs are sorted, so the stable sort degenerates to a linear merge
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind='stable')
+        self.runs.append(run)
+
+
+class BloomKeySet:
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Bloom filter over 64-bit row hashes for inputs too large for an exact key set.
+        Uses m = -n ln(p) / ln(2)^2 bits and k = (m / n) ln(2) probes derived from the two
+        32-bit halves of the hash. Lookups may report false positives at about error_rate,
+        so duplicate counts are upper bounds; there are no false negatives.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.n_bits = max(int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)), 64)
+        self.n_probes = max(int(round(self.n_bits / capacity * math.log(2))), 1)
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, keys):
+        low = keys & np.uint64(0xFFFFFFFF)
+        high = (keys >> np.uint64(32)) | np.uint64(1)
+        probes = np.arange(self.n_probes, dtype=np.uint64)
+        return (low[:, None] + probes[None, :] * high[:, None]) % np.uint64(self.n_bits)
+
+    def contains(self, keys):
+        positions = self._positions(keys)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def add(self, keys):
+        positions = self._positions(keys).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+        self.count += len(keys)
+
+
+class DataValidator:
+    def __init__(self, rules=None, allowed_values=None, key_columns=None, bloom_capacity=None,
+                 bloom_error_rate=0.001, strict=False):
+        """
+        Vectorized, chunk-at-a-time validation of transaction data against declarative rules.
+        Duplicate rows (over key_columns, all columns by default) are detected across chunks
+        through 64-bit row hashes kept in an exact key set, or in a Bloom filter sized for
+        bloom_capacity rows when given. allowed_values overrides the allowed values of
+        category rules, e.g. the branch vocabulary of a fitted FeatureTransformer.
+        Dtype errors always raise; with strict=True any rule violation raises too.
+        """
+        self.rules = {column: dict(rule) for column, rule in (rules or VALIDATION_RULES).items()}
+        for column, values in (allowed_values or {}).items():
+            self.rules.setdefault(column, {'kind': 'category'})['allowed'] = list(values)
+        for rule in self.rules.values():
+            if rule.get('pattern'):
+                rule['regex'] = re.compile(rule['pattern'])
+        self.key_columns = key_columns
+        self.strict = strict
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the counts and the seen row keys, to validate a new input from scratch.
+        """
+        if self.bloom_capacity:
+            self.seen = BloomKeySet(self.bloom_capacity, error_rate=self.bloom_error_rate)
+        else:
+            self.seen = SortedRunKeySet()
+        self.rows = 0
+        self.chunks = 0
+        self.missing = {}
+        self.duplicates = 0
+        self.violations = {}
+        self.errors = []
+
+    def _record_violation(self, column, check, count, examples):
+        if not count:
+            return
+        entry = self.violations.setdefault((column, check), {'count': 0, 'examples': []})
+        entry['count'] += int(count)
+        for value in examples:
+            if len(entry['examples']) >= MAX_EXAMPLES:
+                break
+            value = value.item() if hasattr(value, 'item') else value
+            if value not in entry['examples']:
+                entry['examples'].append(value)
+
+    def _check_unique_values(self, column, check, series, is_valid):
+        """
+        Evaluate is_valid on the distinct non-null values of a column only and count the
+        rows holding an invalid one, so string checks cost O(distinct values).
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+        else:
+            codes, uniques = pd.factorize(series)
+        if not len(uniques):
+            return
+        valid = np.asarray(is_valid(pd.Index(uniques)), dtype=bool)
+        if valid.all():
+            return
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        invalid = ~valid & (counts > 0)
+        self._record_violation(column, check, counts[invalid].sum(), np.asarray(uniques)[invalid][:MAX_EXAMPLES])
+
+    def _check_numeric(self, column, series, rule):
+        if not (pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)):
+            self.errors.append(f"Column '{column}' has non-numeric dtype {series.dtype}.")
+            return
+        values = series.to_numpy()
+        if 'allowed' in rule and rule['allowed'] is not None:
+            bad = ~np.isin(values, rule['allowed']) & ~pd.isna(values)
+            self._record_violation(column, 'allowed', bad.sum(), values[bad][:MAX_EXAMPLES])
+        if rule.get('min') is not None:
+            bad = values < rule['min']
+            self._record_violation(column, 'min', bad.sum(), values[bad][:MAX_EXAMPLES])
+        if rule.get('max') is not None:
+            bad = values > rule['max']
+            self._record_violation(column, 'max', bad.sum(), values[bad][:MAX_EXAMPLES])
+
+    def _check_column(self, column, series, rule):
+        kind = rule['kind']
+        if kind == 'numeric':
+            self._check_numeric(column, series, rule)
+            return
+        if pd.api.types.is_numeric_dtype(series.dtype) and not series.isna().all():
+            self.errors.append(f"Column '{column}' has numeric dtype {series.dtype}, expected {kind} values.")
+            return
+        if kind == 'category' and rule.get('allowed') is not None:
+            allowed = set(rule['allowed'])
+            self._check_unique_values(column, 'allowed', series, lambda uniques: uniques.isin(allowed))
+        elif kind == 'date':
+            date_format = rule['format']
+            self._check_unique_values(column, 'format', series,
+                                      lambda uniques: pd.to_datetime(uniques, format=date_format, errors='coerce').notna())
+        elif kind == 'string' and 'regex' in rule:
+            regex = rule['regex']
+            self._check_unique_values(column, 'pattern', series,
+                                      lambda uniques: [bool(regex.fullmatch(str(value))) for value in uniques])
+
+    def _count_duplicates(self, data):
+        keys = np.sort(pd.util.hash_pandas_object(data[self.key_columns] if self.key_columns else data, index=False).to_numpy())
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        unique_keys = keys[first]
+        repeated_in_chunk = len(keys) - len(unique_keys)
+        seen_before = self.seen.contains(unique_keys)
+        self.seen.add(unique_keys[~seen_before])
+        # Every occurrence after a key's first one is a duplicate: repeats within the chunk,
+        # plus the first occurrence in this chunk of keys already seen in earlier chunks
+        return repeated_in_chunk + int(seen_before.sum())
+
+    def validate_chunk(self, data):
+        """
+        Validate one chunk and add its counts to the running report.
+        Raises DataIngestionException on dtype errors (and on any violation when strict).
+        """
+        errors_before = len(self.errors)
+        violations_before = sum(entry['count'] for entry in self.violations.values())
+
+        for column, count in data.isna().sum().items():
+            if count:
+                self.missing[column] = self.missing.get(column, 0) + int(count)
+        for column, rule in self.rules.items():
+            if column in data.columns:
+                self._check_column(column, data[column], rule)
+        self.duplicates += self._count_duplicates(data)
+        self.rows += len(data)
+        self.chunks += 1
+
+        if len(self.errors) > errors_before:
+            raise DataIngestionException(f"Invalid data types: {'; '.join(self.errors[errors_before:])}")
+        if self.strict and sum(entry['count'] for entry in self.violations.values()) > violations_before:
+            raise DataIngestionException(f"Data violates validation rules: {self.report()['violations']}")
+
+    def report(self):
+        """
+        Summary of everything validated so far.
+        """
+        return {
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'missing_values': dict(self.missing),
+            'duplicates': self.duplicates,
+            'duplicates_exact': isinstance(self.seen, SortedRunKeySet),
+            'violations': [{'column': column, 'check': check, **entry} for (column, check), entry in self.violations.items()],
+            'errors': list(self.errors)
+        }
+
+    def log_report(self):
+        report = self.report()
+        missing = sum(report['missing_values'].values())
+        if missing > 0:
+            logger.warning(f"Data contains {missing} missing values. Consider handling them in preprocessing.")
+        if report['duplicates'] > 0:
+            qualifier = '' if report['duplicates_exact'] else ' (upper bound, Bloom filter)'
+            logger.warning(f"Data contains {report['duplicates']} duplicate records{qualifier}. Consider handling them in preprocessing.")
+        for violation in report['violations']:
+            logger.warning(f"{violation['count']} values of '{violation['column']}' fail the {violation['check']} check, "
+                           f"e.g. {violation['examples']}")
+        return report
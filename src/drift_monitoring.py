@@ -0,0 +1,376 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import ScoringException
+
+logger = get_logger(__name__)
+
+# Raw transaction columns tracked by default, and the name of the model score sketch
+NUMERIC_COLUMNS = ['amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
+CATEGORICAL_COLUMNS = ['type', 'branch']
+SCORE_FEATURE = 'fraud_score'
+
+# Batches smaller than this are binned in pure Python, which beats NumPy's per-call overhead;
+# their bin indices are buffered and added to the counts in one bincount per PENDING_LIMIT
+SMALL_BATCH = 16
+PENDING_LIMIT = 4096
+# Floor on bin shares in PSI, so empty bins do not make it infinite
+PSI_EPSILON = 1e-4
+# Common PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_ALERT = 0.25
+
+
+def _psi(current, reference):
+    if current.sum() == 0 or reference.sum() == 0:
+        return None
+    p = np.maximum(current / current.sum(), PSI_EPSILON)
+    q = np.maximum(reference / reference.sum(), PSI_EPSILON)
+    return float(np.sum((p - q) * np.log(p / q)))
+
+
+class NumericSketch:
+    def __init__(self, edges, psi_bins=10):
+        """
+        Fixed-memory histogram of a numeric stream over bin edges taken from reference
+        quantiles: bin 0 holds values below edges[0], bin i values in [edges[i-1], edges[i]).
+        Counts add up across processes, PSI is computed on psi_bins groups of about equal
+        reference mass and KS is the largest CDF gap over the edges.
+        """
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self._edge_list = self.edges.tolist()
+        self.psi_bins = psi_bins
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.missing = 0
+        self.total = 0.0
+        self._pending = []
+
+    @classmethod
+    def from_values(cls, values, n_bins=100, psi_bins=10):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])) if len(values) else np.empty(0)
+        return cls(edges, psi_bins=psi_bins)
+
+    def empty_like(self):
+        return NumericSketch(self.edges, psi_bins=self.psi_bins)
+
+    def _flush(self):
+        if self._pending:
+            self.counts += np.bincount(self._pending, minlength=len(self.counts))
+            self._pending = []
+
+    @property
+    def count(self):
+        self._flush()
+        return int(self.counts.sum())
+
+    def update(self, values):
+        if len(values) < SMALL_BATCH:
+            edges, pending = self._edge_list, self._pending
+            for value in values:
+                value = math.nan if value is None else float(value)
+                if value != value:
+                    self.missing += 1
+                else:
+                    pending.append(bisect_right(edges, value))
+                    self.total += value
+            if len(pending) >= PENDING_LIMIT:
+                self._flush()
+            return
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        self.missing += int(len(values) - present.sum())
+        values = values[present]
+        self.counts += np.bincount(np.searchsorted(self.edges, values, side='right'), minlength=len(self.counts))
+        self.total += float(values.sum())
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ScoringException("Cannot merge numeric sketches with different bin edges.")
+        self._flush()
+        other._flush()
+        self.counts += other.counts
+        self.missing += other.missing
+        self.total += other.total
+        return self
+
+    def _psi_groups(self, reference):
+        # Group consecutive bins into psi_bins groups of roughly equal reference mass
+        mass = np.cumsum(reference.counts) - reference.counts
+        return np.minimum((mass * self.psi_bins) // max(reference.count, 1), self.psi_bins - 1)
+
+    def compare(self, reference):
+        """
+        PSI and KS statistic of this stream against a reference sketch with the same edges.
+        """
+        self._flush()
+        reference._flush()
+        groups = self._psi_groups(reference)
+        current_groups = np.bincount(groups, weights=self.counts, minlength=self.psi_bins)
+        reference_groups = np.bincount(groups, weights=reference.counts, minlength=self.psi_bins)
+        ks = None
+        if self.count and reference.count:
+            ks = float(np.max(np.abs(np.cumsum(self.counts) / self.count - np.cumsum(reference.counts) / reference.count)))
+        return {'psi': _psi(current_groups, reference_groups), 'ks': ks}
+
+    def summary(self):
+        rows = self.count + self.missing
+        return {'count': self.count, 'missing_rate': self.missing / rows if rows else 0.0,
+                'mean': self.total / self.count if self.count else None}
+
+    def to_dict(self):
+        self._flush()
+        return {'kind': 'numeric', 'edges': self._edge_list, 'psi_bins': self.psi_bins,
+                'counts': self.counts.tolist(), 'missing': self.missing, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state['edges'], psi_bins=state['psi_bins'])
+        sketch.counts[:] = state['counts']
+        sketch.missing = state['missing']
+        sketch.total = state['total']
+        return sketch
+
+
+class CategoricalSketch:
+    def __init__(self, categories):
+        """
+        Count table over a fixed category vocabulary plus one bucket for unseen values.
+        """
+        self.categories = [str(category) for category in categories]
+        self._index = {category: i for i, category in enumerate(self.categories)}
+        self.counts = np.zeros(len(self.categories) + 1, dtype=np.int64)
+        self.missing = 0
+        self._pending = []
+
+    @classmethod
+    def from_values(cls, values, max_categories=50):
+        counts = pd.Series(values).dropna().astype(str).value_counts()
+        return cls(counts.index[:max_categories])
+
+    def empty_like(self):
+        return CategoricalSketch(self.categories)
+
+    def _flush(self):
+        if self._pending:
+            self.counts += np.bincount(self._pending, minlength=len(self.counts))
+            self._pending = []
+
+    @property
+    def count(self):
+        self._flush()
+        return int(self.counts.sum())
+
+    def update(self, values):
+        # Record lists from the scoring path are looked up in a dict; only large arrays
+        # are worth the fixed cost of pandas' categorical encoding
+        if isinstance(values, list) or len(values) < SMALL_BATCH:
+            index, other, pending = self._index, len(self.categories), self._pending
+            for value in values:
+                if value is None or value != value:
+                    self.missing += 1
+                else:
+                    pending.append(index.get(value if isinstance(value, str) else str(value), other))
+            if len(pending) >= PENDING_LIMIT:
+                self._flush()
+            return
+        values = pd.Series(values)
+        present = values.notna()
+        self.missing += int(len(values) - present.sum())
+        codes = pd.Categorical(values[present].astype(str), categories=self.categories).codes
+        self.counts += np.bincount(np.where(codes < 0, len(self.categories), codes), minlength=len(self.counts))
+
+    def merge(self, other):
+        if self.categories != other.categories:
+            raise ScoringException("Cannot merge categorical sketches with different vocabularies.")
+        self._flush()
+        other._flush()
+        self.counts += other.counts
+        self.missing += other.missing
+        return self
+
+    def compare(self, reference):
+        self._flush()
+        reference._flush()
+        return {'psi': _psi(self.counts.astype(np.float64), reference.counts.astype(np.float64)), 'ks': None}
+
+    def summary(self):
+        rows = self.count + self.missing
+        return {'count': self.count, 'missing_rate': self.missing / rows if rows else 0.0,
+                'unseen_rate': float(self.counts[-1] / self.count) if self.count else 0.0}
+
+    def to_dict(self):
+        self._flush()
+        return {'kind': 'categorical', 'categories': self.categories, 'counts': self.counts.tolist(), 'missing': self.missing}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(state['categories'])
+        sketch.counts[:] = state['counts']
+        sketch.missing = state['missing']
+        return sketch
+
+
+SKETCH_KINDS = {'numeric': NumericSketch, 'categorical': CategoricalSketch}
+
+
+class DriftMonitor:
+    def __init__(self, sketches, threshold=0.5):
+        """
+        Streaming monitor of feature and score distributions: one fixed-memory sketch per
+        column (NumericSketch or CategoricalSketch) and one for the model score (SCORE_FEATURE),
+        plus the share of transactions flagged at threshold. A monitor filled with training
+        data is the reference profile saved with a model; serving processes update an
+        empty_like() copy and compare it against the reference. Monitors of several worker
+        processes merge() by adding their counts, and to_dict() states travel as JSON.
+        """
+        self.sketches = sketches
+        self.threshold = threshold
+        self.flagged = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fit(cls, data, scores=None, numeric_columns=None, categorical_columns=None, threshold=0.5,
+            n_bins=100, psi_bins=10, max_categories=50):
+        """
+        Build a reference profile from raw training transactions and, optionally, the model's
+        scores on held-out data.
+        """
+        sketches = {}
+        for column in numeric_columns or NUMERIC_COLUMNS:
+            if column in data.columns:
+                sketches[column] = NumericSketch.from_values(data[column], n_bins=n_bins, psi_bins=psi_bins)
+        for column in categorical_columns or CATEGORICAL_COLUMNS:
+            if column in data.columns:
+                sketches[column] = CategoricalSketch.from_values(data[column], max_categories=max_categories)
+        if scores is not None:
+            sketches[SCORE_FEATURE] = NumericSketch.from_values(scores, n_bins=n_bins, psi_bins=psi_bins)
+        profile = cls(sketches, threshold=threshold)
+        profile.update(data, scores=scores)
+        return profile
+
+    def empty_like(self, threshold=None):
+        """
+        Empty monitor with the same bins, counting flagged transactions at threshold
+        (by default the one of this monitor).
+        """
+        return DriftMonitor({name: sketch.empty_like() for name, sketch in self.sketches.items()},
+                            threshold=self.threshold if threshold is None else threshold)
+
+    @property
+    def scored(self):
+        sketch = self.sketches.get(SCORE_FEATURE)
+        return sketch.count if sketch is not None else 0
+
+    def update(self, data, scores=None):
+        """
+        Add a DataFrame of raw transactions and, optionally, their model scores.
+        """
+        with self._lock:
+            for name, sketch in self.sketches.items():
+                if name in data.columns:
+                    sketch.update(data[name].to_numpy())
+            self._update_scores(scores)
+
+    def update_records(self, records, scores=None):
+        """
+        Add raw transaction records (dicts, as served by the scoring service) and their scores.
+        """
+        with self._lock:
+            for name, sketch in self.sketches.items():
+                if name != SCORE_FEATURE:
+                    sketch.update([record.get(name) for record in records])
+            self._update_scores(scores)
+
+    def _update_scores(self, scores):
+        if scores is None or SCORE_FEATURE not in self.sketches:
+            return
+        if len(scores) < SMALL_BATCH:
+            # Python floats compare and bin much faster than NumPy scalars
+            scores = scores.tolist() if hasattr(scores, 'tolist') else scores
+        self.sketches[SCORE_FEATURE].update(scores)
+        if len(scores) < SMALL_BATCH:
+            threshold = self.threshold
+            self.flagged += sum(1 for score in scores if score >= threshold)
+        else:
+            self.flagged += int(np.count_nonzero(np.asarray(scores) >= self.threshold))
+
+    def merge(self, other):
+        with self._lock:
+            for name, sketch in other.sketches.items():
+                if name in self.sketches:
+                    self.sketches[name].merge(sketch)
+                else:
+                    self.sketches[name] = sketch.empty_like().merge(sketch)
+            self.flagged += other.flagged
+        return self
+
+    def reset(self):
+        with self._lock:
+            self.sketches = {name: sketch.empty_like() for name, sketch in self.sketches.items()}
+            self.flagged = 0
+            self.started_at = time.time()
+
+    def flagged_rate(self):
+        return self.flagged / self.scored if self.scored else None
+
+    def compare(self, reference, psi_alert=PSI_ALERT):
+        """
+        Drift report against a reference profile: PSI and KS per column and for the score,
+        the flagged rate next to the reference one, and the columns whose PSI exceeds
+        psi_alert. Costs O(bins) per column, whatever the number of events seen.
+        """
+        with self._lock:
+            features = {}
+            for name, sketch in self.sketches.items():
+                if name not in reference.sketches:
+                    continue
+                features[name] = {**sketch.summary(), **sketch.compare(reference.sketches[name])}
+            report = {
+                'events': max((sketch.count + sketch.missing for sketch in self.sketches.values()), default=0),
+                'since': self.started_at,
+                'flagged_rate': self.flagged_rate(),
+                'threshold': self.threshold,
+                'reference_flagged_rate': reference.flagged_rate(),
+                'reference_threshold': reference.threshold,
+                'features': features
+            }
+        report['alerts'] = [name for name, stats in features.items() if stats['psi'] is not None and stats['psi'] > psi_alert]
+        return report
+
+    def to_dict(self):
+        with self._lock:
+            return {'threshold': self.threshold, 'flagged': self.flagged, 'started_at': self.started_at,
+                    'sketches': {name: sketch.to_dict() for name, sketch in self.sketches.items()}}
+
+    @classmethod
+    def from_dict(cls, state):
+        monitor = cls({name: SKETCH_KINDS[sketch['kind']].from_dict(sketch) for name, sketch in state['sketches'].items()},
+                      threshold=state['threshold'])
+        monitor.flagged = state['flagged']
+        monitor.started_at = state.get('started_at', monitor.started_at)
+        return monitor
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
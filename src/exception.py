@@ -33,6 +33,26 @@ class FeatureEngineeringException(FraudDetectionException):
     def __init__(self, message="Error occured during the Feature Engineering Process", errors=None):
         super().__init__(message, errors)
 
+class DataStoreException(FraudDetectionException):
+    """Exception raised while reading or writing stored datasets"""
+    def __init__(self, message="Error occured while accessing the Data Store", errors=None):
+        super().__init__(message, errors)
+
+class ScoringException(FraudDetectionException):
+    """Exception raised while scoring transactions"""
+    def __init__(self, message="Error occured while scoring transactions", errors=None):
+        super().__init__(message, errors)
+
+class InvalidRecordsException(ScoringException):
+    """Exception raised when submitted transaction records cannot be transformed into features"""
+    def __init__(self, message="Invalid transaction records", errors=None):
+        super().__init__(message, errors)
+
+class ModelRegistryException(FraudDetectionException):
+    """Exception raised while registering or loading model versions"""
+    def __init__(self, message="Error occured while accessing the Model Registry", errors=None):
+        super().__init__(message, errors)
+
 class PipelineException(FraudDetectionException):
     """Exception raised in the Pipeline Process"""
     def __init__(self, message="Error occured during the Pipeline Process", errors=None):
@@ -2,12 +2,15 @@ import pandas as pd
 import numpy as np
 import sys
 import os
-from sklearn.impute import SimpleImputer
+from datetime import datetime
 
 sys.path.append('../fraud_detection_system')
 
 from src.logger import get_logger
 from src.exception import FeatureEngineeringException
+from src.instrumentation import metrics
+from src.data_store import DataStore, fingerprint_dataset, write_columnar
+from src.velocity_features import VelocityFeatures
 
 logger = get_logger(__name__)
 
@@ -15,31 +18,68 @@ class FeatureEngineering:
     def __init__(self):
         logger.info("FeatureEngineering initialized.")
     
-    def check_and_handle_missing_values(self, data):
+    @staticmethod
+    def _is_numeric(series):
+        return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+    def compute_fill_values(self, data, columns=None):
+        """
+        Return {column: fill value} for the given columns (by default those with missing values):
+        the median for numeric columns and the most frequent value for all others.
+        The result can be passed back to check_and_handle_missing_values, e.g. to impute
+        later batches with the values learned on the training data.
+        """
+        if columns is None:
+            columns = [column for column in data.columns if data[column].hasnans]
+        fill_values = {}
+        for column in columns:
+            series = data[column]
+            if self._is_numeric(series):
+                fill_values[column] = series.median()
+            else:
+                modes = series.mode()
+                if len(modes):
+                    fill_values[column] = modes.iloc[0]
+        return fill_values
+
+    @metrics.instrument()
+    def check_and_handle_missing_values(self, data, fill_values=None):
         """
         Check for missing values and handle them separately for numeric and categorical columns.
+        Numeric columns are filled with their median and all other columns with their most
+        frequent value, unless a precomputed value is given in fill_values. Columns are
+        replaced one at a time, so the index, column order and dtypes (including categoricals
+        and downcast numerics) are preserved and at most one extra column is held in memory.
+        Fractional medians of integer columns are rounded to keep their dtype.
         """
         try:
             logger.info("Checking for and handling missing values...")
-            
-            # Separate numeric and categorical columns
-            numeric_data = data.select_dtypes(include=[np.number])
-            categorical_data = data.select_dtypes(exclude=[np.number])
+            fill_values = fill_values or {}
+
+            missing = [column for column in data.columns if data[column].hasnans]
+            computed = self.compute_fill_values(data, [column for column in missing if column not in fill_values])
+            numeric_filled, categorical_filled = [], []
+            for column in missing:
+                value = fill_values.get(column, computed.get(column))
+                if value is None or (np.ndim(value) == 0 and pd.isna(value)):
+                    # Entirely missing column without a precomputed value: nothing to fill with
+                    continue
+                series = data[column]
+                if pd.api.types.is_integer_dtype(series.dtype) and float(value) != round(float(value)):
+                    # Nullable integer columns cannot hold a fractional median
+                    value = round(float(value))
+                if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+                    series = series.cat.add_categories([value])
+                data[column] = series.fillna(value)
+                (numeric_filled if self._is_numeric(series) else categorical_filled).append(column)
 
             # Handle missing values in numeric columns with median
-            if numeric_data.isnull().any().any():
-                numeric_imputer = SimpleImputer(strategy='median')
-                numeric_data = pd.DataFrame(numeric_imputer.fit_transform(numeric_data), columns=numeric_data.columns)
-                logger.info("Handled missing values in numeric columns with median strategy.")
+            if numeric_filled:
+                logger.info(f"Handled missing values in numeric columns {numeric_filled} with median strategy.")
 
             # Handle missing values in categorical columns with most frequent value
-            if categorical_data.isnull().any().any():
-                categorical_imputer = SimpleImputer(strategy='most_frequent')
-                categorical_data = pd.DataFrame(categorical_imputer.fit_transform(categorical_data), columns=categorical_data.columns)
-                logger.info("Handled missing values in categorical columns with most frequent strategy.")
-
-            # Combine the numeric and categorical data back together
-            data = pd.concat([numeric_data, categorical_data], axis=1)
+            if categorical_filled:
+                logger.info(f"Handled missing values in categorical columns {categorical_filled} with most frequent strategy.")
 
             return data
 
@@ -47,6 +87,7 @@ class FeatureEngineering:
             logger.error(f"Error in handling missing values: {str(e)}")
             raise FeatureEngineeringException("Failed to handle missing values.", errors=e)
 
+    @metrics.instrument()
     def create_features(self, data):
         """
         Create time-based and amount-based features.
@@ -69,6 +110,7 @@ class FeatureEngineering:
             logger.error(f"Error in creating features: {str(e)}")
             raise FeatureEngineeringException("Failed to create features.", errors=e)
 
+    @metrics.instrument()
     def encode_categorical(self, data, categorical_columns):
         """
         Encode categorical features using one-hot encoding.
@@ -82,27 +124,266 @@ class FeatureEngineering:
             logger.error(f"Error in encoding categorical features: {str(e)}")
             raise FeatureEngineeringException("Failed to encode categorical features.", errors=e)
 
-    def process_data(self, data, categorical_columns):
+    def process_data(self, data, categorical_columns, fill_values=None):
         """
         Full data processing pipeline: missing value handling, feature creation, and encoding.
         """
-        data = self.check_and_handle_missing_values(data)
+        data = self.check_and_handle_missing_values(data, fill_values=fill_values)
         data = self.create_features(data)
         data = self.encode_categorical(data, categorical_columns)
         return data
 
-    def save_data(self, data, output_path):
+    def save_data(self, data, output_path, file_format='csv'):
         """
         Save the processed dataset to a specified path.
+        With file_format='columnar' the path is a directory of memory-mappable .npy columns (see src.data_store).
         """
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            data.to_csv(output_path, index=False)
+            if file_format == 'columnar':
+                write_columnar(data, output_path)
+            else:
+                data.to_csv(output_path, index=False)
             logger.info(f"Processed data saved to {output_path}")
         except Exception as e:
             logger.error(f"Error in saving data: {str(e)}")
             raise FeatureEngineeringException("Failed to save processed data.", errors=e)
 
+
+class FeatureTransformer:
+    """
+    Fitted feature pipeline that freezes imputation values, category vocabularies and
+    output column order at fit time, so any batch (including a single row) maps to the
+    same feature columns the model was trained on.
+    The output layout matches the training pipeline in scripts/pipeline.py:
+    numeric columns, derived features, then drop-first one-hot columns.
+    """
+    NUMERIC_COLUMNS = ['step', 'amount', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest',
+                       'newbalanceDest', 'unusuallogin', 'isFlaggedFraud']
+    CATEGORICAL_COLUMNS = ['type', 'branch', 'Acct type']
+    DATE_COLUMN = 'Date of transaction'
+    DATE_FORMAT = '%d/%m/%Y'
+    DERIVED_COLUMNS = ['day_of_week', 'log_amount', 'orig_balance_diff', 'dest_balance_diff']
+
+    def __init__(self, numeric_columns=None, categorical_columns=None, velocity_window=None):
+        """
+        If velocity_window is set, per-account velocity features (see src.velocity_features) are
+        appended. transform() computes them over the given batch; transform_records() treats
+        records as a live stream and updates per-account state seeded from the fit data, which
+        transform(stream=True) also continues.
+        """
+        self.numeric_columns = list(numeric_columns or self.NUMERIC_COLUMNS)
+        self.categorical_columns = list(categorical_columns or self.CATEGORICAL_COLUMNS)
+        self.velocity_window = velocity_window
+        self.fitted = False
+
+    @staticmethod
+    def path_for_model(model_path):
+        """
+        Return the path of the transformer saved next to a model file.
+        """
+        root, ext = os.path.splitext(model_path)
+        return f"{root}_features{ext or '.pkl'}"
+
+    @metrics.instrument(name='transformer_fit')
+    def fit(self, data):
+        """
+        Learn medians, most frequent values and category vocabularies from a raw DataFrame.
+        """
+        try:
+            logger.info("Fitting feature transformer...")
+            self.medians_ = {column: float(data[column].median()) for column in self.numeric_columns}
+            self.modes_ = {}
+            self.vocabularies_ = {}
+            for column in self.categorical_columns + [self.DATE_COLUMN]:
+                self.modes_[column] = data[column].mode().iloc[0]
+            for column in self.categorical_columns:
+                # get_dummies(drop_first=True) drops the first category in sorted order
+                categories = sorted(data[column].dropna().unique().tolist())
+                self.vocabularies_[column] = categories[1:]
+
+            self.feature_names_ = self.numeric_columns + self.DERIVED_COLUMNS
+            self.one_hot_index_ = {}
+            for column in self.categorical_columns:
+                offset = len(self.feature_names_)
+                self.one_hot_index_[column] = {value: offset + i for i, value in enumerate(self.vocabularies_[column])}
+                self.feature_names_ += [f"{column}_{value}" for value in self.vocabularies_[column]]
+
+            self.velocity_ = None
+            if self.velocity_window:
+                self.velocity_ = VelocityFeatures(window=self.velocity_window)
+                self.velocity_.load_history(data)
+                self.feature_names_ += self.velocity_.feature_names
+
+            self.fitted = True
+            self._day_of_week_cache = {}
+            logger.info(f"Feature transformer fitted with {len(self.feature_names_)} output features.")
+            return self
+
+        except Exception as e:
+            logger.error(f"Error in fitting feature transformer: {str(e)}")
+            raise FeatureEngineeringException("Failed to fit feature transformer.", errors=e)
+
+    def _check_fitted(self):
+        if not self.fitted:
+            raise FeatureEngineeringException("FeatureTransformer must be fitted before transform.")
+
+    @metrics.instrument(name='transformer_transform')
+    def transform(self, data, history=None, stream=False):
+        """
+        Vectorized transform of a raw DataFrame into the fitted feature matrix, returned as a
+        DataFrame with the frozen column order and the input index.
+        history holds raw rows preceding data, such as the tail of the previous chunk of a
+        file (see VelocityFeatures.trim_history); velocity windows then extend into it.
+        Without history a batch starts from empty velocity windows. With stream=True it
+        continues the streaming state of transform_records() instead, and is added to it.
+        """
+        self._check_fitted()
+        try:
+            n_rows = len(data)
+            features = np.zeros((n_rows, len(self.feature_names_)), dtype=np.float64)
+
+            for j, column in enumerate(self.numeric_columns):
+                features[:, j] = pd.to_numeric(data[column], errors='coerce').fillna(self.medians_[column]).to_numpy(dtype=np.float64)
+
+            n_numeric = len(self.numeric_columns)
+            amount = features[:, self.numeric_columns.index('amount')]
+            dates = data[self.DATE_COLUMN].fillna(self.modes_[self.DATE_COLUMN])
+            features[:, n_numeric] = pd.to_datetime(dates, format=self.DATE_FORMAT).dt.dayofweek.to_numpy()
+            features[:, n_numeric + 1] = np.log1p(amount)
+            features[:, n_numeric + 2] = features[:, self.numeric_columns.index('oldbalanceOrg')] - features[:, self.numeric_columns.index('newbalanceOrig')]
+            features[:, n_numeric + 3] = features[:, self.numeric_columns.index('oldbalanceDest')] - features[:, self.numeric_columns.index('newbalanceDest')]
+
+            rows = np.arange(n_rows)
+            for column in self.categorical_columns:
+                index = self.one_hot_index_[column]
+                if not index:
+                    continue
+                values = data[column].fillna(self.modes_[column])
+                codes = pd.Categorical(values, categories=list(index)).codes
+                known = codes >= 0
+                offset = next(iter(index.values()))
+                features[rows[known], offset + codes[known].astype(np.intp)] = 1.0
+
+            if self.velocity_ is not None:
+                n_velocity = len(self.velocity_.feature_names)
+                if stream:
+                    state = self.velocity_.state_history()
+                    history = state if history is None else pd.concat([state, history[self.velocity_.history_columns]], ignore_index=True)
+                features[:, -n_velocity:] = self.velocity_.compute_batch(data, history=history).to_numpy(dtype=np.float64)
+                if stream:
+                    self.velocity_.load_history(data)
+
+            return pd.DataFrame(features, columns=self.feature_names_, index=data.index)
+
+        except FeatureEngineeringException:
+            raise
+        except Exception as e:
+            logger.error(f"Error in transforming features: {str(e)}")
+            raise FeatureEngineeringException("Failed to transform features.", errors=e)
+
+    def fit_transform(self, data):
+        return self.fit(data).transform(data)
+
+    def _day_of_week(self, value):
+        day = self._day_of_week_cache.get(value)
+        if day is None:
+            day = datetime.strptime(value, self.DATE_FORMAT).weekday()
+            self._day_of_week_cache[value] = day
+        return day
+
+    def _numeric_value(self, column, value):
+        """
+        Coerce a raw numeric field like pd.to_numeric(errors='coerce'); missing and
+        unparseable values become the fitted median.
+        """
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return self.medians_[column]
+        return self.medians_[column] if value != value else value
+
+    def transform_records(self, records):
+        """
+        Pandas-free fast path: map one transaction dict, or a small list of them, straight
+        to a 2D NumPy feature array. Missing and non-numeric values use the fitted fill values and unseen
+        categories encode as all zeros, exactly as in transform.
+        """
+        self._check_fitted()
+        if isinstance(records, dict):
+            records = [records]
+
+        features = np.zeros((len(records), len(self.feature_names_)), dtype=np.float64)
+        n_numeric = len(self.numeric_columns)
+        amount_j = self.numeric_columns.index('amount')
+        orig_j = (self.numeric_columns.index('oldbalanceOrg'), self.numeric_columns.index('newbalanceOrig'))
+        dest_j = (self.numeric_columns.index('oldbalanceDest'), self.numeric_columns.index('newbalanceDest'))
+
+        for i, record in enumerate(records):
+            row = features[i]
+            for j, column in enumerate(self.numeric_columns):
+                row[j] = self._numeric_value(column, record.get(column))
+
+            date = record.get(self.DATE_COLUMN)
+            row[n_numeric] = self._day_of_week(date if isinstance(date, str) else self.modes_[self.DATE_COLUMN])
+            row[n_numeric + 1] = np.log1p(row[amount_j])
+            row[n_numeric + 2] = row[orig_j[0]] - row[orig_j[1]]
+            row[n_numeric + 3] = row[dest_j[0]] - row[dest_j[1]]
+
+            for column in self.categorical_columns:
+                value = record.get(column)
+                if value is None or value != value:
+                    value = self.modes_[column]
+                j = self.one_hot_index_[column].get(value)
+                if j is not None:
+                    row[j] = 1.0
+
+            if self.velocity_ is not None:
+                row[-len(self.velocity_.feature_names):] = self.velocity_.update(record)
+
+        return features
+
+    def save(self, path):
+        """
+        Save the fitted transformer, typically next to the model (see path_for_model).
+        """
+        try:
+            self._check_fitted()
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            import joblib
+            joblib.dump(self, path)
+            logger.info(f"Feature transformer saved to {path}")
+        except Exception as e:
+            logger.error(f"Error in saving feature transformer: {str(e)}")
+            raise FeatureEngineeringException("Failed to save feature transformer.", errors=e)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a fitted transformer saved with save.
+        """
+        try:
+            import joblib
+            transformer = joblib.load(path)
+            logger.info(f"Feature transformer loaded from {path}")
+            return transformer
+        except Exception as e:
+            logger.error(f"Error in loading feature transformer: {str(e)}")
+            raise FeatureEngineeringException("Failed to load feature transformer.", errors=e)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_day_of_week_cache', None)
+        return state
+
+    def __setstate__(self, state):
+        # Transformers saved before velocity features existed have no velocity state
+        state.setdefault('velocity_window', None)
+        if state.get('fitted'):
+            state.setdefault('velocity_', None)
+        self.__dict__.update(state)
+        self._day_of_week_cache = {}
+
 if __name__ == '__main__':
     try:
         data_path = '../fraud_detection_system/data/raw/Datasets.csv'
@@ -119,5 +400,9 @@ if __name__ == '__main__':
         # Save the processed data
         feature_engineering.save_data(processed_data, output_path=engineered_data_path)
 
+        # Cache a columnar copy keyed by the raw input and feature config for train_model.py
+        dataset_key = fingerprint_dataset(data_path, config={'categorical_columns': categorical_columns})
+        DataStore().save(processed_data, dataset_key)
+
     except FeatureEngineeringException as e:
         logger.error(f"Feature engineering process failed: {str(e)}")
\ No newline at end of file
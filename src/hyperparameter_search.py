@@ -0,0 +1,219 @@
+import numpy as np
+import time
+import sys
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataModellingException
+
+logger = get_logger(__name__)
+
+# Candidate values per model in DataModelling.get_default_models, sampled independently
+DEFAULT_SEARCH_SPACES = {
+    "Logistic Regression": {
+        'C': [0.001, 0.01, 0.1, 1.0, 10.0, 100.0],
+        'class_weight': [None, 'balanced'],
+        'max_iter': [200, 500]
+    },
+    "Gradient Boosting": {
+        'learning_rate': [0.01, 0.03, 0.1, 0.3],
+        'max_depth': [2, 3, 4, 5],
+        'subsample': [0.6, 0.8, 1.0],
+        'n_estimators': [100, 200, 400]
+    },
+    "k-Neighbors Classifier": {
+        'n_neighbors': [3, 5, 11, 21],
+        'weights': ['uniform', 'distance']
+    },
+    "Decision Tree Classifier": {
+        'max_depth': [None, 4, 8, 16],
+        'min_samples_leaf': [1, 2, 5, 10],
+        'class_weight': [None, 'balanced']
+    },
+    "Random Forest Classifier": {
+        'n_estimators': [100, 200, 400],
+        'max_depth': [None, 8, 16],
+        'min_samples_leaf': [1, 2, 5],
+        'max_features': ['sqrt', 0.3],
+        'class_weight': [None, 'balanced', 'balanced_subsample']
+    }
+}
+
+
+class HyperparameterSearch:
+    def __init__(self, models, search_spaces=None, n_candidates=50, eta=3, min_resource=1000, cv=3,
+                 scoring='accuracy', budget_seconds=None, budget_type='wall', random_state=42):
+        """
+        Budget-aware random search with successive halving over row subsamples.
+        Every candidate starts on min_resource rows; after each rung only the best 1/eta
+        survive and get eta times more rows, up to the full dataset. Stratified fold indices
+        and the nested row subsamples are computed once and shared by all candidates.
+        Gradient Boosting uses its built-in early stopping and Random Forest grows its trees
+        in warm-started increments until the validation score stops improving; the number of
+        trees reached is recorded in the params of the result.
+        The search stops early once budget_seconds of wall-clock ('wall') or CPU ('cpu') time
+        is spent, also between the folds and forest increments of a candidate.
+        """
+        self.models = models
+        self.search_spaces = search_spaces or DEFAULT_SEARCH_SPACES
+        self.n_candidates = n_candidates
+        self.eta = eta
+        self.min_resource = min_resource
+        self.cv = cv
+        self.scorer = get_scorer(scoring)
+        self.budget_seconds = budget_seconds
+        self.clock = time.process_time if budget_type == 'cpu' else time.perf_counter
+        self.random_state = random_state
+        self.history = []
+
+    def sample_candidates(self):
+        """
+        Draw up to n_candidates (model name, params) pairs, spread evenly over the searchable models.
+        """
+        rng = np.random.default_rng(self.random_state)
+        names = [name for name in self.models if name in self.search_spaces]
+        candidates = []
+        seen = set()
+        for i in range(self.n_candidates * 10):
+            if len(candidates) >= self.n_candidates or not names:
+                break
+            name = names[i % len(names)]
+            params = {key: values[rng.integers(len(values))] for key, values in self.search_spaces[name].items()}
+            key = (name, tuple(sorted((k, repr(v)) for k, v in params.items())))
+            if key not in seen:
+                seen.add(key)
+                candidates.append((name, params))
+        return candidates
+
+    def _prepare_folds(self, y):
+        """
+        Compute the stratified folds once, plus a stratified row ranking whose prefixes
+        are the nested subsamples used at each rung.
+        """
+        y = np.asarray(y)
+        rng = np.random.default_rng(self.random_state)
+        # Spread each class evenly over [0, 1) so that every prefix keeps the class balance
+        positions = np.empty(len(y), dtype=np.float64)
+        for label in np.unique(y):
+            members = rng.permutation(np.flatnonzero(y == label))
+            positions[members] = (np.arange(len(members)) + rng.random()) / len(members)
+        ranks = np.empty(len(y), dtype=np.int64)
+        ranks[np.argsort(positions, kind='stable')] = np.arange(len(y))
+
+        splitter = StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state)
+        folds = list(splitter.split(np.zeros(len(y)), y))
+        return ranks, folds
+
+    def _fit(self, name, estimator, X_train, y_train, X_val, y_val, start):
+        """
+        Fit one fold and return its validation score with the n_estimators that reached it,
+        or None for models without early stopping.
+        """
+        if name == "Random Forest Classifier":
+            # Grow the forest in increments and stop once the validation score stops improving
+            # or the search budget runs out
+            target = estimator.n_estimators
+            step = max(target // 4, 25)
+            estimator.set_params(warm_start=True, n_estimators=min(step, target))
+            estimator.fit(X_train, y_train)
+            best, best_trees = self.scorer(estimator, X_val, y_val), estimator.n_estimators
+            while estimator.n_estimators < target and not self._budget_exhausted(start):
+                estimator.set_params(n_estimators=min(estimator.n_estimators + step, target))
+                estimator.fit(X_train, y_train)
+                score = self.scorer(estimator, X_val, y_val)
+                if score <= best:
+                    break
+                best, best_trees = score, estimator.n_estimators
+            return best, best_trees
+        if name == "Gradient Boosting":
+            estimator.set_params(n_iter_no_change=5, validation_fraction=0.1)
+            estimator.fit(X_train, y_train)
+            return self.scorer(estimator, X_val, y_val), int(estimator.n_estimators_)
+        estimator.fit(X_train, y_train)
+        return self.scorer(estimator, X_val, y_val), None
+
+    def _evaluate(self, name, params, X, y, ranks, folds, n_rows, start):
+        """
+        Mean fold score of a candidate and its params, with n_estimators set to the median
+        number of trees at which the folds stopped early. Folds left once the budget is spent
+        are skipped.
+        """
+        scores = []
+        n_estimators = []
+        for train_index, test_index in folds:
+            if scores and self._budget_exhausted(start):
+                break
+            train_index = train_index[ranks[train_index] < n_rows]
+            test_index = test_index[ranks[test_index] < n_rows]
+            if len(np.unique(y[train_index])) < 2:
+                continue
+            estimator = clone(self.models[name]).set_params(**params)
+            score, trees = self._fit(name, estimator, X[train_index], y[train_index], X[test_index], y[test_index], start)
+            scores.append(score)
+            if trees is not None:
+                n_estimators.append(trees)
+        if n_estimators:
+            params = {**params, 'n_estimators': int(np.median(n_estimators))}
+        return (float(np.mean(scores)) if scores else -np.inf), params
+
+    def _budget_exhausted(self, start):
+        return self.budget_seconds is not None and self.clock() - start >= self.budget_seconds
+
+    def search(self, X, y):
+        """
+        Run successive halving and return {model name: (best params, score, rows)} for every
+        model that had at least one candidate evaluated.
+        """
+        try:
+            start = self.clock()
+            X = np.asarray(X, dtype=np.float64)
+            y = np.asarray(y)
+            ranks, folds = self._prepare_folds(y)
+
+            candidates = self.sample_candidates()
+            n_rows = min(self.min_resource, len(y))
+            rung = 0
+            logger.info(f"Starting successive halving over {len(candidates)} candidates from {n_rows} rows...")
+
+            while candidates:
+                scored = []
+                for name, params in candidates:
+                    if self._budget_exhausted(start):
+                        break
+                    score, fitted_params = self._evaluate(name, params, X, y, ranks, folds, n_rows, start)
+                    scored.append((score, name, params))
+                    self.history.append({'rung': rung, 'rows': n_rows, 'model': name, 'params': fitted_params, 'score': score})
+                    logger.info(f"Rung {rung} ({n_rows} rows): {name} {fitted_params} scored {score:.4f}")
+
+                if self._budget_exhausted(start):
+                    logger.info(f"Search budget of {self.budget_seconds}s exhausted at rung {rung}.")
+                    break
+                if n_rows >= len(y) or len(scored) <= 1:
+                    break
+
+                scored.sort(key=lambda item: item[0], reverse=True)
+                keep = max(len(scored) // self.eta, 1)
+                candidates = [(name, params) for _, name, params in scored[:keep]]
+                n_rows = min(n_rows * self.eta, len(y))
+                rung += 1
+
+            return self.best_per_model()
+
+        except Exception as e:
+            logger.error(f"An error occurred during hyperparameter search: {str(e)}")
+            raise DataModellingException("Failed to run hyperparameter search.", errors=e)
+
+    def best_per_model(self):
+        """
+        Best configuration of each model, preferring results from larger subsamples.
+        """
+        best = {}
+        for entry in self.history:
+            current = best.get(entry['model'])
+            if current is None or (entry['rows'], entry['score']) > (current[2], current[1]):
+                best[entry['model']] = (entry['params'], entry['score'], entry['rows'])
+        return best
@@ -0,0 +1,373 @@
+import argparse
+import cProfile
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROMETHEUS_PREFIX = 'fraud_stage'
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def _max_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _row_count(obj):
+    shape = getattr(obj, 'shape', None)
+    if shape:
+        return int(shape[0])
+    return None
+
+
+class StageCall:
+    __slots__ = ('rows', 'thread', 'overlapped')
+
+    def __init__(self, rows=None):
+        self.rows = rows
+        self.thread = threading.get_ident()
+        self.overlapped = False
+
+
+class StageMetrics:
+    __slots__ = ('calls', 'errors', 'rows', 'wall_seconds', 'cpu_seconds', 'last_wall_seconds',
+                 'last_rows_per_second', 'overlapped_calls', 'max_rss_delta_bytes', 'max_peak_rss_growth_bytes',
+                 'max_traced_peak_bytes')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.last_wall_seconds = 0.0
+        self.last_rows_per_second = 0.0
+        self.overlapped_calls = 0
+        self.max_rss_delta_bytes = 0
+        self.max_peak_rss_growth_bytes = 0
+        self.max_traced_peak_bytes = 0
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MetricsRegistry:
+    def __init__(self, profile_dir='artifacts/profiles'):
+        """
+        Thread-safe per-stage timers and counters: calls, errors, rows, wall and CPU time,
+        rows/sec of the last call and memory growth. A stage costs a few clock reads and one
+        RSS read per call. cProfile or tracemalloc capture can be switched on per stage.
+        Memory is measured for the whole process, so calls that overlap a stage running in
+        another thread only count as overlapped_calls and leave the memory maxima unchanged.
+        """
+        self.stages = {}
+        self.profiled = {}
+        self.profile_dir = profile_dir
+        self.enabled = True
+        self._active = set()
+        self._lock = threading.Lock()
+
+    def enable_profiling(self, stage, mode='cprofile'):
+        """
+        Capture a cProfile ('cprofile') or tracemalloc ('tracemalloc') profile on every call of a stage.
+        """
+        if mode not in ('cprofile', 'tracemalloc'):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.profiled[stage] = mode
+
+    def disable_profiling(self, stage=None):
+        if stage is None:
+            self.profiled.clear()
+        else:
+            self.profiled.pop(stage, None)
+
+    def reset(self):
+        with self._lock:
+            self.stages.clear()
+
+    @contextmanager
+    def stage(self, name, rows=None, model=None):
+        """
+        Time a block of code as one call of a stage, optionally labelled with a model name.
+        Yields a StageCall whose `rows` can be set inside the block once the row count is known.
+        """
+        call = StageCall(rows)
+        if not self.enabled:
+            yield call
+            return
+
+        mode = self.profiled.get(name)
+        profiler = None
+        started_tracing = False
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+        elif mode == 'tracemalloc':
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            traced_start = tracemalloc.get_traced_memory()[0]
+
+        with self._lock:
+            for other in self._active:
+                if other.thread != call.thread:
+                    other.overlapped = call.overlapped = True
+            self._active.add(call)
+        rss_start = _rss_bytes()
+        max_rss_start = _max_rss_bytes()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        failed = False
+        try:
+            yield call
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            with self._lock:
+                self._active.discard(call)
+            traced_peak = 0
+            if mode == 'tracemalloc':
+                traced_peak = tracemalloc.get_traced_memory()[1] - traced_start
+                self._dump_tracemalloc(name, model)
+                if started_tracing:
+                    tracemalloc.stop()
+            if profiler:
+                self._dump_profile(profiler, name, model)
+            self._record(name, model, call.rows, wall, cpu, _rss_bytes() - rss_start,
+                         _max_rss_bytes() - max_rss_start, traced_peak, failed, call.overlapped)
+
+    def _record(self, name, model, rows, wall, cpu, rss_delta, peak_growth, traced_peak, failed, overlapped=False):
+        with self._lock:
+            metrics = self.stages.get((name, model))
+            if metrics is None:
+                metrics = self.stages[(name, model)] = StageMetrics()
+            metrics.calls += 1
+            metrics.errors += int(failed)
+            metrics.wall_seconds += wall
+            metrics.cpu_seconds += cpu
+            metrics.last_wall_seconds = wall
+            if rows is not None:
+                metrics.rows += rows
+                metrics.last_rows_per_second = rows / wall if wall > 0 else 0.0
+            if overlapped:
+                # Another thread's allocations are mixed into the process-wide readings
+                metrics.overlapped_calls += 1
+                return
+            metrics.max_rss_delta_bytes = max(metrics.max_rss_delta_bytes, rss_delta)
+            metrics.max_peak_rss_growth_bytes = max(metrics.max_peak_rss_growth_bytes, peak_growth)
+            metrics.max_traced_peak_bytes = max(metrics.max_traced_peak_bytes, traced_peak)
+
+    def _profile_path(self, name, model, suffix):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        label = f"{name}_{model}" if model else name
+        return os.path.join(self.profile_dir, f"{label.replace(' ', '_').lower()}_{time.time_ns()}.{suffix}")
+
+    def _dump_profile(self, profiler, name, model):
+        path = self._profile_path(name, model, 'prof')
+        profiler.dump_stats(path)
+        logger.info(f"cProfile capture of stage {name} written to {path}")
+
+    def _dump_tracemalloc(self, name, model):
+        path = self._profile_path(name, model, 'txt')
+        top = tracemalloc.take_snapshot().statistics('lineno')[:25]
+        with open(path, 'w') as f:
+            f.write('\n'.join(str(stat) for stat in top))
+        logger.info(f"tracemalloc capture of stage {name} written to {path}")
+
+    def instrument(self, name=None, rows_from=_row_count):
+        """
+        Decorator timing every call of a method or function as a stage.
+        Rows are taken from the first argument after self (e.g. the input DataFrame),
+        or from the return value when no argument has rows.
+        """
+        def decorator(func):
+            stage_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                rows = None
+                for arg in args[:2]:
+                    rows = rows_from(arg)
+                    if rows is not None:
+                        break
+                with self.stage(stage_name, rows=rows) as call:
+                    result = func(*args, **kwargs)
+                    if call.rows is None:
+                        call.rows = rows_from(result)
+                    return result
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def capture(self):
+        """
+        Record the stages of a block apart from the registry, and yield a dict that receives
+        their snapshot when the block ends. Worker processes return it for the parent to
+        merge(); merged in the same process it gives the totals of recording directly.
+        """
+        with self._lock:
+            saved, self.stages = self.stages, {}
+        captured = {}
+        try:
+            yield captured
+        finally:
+            with self._lock:
+                stages, self.stages = self.stages, saved
+            captured.update(self._snapshot_of(stages))
+
+    def merge(self, snapshot):
+        """
+        Add the stage metrics of a snapshot, e.g. one taken in a worker process, to this registry.
+        """
+        if not snapshot:
+            return
+        with self._lock:
+            for entry in snapshot['stages']:
+                key = (entry['stage'], entry['model'])
+                metrics = self.stages.get(key)
+                if metrics is None:
+                    metrics = self.stages[key] = StageMetrics()
+                for field in ('calls', 'errors', 'rows', 'wall_seconds', 'cpu_seconds', 'overlapped_calls'):
+                    setattr(metrics, field, getattr(metrics, field) + entry.get(field, 0))
+                if entry.get('calls'):
+                    metrics.last_wall_seconds = entry['last_wall_seconds']
+                    metrics.last_rows_per_second = entry['last_rows_per_second']
+                for field in ('max_rss_delta_bytes', 'max_peak_rss_growth_bytes', 'max_traced_peak_bytes'):
+                    setattr(metrics, field, max(getattr(metrics, field), entry.get(field, 0)))
+
+    @staticmethod
+    def _snapshot_of(stages):
+        return {'timestamp': time.time(),
+                'stages': [dict(stage=name, model=model, **metrics.to_dict()) for (name, model), metrics in stages.items()]}
+
+    def snapshot(self):
+        """
+        Return a JSON-serializable copy of all stage metrics.
+        """
+        with self._lock:
+            return self._snapshot_of(self.stages)
+
+    def to_prometheus(self):
+        """
+        Render all stage metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()['stages']
+        series = [
+            ('calls', 'counter', 'calls_total', 'Number of calls of the stage'),
+            ('errors', 'counter', 'errors_total', 'Number of calls that raised'),
+            ('rows', 'counter', 'rows_total', 'Rows processed by the stage'),
+            ('wall_seconds', 'counter', 'wall_seconds_total', 'Wall-clock time spent in the stage'),
+            ('cpu_seconds', 'counter', 'cpu_seconds_total', 'Process CPU time spent in the stage'),
+            ('last_wall_seconds', 'gauge', 'last_wall_seconds', 'Wall-clock time of the last call'),
+            ('last_rows_per_second', 'gauge', 'last_rows_per_second', 'Throughput of the last call'),
+            ('overlapped_calls', 'counter', 'overlapped_calls_total', 'Calls overlapping a stage of another thread, left out of the memory maxima'),
+            ('max_rss_delta_bytes', 'gauge', 'max_rss_delta_bytes', 'Largest RSS change across one call'),
+            ('max_peak_rss_growth_bytes', 'gauge', 'max_peak_rss_growth_bytes', 'Largest rise of the process peak RSS during one call'),
+            ('max_traced_peak_bytes', 'gauge', 'max_traced_peak_bytes', 'Largest tracemalloc peak of one profiled call')
+        ]
+        lines = []
+        for field, kind, suffix, help_text in series:
+            metric = f"{PROMETHEUS_PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for entry in snapshot:
+                labels = f'stage="{entry["stage"]}"'
+                if entry['model']:
+                    labels += ',model="{}"'.format(entry['model'].replace('"', '\\"'))
+                lines.append(f"{metric}{{{labels}}} {entry[field]}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, output_path):
+        """
+        Atomically write a snapshot to a file: Prometheus text for .prom/.txt, JSON otherwise.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        if output_path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, output_path)
+        logger.info(f"Stage metrics exported to {output_path}")
+
+    def push(self, url, timeout=5.0):
+        """
+        POST the Prometheus text snapshot to an HTTP endpoint such as a Pushgateway job URL.
+        """
+        import urllib.request
+
+        request = urllib.request.Request(url, data=self.to_prometheus().encode('utf-8'), method='POST',
+                                         headers={'Content-Type': 'text/plain; version=0.0.4'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+
+
+# Process-wide registry used by the pipeline classes
+metrics = MetricsRegistry()
+
+
+def _profile_spec(value):
+    stage, _, mode = value.partition(':')
+    mode = mode or 'cprofile'
+    if not stage or mode not in ('cprofile', 'tracemalloc'):
+        raise argparse.ArgumentTypeError(f"expected STAGE or STAGE:cprofile|tracemalloc, got {value!r}")
+    return stage, mode
+
+
+def add_metrics_arguments(parser):
+    """
+    Add the --metrics-output, --metrics-push-url and --profile options of the entry-point scripts.
+    """
+    group = parser.add_argument_group('stage metrics')
+    group.add_argument('--metrics-output', default=None, help="Write stage metrics on exit: Prometheus text for .prom/.txt, JSON otherwise")
+    group.add_argument('--metrics-push-url', default=None, help="POST stage metrics on exit, e.g. to a Pushgateway job URL")
+    group.add_argument('--profile', type=_profile_spec, action='append', default=[], metavar='STAGE[:MODE]',
+                       help="Profile every call of a stage with cprofile (default) or tracemalloc; repeatable")
+
+
+def configure_metrics(args):
+    for stage, mode in args.profile:
+        metrics.enable_profiling(stage, mode)
+
+
+def report_metrics(args):
+    """
+    Export and push the stage metrics as requested by the add_metrics_arguments options.
+    """
+    if args.metrics_output:
+        metrics.export(args.metrics_output)
+    if args.metrics_push_url:
+        try:
+            metrics.push(args.metrics_push_url)
+            logger.info(f"Stage metrics pushed to {args.metrics_push_url}")
+        except OSError as e:
+            logger.error(f"Pushing stage metrics to {args.metrics_push_url} failed: {str(e)}")
@@ -3,19 +3,30 @@ import os
 
 #Directory to store the logging file
 LOG_DIR = "artifacts"
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+
+
+class LazyFileHandler(logging.FileHandler):
+    """File handler that creates the log directory and opens the file on the first record,
+    so importing the package has no filesystem side effects."""
+
+    def __init__(self, filename, mode='a', encoding=None):
+        super().__init__(filename, mode=mode, encoding=encoding, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 
 #Configure the Logging Path
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s-%(name)s-%(levelname)s-%(message)s',
     handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR,"fraud_detection.logs")),
+        LazyFileHandler(os.path.join(LOG_DIR,"fraud_detection.logs")),
         logging.StreamHandler()
     ]
 )
 
 def get_logger(name):
     """Get a logger instance with a given name"""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -0,0 +1,192 @@
+import sys
+
+import numpy as np
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataModellingException
+
+logger = get_logger(__name__)
+
+# Decision threshold on predict_proba scores, as applied by the scoring service
+DEFAULT_THRESHOLD = 0.5
+
+
+def positive_scores(model, X):
+    """
+    Positive-class scores of a binary classifier from a single inference pass:
+    predict_proba when available, otherwise decision_function.
+    Returns (scores, default threshold).
+    """
+    if hasattr(model, 'predict_proba'):
+        return np.asarray(model.predict_proba(X))[:, 1], DEFAULT_THRESHOLD
+    if hasattr(model, 'decision_function'):
+        return np.asarray(model.decision_function(X)), 0.0
+    raise DataModellingException(f"{type(model).__name__} provides neither predict_proba nor decision_function.")
+
+
+class ThresholdSweep:
+    def __init__(self, y_true, scores, positive_label=1):
+        """
+        Confusion counts of a binary classifier at every distinct score threshold, built
+        with one sort and two cumulative sums over the cached scores. A transaction is
+        flagged when score >= threshold, the rule used by the scoring services. Point 0 of
+        every curve flags nothing (threshold +inf); point i flags the rows holding the i
+        highest distinct scores. Curves, metrics and cost-optimal thresholds are then read
+        off these arrays without calling the model again.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        positives = np.asarray(y_true) == positive_label
+        if scores.shape != positives.shape:
+            raise DataModellingException(f"Got {len(scores)} scores for {len(positives)} labels.")
+
+        self.order = np.argsort(-scores, kind='stable')
+        self.sorted_scores = scores[self.order]
+        self.sorted_positives = positives[self.order]
+        # Last row of each group of tied scores
+        ends = np.flatnonzero(np.diff(self.sorted_scores)) if len(scores) else np.empty(0, dtype=np.int64)
+        self.group_ends = np.r_[ends, len(scores) - 1] if len(scores) else ends
+
+        self.thresholds = np.r_[np.inf, self.sorted_scores[self.group_ends]]
+        self.tp = np.r_[0, np.cumsum(self.sorted_positives)[self.group_ends]]
+        self.fp = np.r_[0, self.group_ends + 1 - self.tp[1:]]
+        self.n_positive = int(positives.sum())
+        self.n_negative = len(positives) - self.n_positive
+        self.fn = self.n_positive - self.tp
+        self.tn = self.n_negative - self.fp
+
+    def __len__(self):
+        return len(self.thresholds)
+
+    @property
+    def precision(self):
+        flagged = self.tp + self.fp
+        return np.divide(self.tp, flagged, out=np.ones(len(flagged)), where=flagged > 0)
+
+    @property
+    def recall(self):
+        return self.tp / self.n_positive if self.n_positive else np.zeros(len(self.tp))
+
+    @property
+    def false_positive_rate(self):
+        return self.fp / self.n_negative if self.n_negative else np.zeros(len(self.fp))
+
+    def index_at(self, threshold):
+        """
+        Curve point equivalent to flagging score >= threshold.
+        """
+        return int(np.searchsorted(-self.thresholds[1:], -threshold, side='right'))
+
+    def confusion_matrix(self, threshold=DEFAULT_THRESHOLD):
+        """
+        [[tn, fp], [fn, tp]] at a threshold, in the layout of sklearn's confusion_matrix.
+        """
+        i = self.index_at(threshold)
+        return np.array([[self.tn[i], self.fp[i]], [self.fn[i], self.tp[i]]], dtype=np.int64)
+
+    def accuracy(self, threshold=DEFAULT_THRESHOLD):
+        i = self.index_at(threshold)
+        total = self.n_positive + self.n_negative
+        return float((self.tp[i] + self.tn[i]) / total) if total else 0.0
+
+    def classification_report(self, threshold=DEFAULT_THRESHOLD, target_names=('0', '1'), digits=2):
+        """
+        Text report of per-class precision, recall and F1 at a threshold, formatted like
+        sklearn's classification_report.
+        """
+        (tn, fp), (fn, tp) = self.confusion_matrix(threshold)
+        support = np.array([tn + fp, fn + tp])
+        precision = np.array([tn / (tn + fn) if tn + fn else 0.0, tp / (tp + fp) if tp + fp else 0.0])
+        recall = np.array([tn / support[0] if support[0] else 0.0, tp / support[1] if support[1] else 0.0])
+        f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(2), where=precision + recall > 0)
+        total = support.sum()
+
+        width = max(len('weighted avg'), *(len(name) for name in target_names))
+        row = f"{{:>{width}}} " + f" {{:>9.{digits}f}}" * 3 + " {:>9}"
+        lines = [f"{'':>{width}} " + ''.join(f" {column:>9}" for column in ('precision', 'recall', 'f1-score', 'support')), '']
+        lines += [row.format(name, precision[k], recall[k], f1[k], support[k]) for k, name in enumerate(target_names)]
+        lines.append('')
+        lines.append(f"{'accuracy':>{width}}  {'':>9} {'':>9} {(tp + tn) / total if total else 0.0:>9.{digits}f} {total:>9}")
+        weights = support / total if total else np.zeros(2)
+        lines.append(row.format('macro avg', precision.mean(), recall.mean(), f1.mean(), total))
+        lines.append(row.format('weighted avg', precision @ weights, recall @ weights, f1 @ weights, total))
+        return '\n'.join(lines) + '\n'
+
+    def pr_curve(self):
+        """
+        (precision, recall, thresholds) over all curve points.
+        """
+        return self.precision, self.recall, self.thresholds
+
+    def roc_curve(self):
+        """
+        (false positive rate, true positive rate, thresholds) over all curve points.
+        """
+        return self.false_positive_rate, self.recall, self.thresholds
+
+    def average_precision(self):
+        """
+        PR-AUC as the step-wise sum of precision over recall increments, like
+        sklearn's average_precision_score.
+        """
+        return float(np.sum(np.diff(self.recall) * self.precision[1:])) if self.n_positive else 0.0
+
+    def roc_auc(self):
+        if not (self.n_positive and self.n_negative):
+            return float('nan')
+        fpr, tpr = self.false_positive_rate, self.recall
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def recall_at_precision(self, min_precision=0.9):
+        """
+        Best recall reachable at precision >= min_precision (0 when none is).
+        """
+        reachable = self.recall[1:][self.precision[1:] >= min_precision]
+        return float(reachable.max()) if len(reachable) else 0.0
+
+    def costs(self, fn_cost, fp_cost, tp_cost=0.0, tn_cost=0.0):
+        """
+        Total cost at every curve point. Costs are scalars, or arrays aligned with the
+        scored rows, e.g. the transaction amount lost per missed fraud.
+        """
+        total = np.zeros(len(self.thresholds))
+        for cost, counts, positive, flagged in ((tp_cost, self.tp, True, True), (fp_cost, self.fp, False, True),
+                                                (fn_cost, self.fn, True, False), (tn_cost, self.tn, False, False)):
+            if np.ndim(cost) == 0:
+                total += float(cost) * counts
+                continue
+            # Per-row costs: cumulative sums in score order give the cost of the flagged rows
+            row_costs = np.where(self.sorted_positives == positive, np.asarray(cost, dtype=np.float64)[self.order], 0.0)
+            flagged_costs = np.r_[0.0, np.cumsum(row_costs)[self.group_ends]]
+            total += flagged_costs if flagged else row_costs.sum() - flagged_costs
+        return total
+
+    def optimal_threshold(self, fn_cost, fp_cost, tp_cost=0.0, tn_cost=0.0):
+        """
+        Threshold minimizing the total cost, with its cost and confusion counts.
+        """
+        costs = self.costs(fn_cost, fp_cost, tp_cost=tp_cost, tn_cost=tn_cost)
+        i = int(np.argmin(costs))
+        return {
+            'threshold': float(self.thresholds[i]),
+            'cost': float(costs[i]),
+            'precision': float(self.precision[i]),
+            'recall': float(self.recall[i]),
+            'flagged': int(self.tp[i] + self.fp[i]),
+            'confusion_matrix': [[int(self.tn[i]), int(self.fp[i])], [int(self.fn[i]), int(self.tp[i])]]
+        }
+
+    def summary(self, threshold=DEFAULT_THRESHOLD, min_precision=0.9):
+        """
+        Results-entry metrics at a threshold: accuracy, report, confusion matrix, PR-AUC,
+        ROC-AUC and recall at min_precision.
+        """
+        return {
+            'accuracy': self.accuracy(threshold),
+            'classification_report': self.classification_report(threshold),
+            'confusion_matrix': self.confusion_matrix(threshold),
+            'average_precision': self.average_precision(),
+            'roc_auc': self.roc_auc(),
+            'recall_at_precision': self.recall_at_precision(min_precision)
+        }
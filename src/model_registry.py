@@ -0,0 +1,252 @@
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import ModelRegistryException
+
+logger = get_logger(__name__)
+
+VERSION_FILE = 'version.json'
+MODEL_FILE = 'model.joblib'
+TRANSFORMER_FILE = 'features.pkl'
+COMPILED_DIR = 'compiled'
+DRIFT_PROFILE_FILE = 'drift_profile.json'
+PRODUCTION_POINTER = 'PRODUCTION'
+
+
+def is_version_dir(path):
+    """
+    True if path is a model version directory written by ModelRegistry.register.
+    """
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, VERSION_FILE))
+
+
+def decision_threshold(meta, default=None):
+    """
+    Decision threshold recorded in a version's metrics (see DataModelling.register_best_model),
+    or default when none was recorded.
+    """
+    recorded = meta.get('metrics', {}).get('decision_threshold')
+    return float(recorded['threshold']) if recorded else default
+
+
+class ModelVersion:
+    def __init__(self, name, version, path, meta, model=None, transformer=None, drift_profile=None):
+        """
+        One loaded model version: the model, its FeatureTransformer and reference drift
+        profile (if any) and its metadata.
+        """
+        self.name = name
+        self.version = version
+        self.path = path
+        self.meta = meta
+        self.model = model
+        self.transformer = transformer
+        self.drift_profile = drift_profile
+
+    @property
+    def decision_threshold(self):
+        return decision_threshold(self.meta)
+
+    def __repr__(self):
+        return f"ModelVersion(name={self.name!r}, version={self.version})"
+
+
+class ModelRegistry:
+    def __init__(self, root_dir='../fraud_detection_system/models/registry'):
+        """
+        Local registry of versioned models. Each version is an immutable directory
+        <root>/<name>/<version>/ holding the model pickle, the fitted FeatureTransformer,
+        optionally a compiled tree model and a drift profile, and version.json with the feature schema, training
+        metrics and data fingerprint. A PRODUCTION pointer file names the promoted version.
+        """
+        self.root_dir = root_dir
+
+    def _model_dir(self, name):
+        return os.path.join(self.root_dir, name)
+
+    def path_for(self, name, version):
+        return os.path.join(self._model_dir(name), str(version))
+
+    def list_versions(self, name):
+        """
+        Return the registered versions of a model in ascending order.
+        """
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(int(entry) for entry in os.listdir(model_dir)
+                      if entry.isdigit() and is_version_dir(os.path.join(model_dir, entry)))
+
+    def register(self, name, model, transformer=None, metrics=None, data_fingerprint=None, params=None,
+                 compile_model=False, promote=False, parent_version=None, drift_profile=None, training_key=None):
+        """
+        Store a fitted model as the next version of `name` and return the version number.
+        The model is pickled uncompressed so its arrays can be memory-mapped on load.
+        With compile_model the flat node arrays of a tree model are stored as well (see
+        src.tree_compiler), for low-latency scoring of single transactions and small batches.
+        Batch scoring always loads the estimator, which is faster on large chunks.
+        parent_version records the version an incremental update started from. drift_profile
+        is the reference DriftMonitor (see src.drift_monitoring) that serving compares against.
+        training_key identifies the training run (data, models, params) for callers that skip
+        registering the same run twice.
+        """
+        import joblib
+
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        tmp_dir = os.path.join(model_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+
+        try:
+            joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+            if transformer is not None:
+                transformer.save(os.path.join(tmp_dir, TRANSFORMER_FILE))
+            if compile_model:
+                from src.tree_compiler import CompiledTreeEnsemble
+                CompiledTreeEnsemble.from_model(model).save(os.path.join(tmp_dir, COMPILED_DIR))
+            if drift_profile is not None:
+                drift_profile.save(os.path.join(tmp_dir, DRIFT_PROFILE_FILE))
+
+            feature_names = getattr(transformer, 'feature_names_', None)
+            if feature_names is None:
+                feature_names = getattr(model, 'feature_names_in_', [])
+            meta = {
+                'name': name,
+                'model_class': type(model).__name__,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'feature_names': [str(feature) for feature in feature_names],
+                'metrics': metrics or {},
+                'params': params if params is not None else _json_params(model),
+                'data_fingerprint': data_fingerprint,
+                'parent_version': parent_version,
+                'training_key': training_key,
+                'has_transformer': transformer is not None,
+                'has_compiled': bool(compile_model),
+                'has_drift_profile': drift_profile is not None
+            }
+
+            # The next free version number is claimed by renaming the finished directory
+            # into place, so concurrent registrations never share a version
+            while True:
+                versions = self.list_versions(name)
+                version = versions[-1] + 1 if versions else 1
+                meta['version'] = version
+                with open(os.path.join(tmp_dir, VERSION_FILE), 'w') as f:
+                    json.dump(meta, f, indent=2, default=str)
+                try:
+                    os.rename(tmp_dir, self.path_for(name, version))
+                    break
+                except OSError:
+                    if not os.path.exists(self.path_for(name, version)):
+                        raise
+
+            logger.info(f"Registered {name} version {version} ({meta['model_class']}).")
+            if promote:
+                self.promote(name, version)
+            return version
+
+        except Exception as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            logger.error(f"Error in registering model {name}: {str(e)}")
+            raise ModelRegistryException(f"Failed to register model {name}.", errors=e)
+
+    def promote(self, name, version):
+        """
+        Atomically point the PRODUCTION pointer of `name` at an existing version.
+        """
+        if not is_version_dir(self.path_for(name, version)):
+            raise ModelRegistryException(f"Model {name} has no version {version}.")
+        pointer = os.path.join(self._model_dir(name), PRODUCTION_POINTER)
+        tmp_path = f"{pointer}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, pointer)
+        logger.info(f"Promoted {name} version {version} to production.")
+
+    def production_version(self, name):
+        """
+        Return the promoted version of `name`, or None if no version was promoted.
+        """
+        pointer = os.path.join(self._model_dir(name), PRODUCTION_POINTER)
+        try:
+            with open(pointer) as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def resolve(self, name, version=None):
+        """
+        Resolve a requested version: the given one, else the promoted one, else the latest.
+        """
+        if version is not None:
+            return int(version)
+        version = self.production_version(name)
+        if version is None:
+            versions = self.list_versions(name)
+            if not versions:
+                raise ModelRegistryException(f"No versions registered for model {name}.")
+            version = versions[-1]
+        return version
+
+    def metadata(self, name, version=None):
+        version = self.resolve(name, version)
+        path = os.path.join(self.path_for(name, version), VERSION_FILE)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError as e:
+            raise ModelRegistryException(f"Model {name} has no version {version}.", errors=e)
+
+    def load(self, name, version=None, mmap_mode=None):
+        """
+        Load a version (by default the promoted one). See load_version_model for mmap_mode.
+        """
+        version = self.resolve(name, version)
+        meta = self.metadata(name, version)
+        path = self.path_for(name, version)
+        try:
+            model = load_version_model(path, mmap_mode=mmap_mode)
+            transformer = None
+            if meta.get('has_transformer'):
+                from src.feature_engineering import FeatureTransformer
+                transformer = FeatureTransformer.load(os.path.join(path, TRANSFORMER_FILE))
+            drift_profile = None
+            if meta.get('has_drift_profile'):
+                from src.drift_monitoring import DriftMonitor
+                drift_profile = DriftMonitor.load(os.path.join(path, DRIFT_PROFILE_FILE))
+            logger.info(f"Loaded {name} version {version} from {path}")
+            return ModelVersion(name, version, path, meta, model=model, transformer=transformer, drift_profile=drift_profile)
+
+        except Exception as e:
+            logger.error(f"Error in loading model {name} version {version}: {str(e)}")
+            raise ModelRegistryException(f"Failed to load model {name} version {version}.", errors=e)
+
+
+def load_version_model(path, mmap_mode=None, compiled=False):
+    """
+    Load the model of a version directory, or its compiled tree model when compiled is set.
+    The compiled node arrays are always memory-mapped, so processes share one copy of them.
+    mmap_mode only applies to the estimator pickle, and does not save memory for tree models:
+    sklearn copies the node arrays out of the map when it unpickles a tree.
+    The compiled model passes inputs too large for it to the estimator (see src.tree_compiler).
+    """
+    if compiled:
+        from src.tree_compiler import CompiledTreeEnsemble
+        return CompiledTreeEnsemble.load(os.path.join(path, COMPILED_DIR), estimator_path=os.path.join(path, MODEL_FILE))
+    import joblib
+    return joblib.load(os.path.join(path, MODEL_FILE), mmap_mode=mmap_mode)
+
+
+def _json_params(model):
+    get_params = getattr(model, 'get_params', None)
+    if get_params is None:
+        return {}
+    return {key: value if isinstance(value, (int, float, str, bool, type(None))) else repr(value)
+            for key, value in get_params(deep=False).items()}
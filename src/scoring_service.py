@@ -0,0 +1,418 @@
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import warnings
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import ScoringException, InvalidRecordsException
+from src.data_modelling import DataModelling
+from src.feature_engineering import FeatureEngineering, FeatureTransformer
+from src.drift_monitoring import DriftMonitor
+from src.model_evaluation import DEFAULT_THRESHOLD
+from src.model_registry import decision_threshold
+
+logger = get_logger(__name__)
+
+# Raw columns dropped by the training pipeline before encoding
+DROPPED_COLUMNS = ['Unnamed: 0', 'nameOrig', 'nameDest', 'Date of transaction', 'Time of day', 'transaction_date', 'isFraud']
+CATEGORICAL_COLUMNS = ['type', 'branch', 'Acct type']
+
+
+class RollingWindow:
+    def __init__(self, window=10000):
+        """
+        Keep the most recent `window` observations in a fixed-size ring buffer.
+        """
+        self.samples = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, value):
+        with self.lock:
+            self.samples[self.count % len(self.samples)] = value
+            self.count += 1
+
+    def values(self):
+        with self.lock:
+            return self.samples[:min(self.count, len(self.samples))].copy()
+
+
+class AlignedFeatureTransform:
+    def __init__(self, feature_names):
+        """
+        Fallback for models saved without a FeatureTransformer: rebuild the training features
+        with pandas and align them to the model's training columns, so categories missing
+        from a request are zero-filled and unseen ones are dropped.
+        """
+        self.feature_names = list(feature_names)
+        self.feature_engineering = FeatureEngineering()
+
+    def transform(self, data):
+        data = self.feature_engineering.create_features(data.copy())
+        data = data.drop(columns=[column for column in DROPPED_COLUMNS if column in data.columns])
+        data = pd.get_dummies(data, columns=[column for column in CATEGORICAL_COLUMNS if column in data.columns])
+        return data.reindex(columns=self.feature_names, fill_value=0).astype(np.float64)
+
+    def transform_records(self, records):
+        return self.transform(pd.DataFrame.from_records(records)).to_numpy()
+
+
+def load_feature_transform(model, model_path, transformer_path=None):
+    """
+    Load the FeatureTransformer saved next to the model (or at transformer_path), or fall
+    back to column alignment.
+    """
+    transformer_path = transformer_path or FeatureTransformer.path_for_model(model_path)
+    if os.path.exists(transformer_path):
+        return FeatureTransformer.load(transformer_path)
+    logger.warning(f"No feature transformer found at {transformer_path}, falling back to pandas feature alignment.")
+    return AlignedFeatureTransform(model.feature_names_in_)
+
+
+class MicroBatcher:
+    def __init__(self, model, transform, max_batch_size=256, max_wait_ms=2.0, monitor=None, threshold=DEFAULT_THRESHOLD):
+        """
+        Coalesce concurrent scoring requests into batches served by one predict_proba call.
+        Requests are transformed one by one, so invalid records only fail their own request,
+        and a batch the model rejects is retried request by request.
+        A batch is flushed when it reaches max_batch_size or when the oldest request has
+        waited max_wait_ms. The (model, transform, monitor, threshold) tuple is read once per
+        batch, so swap() takes effect from the next batch while the current one finishes on the
+        old model, and its scores are flagged at the threshold of the model that produced them.
+        Scored batches are added to the DriftMonitor, if any, after their futures resolve.
+        """
+        self.active = (model, transform, monitor, threshold)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.batch_sizes = RollingWindow()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, records):
+        """
+        Queue a list of records and return a Future resolving to their fraud probabilities
+        and the decision threshold of the model that scored them.
+        """
+        future = Future()
+        self.requests.put((records, future))
+        return future
+
+    @property
+    def model(self):
+        return self.active[0]
+
+    @property
+    def transform(self):
+        return self.active[1]
+
+    @property
+    def monitor(self):
+        return self.active[2]
+
+    @property
+    def threshold(self):
+        return self.active[3]
+
+    def swap(self, model, transform, monitor=None, threshold=DEFAULT_THRESHOLD):
+        """
+        Atomically replace the model, feature transform, drift monitor and decision threshold
+        used for subsequent batches.
+        """
+        self.active = (model, transform, monitor, threshold)
+
+    def stop(self):
+        self._stopped.set()
+        self._worker.join()
+
+    def _collect(self):
+        first = self.requests.get(timeout=0.1)
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    @staticmethod
+    def _predict(model, features):
+        with warnings.catch_warnings():
+            # Models fitted on DataFrames warn when scored with a plain array
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return model.predict_proba(features)[:, 1]
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                batch = self._collect()
+            except queue.Empty:
+                continue
+
+            model, transform, monitor, threshold = self.active
+            # Transform each request on its own so a malformed one only fails its own future
+            valid = []
+            for request_records, future in batch:
+                try:
+                    valid.append((request_records, future, transform.transform_records(request_records)))
+                except Exception as e:
+                    logger.error(f"Rejected a scoring request with invalid records: {str(e)}")
+                    future.set_exception(InvalidRecordsException("Failed to transform transaction records.", errors=e))
+            if not valid:
+                continue
+
+            try:
+                scores = self._predict(model, np.vstack([features for _, _, features in valid]))
+                bounds = np.cumsum([len(request_records) for request_records, _, _ in valid])[:-1]
+                results = [(request_records, future, request_scores)
+                           for (request_records, future, _), request_scores in zip(valid, np.split(scores, bounds))]
+            except Exception as e:
+                # Retry request by request so only the requests the model rejects get the error
+                logger.error(f"An error occurred while scoring a batch, scoring its requests one by one: {str(e)}")
+                results = []
+                for request_records, future, features in valid:
+                    try:
+                        results.append((request_records, future, self._predict(model, features)))
+                    except Exception as error:
+                        future.set_exception(ScoringException("Failed to score transactions.", errors=error))
+            if not results:
+                continue
+
+            records = [record for request_records, _, _ in results for record in request_records]
+            self.batch_sizes.record(len(records))
+            for _, future, request_scores in results:
+                future.set_result((request_scores, threshold))
+            scores = np.concatenate([request_scores for _, _, request_scores in results])
+
+            if monitor is not None:
+                try:
+                    monitor.update_records(records, scores)
+                except Exception as e:
+                    logger.error(f"Failed to update the drift monitor: {str(e)}")
+
+
+class ScoringService:
+    def __init__(self, model_path=None, threshold=None, max_batch_size=256, max_wait_ms=2.0,
+                 registry=None, model_name=None, poll_interval=None, drift_profile_path=None):
+        """
+        Load the model and feature transform once and serve scores through a MicroBatcher.
+        The model comes from model_path, or from the promoted version of model_name in a
+        ModelRegistry. With a registry and poll_interval (seconds) the service follows
+        promotions and hot-swaps to the new version without dropping queued requests.
+        Transactions are flagged at threshold, by default the decision threshold recorded with
+        the registry version being served (0.5 without one).
+        Served traffic is tracked against the drift profile of the registry version (or the
+        one at drift_profile_path), see drift().
+        """
+        try:
+            self.registry = registry
+            self.model_name = model_name
+            self.version = None
+            self._swap_lock = threading.Lock()
+            self.threshold_override = threshold
+            self.threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+            self.reference = None
+            if registry is not None:
+                loaded = registry.load(model_name)
+                self.version = loaded.version
+                self.model = loaded.model
+                self.transform = loaded.transformer or AlignedFeatureTransform(self.model.feature_names_in_)
+                self.reference = loaded.drift_profile
+                self.threshold = self._threshold_for(loaded)
+            else:
+                self.model = DataModelling().load_model(model_path)
+                self.transform = load_feature_transform(self.model, model_path)
+            if drift_profile_path:
+                self.reference = DriftMonitor.load(drift_profile_path)
+            self.monitor = self._new_monitor(self.reference)
+            self.batcher = MicroBatcher(self.model, self.transform, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                        monitor=self.monitor, threshold=self.threshold)
+            self.latency = RollingWindow()
+
+            self._watcher = None
+            self._stop_watching = threading.Event()
+            if registry is not None and poll_interval:
+                self._watcher = threading.Thread(target=self._watch, args=(poll_interval,), name='model-watcher', daemon=True)
+                self._watcher.start()
+            logger.info(f"ScoringService ready with model {model_path or f'{model_name} version {self.version}'}")
+
+        except Exception as e:
+            logger.error(f"An error occurred while starting the scoring service: {str(e)}")
+            raise ScoringException("Failed to start the scoring service.", errors=e)
+
+    def _threshold_for(self, loaded):
+        if self.threshold_override is not None:
+            return self.threshold_override
+        return decision_threshold(loaded.meta, DEFAULT_THRESHOLD)
+
+    def _new_monitor(self, reference):
+        if reference is None:
+            return None
+        # Flagged rates are counted at the threshold the service flags transactions at
+        return reference.empty_like(threshold=self.threshold)
+
+    def reload(self, version=None):
+        """
+        Load a registry version (by default the promoted one) and swap it in if it differs
+        from the one being served. The new version is fully loaded before the swap, and
+        batches already being scored finish on the old model. Returns the served version.
+        """
+        if self.registry is None:
+            raise ScoringException("Hot swap requires a model registry.")
+        with self._swap_lock:
+            version = self.registry.resolve(self.model_name, version)
+            if version == self.version:
+                return self.version
+            loaded = self.registry.load(self.model_name, version)
+            transform = loaded.transformer or AlignedFeatureTransform(loaded.model.feature_names_in_)
+            # Drift is measured against the profile of the version being served
+            reference = loaded.drift_profile or self.reference
+            self.threshold = self._threshold_for(loaded)
+            monitor = self._new_monitor(reference)
+            self.batcher.swap(loaded.model, transform, monitor, self.threshold)
+            self.model, self.transform, self.version = loaded.model, transform, loaded.version
+            self.reference, self.monitor = reference, monitor
+            logger.info(f"Swapped {self.model_name} to version {self.version}")
+            return self.version
+
+    def _watch(self, poll_interval):
+        while not self._stop_watching.wait(poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Failed to follow the promoted model version: {str(e)}")
+
+    def score(self, records, timeout=5.0):
+        """
+        Score raw transaction records shaped like Datasets.csv rows.
+        Returns one {'fraud_probability', 'is_fraud'} dict per record.
+        """
+        start = time.perf_counter()
+        scores, threshold = self.batcher.submit(records).result(timeout=timeout)
+        self.latency.record(time.perf_counter() - start)
+        return [{'fraud_probability': float(score), 'is_fraud': bool(score >= threshold)} for score in scores]
+
+    def metrics(self):
+        """
+        Return request count, p50/p99 latency in milliseconds and mean batch size over the recent window,
+        with the served version and decision threshold.
+        """
+        latencies = self.latency.values()
+        batch_sizes = self.batcher.batch_sizes.values()
+        metrics = {'requests': self.latency.count, 'p50_ms': None, 'p99_ms': None, 'mean_batch_size': None,
+                   'model_version': self.version, 'threshold': self.threshold}
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000.0
+            metrics.update(p50_ms=round(float(p50), 3), p99_ms=round(float(p99), 3))
+        if len(batch_sizes):
+            metrics['mean_batch_size'] = round(float(batch_sizes.mean()), 2)
+        return metrics
+
+    def drift(self):
+        """
+        Drift report of the traffic served since the last swap against the reference
+        profile (see DriftMonitor.compare), or None without a profile.
+        """
+        monitor, reference = self.monitor, self.reference
+        if monitor is None:
+            return None
+        report = monitor.compare(reference)
+        report['model_version'] = self.version
+        return report
+
+    def close(self):
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+        self.batcher.stop()
+
+
+def make_handler(service):
+    """
+    Build a request handler serving POST /score, POST /reload, GET /metrics and GET /drift for the given service.
+    """
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path == '/reload':
+                try:
+                    self._send_json(200, {'model_version': service.reload()})
+                except Exception as e:
+                    self._send_json(500, {'error': str(e)})
+                return
+            if self.path != '/score':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                records = payload if isinstance(payload, list) else [payload]
+                self._send_json(200, service.score(records))
+            except InvalidRecordsException as e:
+                self._send_json(400, {'error': str(e)})
+            except FutureTimeoutError:
+                self._send_json(503, {'error': 'timed out waiting for a score'})
+            except ScoringException as e:
+                self._send_json(500, {'error': str(e)})
+            except Exception as e:
+                self._send_json(400, {'error': str(e)})
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send_json(200, service.metrics())
+            elif self.path == '/drift':
+                report = service.drift()
+                if report is None:
+                    self._send_json(404, {'error': 'no drift profile for the served model'})
+                else:
+                    self._send_json(200, report)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+
+def serve(model_path=None, host='127.0.0.1', port=8080, threshold=None, max_batch_size=256, max_wait_ms=2.0,
+          registry=None, model_name=None, poll_interval=None, drift_profile_path=None):
+    """
+    Run the scoring service over HTTP until interrupted.
+    """
+    service = ScoringService(model_path, threshold=threshold, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                             registry=registry, model_name=model_name, poll_interval=poll_interval,
+                             drift_profile_path=drift_profile_path)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    logger.info(f"Scoring service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -0,0 +1,348 @@
+import copy
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataModellingException
+from src.instrumentation import metrics
+
+logger = get_logger(__name__)
+
+MANIFEST_FILE = 'shards.json'
+SHARD_PREFIX = 'shard_'
+CLAIM_FILE = 'claim.json'
+ERROR_FILE = 'error.json'
+FOREST_FILE = 'forest.joblib'
+
+
+def shard_path(shard_dir, shard):
+    return os.path.join(shard_dir, f"{SHARD_PREFIX}{shard:04d}")
+
+
+class ShardWriter:
+    def __init__(self, shard_dir, n_shards, random_state=42):
+        """
+        Partition labeled feature chunks into n_shards row shards under shard_dir, one .npy
+        part file per chunk and shard, so datasets larger than memory can be sharded as
+        they are streamed. The rows of each class are shuffled and dealt to the shards in
+        turn, so every shard gets its share of the rare fraud class. Shards already in
+        shard_dir are replaced.
+        """
+        self.shard_dir = shard_dir
+        self.n_shards = n_shards
+        self.rng = np.random.default_rng(random_state)
+        self.feature_names = None
+        self.rows = np.zeros(n_shards, dtype=np.int64)
+        self.class_rows = {}
+        self.parts = 0
+        if os.path.exists(os.path.join(shard_dir, MANIFEST_FILE)):
+            os.remove(os.path.join(shard_dir, MANIFEST_FILE))
+        for path in glob.glob(os.path.join(shard_dir, f"{SHARD_PREFIX}*")):
+            shutil.rmtree(path)
+        for shard in range(n_shards):
+            os.makedirs(shard_path(shard_dir, shard), exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        return False
+
+    def write(self, X, y):
+        """
+        Deal one chunk of features and labels to the shards.
+        """
+        columns = [str(column) for column in X.columns] if hasattr(X, 'columns') else None
+        if self.feature_names is None:
+            self.feature_names = columns
+        elif columns is not None and columns != self.feature_names:
+            raise DataModellingException("Chunk columns differ from the columns of the first chunk.")
+
+        # Trees split on float32 features, so shards are stored at that precision
+        features = np.ascontiguousarray(X, dtype=np.float32)
+        labels = np.asarray(y)
+        assignment = np.empty(len(labels), dtype=np.int64)
+        for label in np.unique(labels):
+            rows = np.flatnonzero(labels == label)
+            self.rng.shuffle(rows)
+            # Continue the round-robin of this class where the previous chunk left off
+            offset = self.class_rows.get(label.item(), 0)
+            assignment[rows] = (offset + np.arange(len(rows))) % self.n_shards
+            self.class_rows[label.item()] = offset + len(rows)
+
+        for shard in range(self.n_shards):
+            rows = np.flatnonzero(assignment == shard)
+            if not len(rows):
+                continue
+            prefix = os.path.join(shard_path(self.shard_dir, shard), f"part_{self.parts:06d}")
+            np.save(f"{prefix}_X.npy", features[rows])
+            np.save(f"{prefix}_y.npy", labels[rows])
+            self.rows[shard] += len(rows)
+        self.parts += 1
+
+    def close(self):
+        """
+        Write the manifest that marks the shards as complete.
+        """
+        manifest = {
+            'n_shards': self.n_shards,
+            'feature_names': self.feature_names,
+            'rows': self.rows.tolist(),
+            'class_rows': {str(label): rows for label, rows in self.class_rows.items()},
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        too_rare = [label for label, rows in self.class_rows.items() if rows < self.n_shards]
+        if too_rare:
+            logger.warning(f"Classes {too_rare} have fewer rows than there are shards; some shards will miss them.")
+        tmp_path = os.path.join(self.shard_dir, f"{MANIFEST_FILE}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.shard_dir, MANIFEST_FILE))
+        logger.info(f"Wrote {int(self.rows.sum())} rows to {self.n_shards} shards in {self.shard_dir}.")
+        return manifest
+
+
+def write_shards(X, y, shard_dir, n_shards, chunksize=1000000, random_state=42):
+    """
+    Shard an in-memory dataset (see ShardWriter), writing it chunksize rows at a time.
+    """
+    with ShardWriter(shard_dir, n_shards, random_state=random_state) as writer:
+        for start in range(0, len(y), chunksize):
+            rows = slice(start, start + chunksize)
+            writer.write(X.iloc[rows] if hasattr(X, 'iloc') else X[rows], y.iloc[rows] if hasattr(y, 'iloc') else y[rows])
+    return writer
+
+
+def load_shard(path):
+    """
+    Concatenate the part files of one shard into (X, y).
+    """
+    parts = sorted(glob.glob(os.path.join(path, 'part_*_X.npy')))
+    if not parts:
+        raise DataModellingException(f"Shard {path} holds no rows.")
+    X = np.concatenate([np.load(part) for part in parts])
+    y = np.concatenate([np.load(part[:-len('X.npy')] + 'y.npy') for part in parts])
+    return X, y
+
+
+def merge_forests(forests):
+    """
+    Combine fitted RandomForestClassifiers trained on different shards into one
+    RandomForestClassifier holding all of their trees. Predictions average over every tree,
+    as they would for a single forest. Out-of-bag scores are dropped, since no shard saw
+    the others' rows.
+    """
+    if not forests:
+        raise DataModellingException("No forests to merge.")
+    classes = forests[0].classes_
+    for forest in forests[1:]:
+        if not np.array_equal(forest.classes_, classes):
+            raise DataModellingException(f"Cannot merge forests fitted on different classes: "
+                                         f"{classes.tolist()} and {forest.classes_.tolist()}.")
+        if forest.n_features_in_ != forests[0].n_features_in_:
+            raise DataModellingException("Cannot merge forests fitted on different features.")
+
+    merged = copy.deepcopy(forests[0])
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    merged.oob_score = False
+    for attribute in ('oob_score_', 'oob_decision_function_'):
+        if hasattr(merged, attribute):
+            delattr(merged, attribute)
+    return merged
+
+
+def _local_worker(trainer, metrics_path):
+    # Entry point of the worker processes of ShardedForestTrainer.train
+    metrics.reset()
+    try:
+        trainer.run_worker()
+    finally:
+        with open(metrics_path, 'w') as f:
+            json.dump(metrics.snapshot(), f)
+
+
+class ShardedForestTrainer:
+    def __init__(self, shard_dir, n_estimators=100, model_params=None, lease_seconds=3600, random_state=42):
+        """
+        Train a random forest over the shards written by ShardWriter, one sub-forest per
+        shard, and merge the sub-forests into one RandomForestClassifier. Workers coordinate
+        through the shard directory only: a worker claims a shard by creating its claim file
+        exclusively, trains on that shard's rows alone and renames the sub-forest into place.
+        Workers may therefore run as local processes (train) or on several nodes sharing the
+        filesystem (run_worker), and training memory scales with the shard size. Claims older
+        than lease_seconds without a sub-forest are taken over, e.g. after a node failure.
+        """
+        self.shard_dir = shard_dir
+        self.n_estimators = n_estimators
+        self.model_params = dict(model_params or {})
+        self.lease_seconds = lease_seconds
+        self.random_state = random_state
+
+    def manifest(self):
+        path = os.path.join(self.shard_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            raise DataModellingException(f"No complete shards in {self.shard_dir} ({MANIFEST_FILE} is missing).")
+        with open(path) as f:
+            return json.load(f)
+
+    def estimators_for(self, shard, n_shards):
+        """
+        Trees of one sub-forest: n_estimators split evenly across the shards.
+        """
+        return self.n_estimators // n_shards + int(shard < self.n_estimators % n_shards)
+
+    def status(self):
+        """
+        Return {shard: 'done' | 'claimed' | 'failed' | 'pending'}.
+        """
+        states = {}
+        for shard in range(self.manifest()['n_shards']):
+            path = shard_path(self.shard_dir, shard)
+            if os.path.exists(os.path.join(path, FOREST_FILE)):
+                states[shard] = 'done'
+            elif os.path.exists(os.path.join(path, CLAIM_FILE)):
+                states[shard] = 'claimed'
+            elif os.path.exists(os.path.join(path, ERROR_FILE)):
+                states[shard] = 'failed'
+            else:
+                states[shard] = 'pending'
+        return states
+
+    def _claim(self, shard):
+        path = shard_path(self.shard_dir, shard)
+        if os.path.exists(os.path.join(path, FOREST_FILE)):
+            return False
+        claim_path = os.path.join(path, CLAIM_FILE)
+        claim = json.dumps({'host': socket.gethostname(), 'pid': os.getpid(), 'claimed_at': time.time()})
+        try:
+            fd = os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - os.path.getmtime(claim_path)
+            except FileNotFoundError:
+                return False
+            if age < self.lease_seconds:
+                return False
+            # Expired lease: take the shard over. Should two workers race here, both train
+            # the same seeded sub-forest and the second rename just replaces the first.
+            logger.warning(f"Claim on shard {shard} expired after {age:.0f}s; taking it over.")
+            tmp_path = f"{claim_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(claim)
+            os.replace(tmp_path, claim_path)
+            return True
+        with os.fdopen(fd, 'w') as f:
+            f.write(claim)
+        return True
+
+    def train_shard(self, shard, n_shards):
+        """
+        Fit the sub-forest of one shard and store it in the shard directory.
+        """
+        import joblib
+        from sklearn.ensemble import RandomForestClassifier
+
+        path = shard_path(self.shard_dir, shard)
+        X, y = load_shard(path)
+        params = {**self.model_params, 'n_estimators': self.estimators_for(shard, n_shards),
+                  'random_state': self.random_state + shard}
+        forest = RandomForestClassifier(**params)
+        with metrics.stage('fit_shard', rows=len(y), model='Random Forest Classifier'):
+            forest.fit(X, y)
+
+        tmp_path = os.path.join(path, f"{FOREST_FILE}.{uuid.uuid4().hex}.tmp")
+        joblib.dump(forest, tmp_path)
+        os.replace(tmp_path, os.path.join(path, FOREST_FILE))
+        logger.info(f"Trained {forest.n_estimators} trees on shard {shard} ({len(y)} rows).")
+
+    def run_worker(self, max_shards=None):
+        """
+        Claim and train shards until none is left (or max_shards were trained).
+        Returns the trained shard numbers. Failures are recorded in the shard's error file
+        and the claim is released, so the shard is retried by the next worker run.
+        """
+        n_shards = self.manifest()['n_shards']
+        trained = []
+        for shard in range(n_shards):
+            if max_shards is not None and len(trained) >= max_shards:
+                break
+            if not self._claim(shard):
+                continue
+            path = shard_path(self.shard_dir, shard)
+            try:
+                # Another worker may have finished the shard between our check and claim
+                if os.path.exists(os.path.join(path, FOREST_FILE)):
+                    continue
+                self.train_shard(shard, n_shards)
+                trained.append(shard)
+                if os.path.exists(os.path.join(path, ERROR_FILE)):
+                    os.remove(os.path.join(path, ERROR_FILE))
+            except Exception as e:
+                logger.error(f"Training shard {shard} failed: {str(e)}")
+                with open(os.path.join(path, ERROR_FILE), 'w') as f:
+                    json.dump({'error': f"{type(e).__name__}: {e}", 'host': socket.gethostname(), 'at': time.time()}, f)
+            finally:
+                if os.path.exists(os.path.join(path, CLAIM_FILE)):
+                    os.remove(os.path.join(path, CLAIM_FILE))
+        return trained
+
+    def train(self, n_workers=None):
+        """
+        Train all shards in n_workers local worker processes and return the merged forest.
+        The stage metrics of the workers are merged into this process.
+        """
+        n_shards = self.manifest()['n_shards']
+        n_workers = min(n_workers or os.cpu_count() or 1, n_shards)
+        context = multiprocessing.get_context()
+        metrics_paths = [os.path.join(self.shard_dir, f"metrics_{uuid.uuid4().hex}.json") for _ in range(n_workers)]
+        processes = [context.Process(target=_local_worker, args=(self, path)) for path in metrics_paths]
+        for process in processes:
+            process.start()
+        logger.info(f"Started {n_workers} worker processes for {n_shards} shards.")
+        for process in processes:
+            process.join()
+        for path in metrics_paths:
+            if os.path.exists(path):
+                with open(path) as f:
+                    metrics.merge(json.load(f))
+                os.remove(path)
+        return self.merge()
+
+    def merge(self):
+        """
+        Merge the sub-forests of all shards into one RandomForestClassifier.
+        Raises DataModellingException while any shard is not trained yet.
+        """
+        import joblib
+
+        manifest = self.manifest()
+        status = self.status()
+        unfinished = {shard: state for shard, state in status.items() if state != 'done'}
+        if unfinished:
+            errors = {}
+            for shard, state in unfinished.items():
+                if state == 'failed':
+                    with open(os.path.join(shard_path(self.shard_dir, shard), ERROR_FILE)) as f:
+                        errors[shard] = json.load(f)['error']
+            raise DataModellingException(f"Shards not trained yet: {unfinished}", errors=errors or None)
+
+        forests = [joblib.load(os.path.join(shard_path(self.shard_dir, shard), FOREST_FILE)) for shard in sorted(status)]
+        merged = merge_forests(forests)
+        if manifest.get('feature_names'):
+            merged.feature_names_in_ = np.asarray(manifest['feature_names'], dtype=object)
+        logger.info(f"Merged {len(forests)} sub-forests into one forest of {merged.n_estimators} trees.")
+        return merged
@@ -0,0 +1,284 @@
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import PipelineException
+from src.data_store import SCHEMA_FILE, fingerprint_file, read_columnar, write_columnar
+
+logger = get_logger(__name__)
+
+RESULT_FILE = 'result.joblib'
+STAGE_FILE = 'stage.json'
+LATEST_FILE = 'latest.json'
+
+
+def _digest(payload):
+    encoded = json.dumps(payload, sort_keys=True, default=repr).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def code_fingerprint(objects):
+    """
+    Hash the source code of functions, classes or modules, so a stage is recomputed
+    when the code that produces its output changes.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode('utf-8'))
+        except (OSError, TypeError):
+            digest.update(repr(obj).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+class FileInput:
+    def __init__(self, path):
+        """
+        External file input of a stage, identified by the SHA-256 of its content.
+        """
+        self.path = path
+
+    def fingerprint(self):
+        return fingerprint_file(self.path)
+
+
+class Stage:
+    def __init__(self, name, func, inputs=None, params=None, code=None, version=1, cache=True):
+        """
+        One pipeline step. func is called with the outputs of the stages named in `inputs`
+        (or FileInput paths) as keyword arguments, plus `params`. The cache key hashes the
+        input fingerprints, the params, `version` and the source of func and of the objects
+        in `code`. Stages with cache=False (e.g. ones that write models) always run.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = inputs or {}
+        self.params = params or {}
+        self.code = [func] + list(code or [])
+        self.version = version
+        self.cache = cache
+
+    def components(self, input_keys):
+        return {
+            'code': code_fingerprint(self.code),
+            'version': self.version,
+            'params': _digest(self.params),
+            'inputs': input_keys
+        }
+
+
+class StagePipeline:
+    def __init__(self, stages, cache_dir='../fraud_detection_system/artifacts/stage_cache', max_workers=None):
+        """
+        Run declared stages in dependency order with on-disk, content-addressed caching of
+        their outputs. Independent stages run concurrently in a thread pool (max_workers).
+        DataFrame outputs are cached in the columnar format and opened memory-mapped
+        copy-on-write; other outputs are pickled with joblib.
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        for stage in stages:
+            for input_name, source in stage.inputs.items():
+                if not isinstance(source, FileInput) and source not in self.stages:
+                    raise PipelineException(f"Stage {stage.name} depends on unknown stage {source} (as {input_name}).")
+        self._file_fingerprints = {}
+
+    def _order(self, targets=None):
+        """
+        Stages needed for the targets (all stages by default) in topological order.
+        """
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise PipelineException(f"Stage dependency cycle through {name}.")
+            visiting.add(name)
+            for source in self.stages[name].inputs.values():
+                if not isinstance(source, FileInput):
+                    visit(source)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in targets or self.stages:
+            if name not in self.stages:
+                raise PipelineException(f"Unknown stage {name}.")
+            visit(name)
+        return order
+
+    def _stage_dir(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _input_keys(self, stage, keys):
+        input_keys = {}
+        for input_name, source in stage.inputs.items():
+            if isinstance(source, FileInput):
+                if source.path not in self._file_fingerprints:
+                    self._file_fingerprints[source.path] = source.fingerprint()
+                input_keys[input_name] = f"file:{self._file_fingerprints[source.path]}"
+            else:
+                input_keys[input_name] = f"{source}:{keys[source]}"
+        return input_keys
+
+    def _plan(self, targets=None):
+        """
+        Return [(stage name, key, components)] for the targets, computing every cache key
+        from fingerprints alone, without running any stage.
+        """
+        self._file_fingerprints = {}
+        keys, plan = {}, []
+        for name in self._order(targets):
+            stage = self.stages[name]
+            components = stage.components(self._input_keys(stage, keys))
+            keys[name] = _digest({'stage': name, **components})
+            plan.append((name, keys[name], components))
+        return plan
+
+    def _cached(self, name, key):
+        path = os.path.join(self._stage_dir(name), key)
+        return os.path.exists(os.path.join(path, STAGE_FILE))
+
+    def _reason(self, name, key, components):
+        stage = self.stages[name]
+        if not stage.cache:
+            return 'recompute', 'caching disabled for this stage'
+        if self._cached(name, key):
+            return 'cached', 'inputs, params and code unchanged'
+        latest_path = os.path.join(self._stage_dir(name), LATEST_FILE)
+        if not os.path.exists(latest_path):
+            return 'recompute', 'never run'
+        with open(latest_path) as f:
+            previous = json.load(f)['components']
+        changed = [f"input {input_name}" for input_name, value in components['inputs'].items()
+                   if previous['inputs'].get(input_name) != value]
+        changed += [part for part in ('params', 'code', 'version') if previous.get(part) != components[part]]
+        return 'recompute', f"changed: {', '.join(changed)}" if changed else 'cache entry missing'
+
+    def explain(self, targets=None):
+        """
+        Dry run: return [{'stage', 'status', 'reason', 'key'}] saying which stages would be
+        recomputed and why, without running anything.
+        """
+        return [dict(zip(('status', 'reason'), self._reason(name, key, components)), stage=name, key=key)
+                for name, key, components in self._plan(targets)]
+
+    def _load(self, name, key):
+        path = os.path.join(self._stage_dir(name), key)
+        if os.path.exists(os.path.join(path, SCHEMA_FILE)):
+            # Copy-on-write mapping: stages may modify their inputs without touching the cache
+            return read_columnar(path, mmap_mode='c')
+        import joblib
+        return joblib.load(os.path.join(path, RESULT_FILE))
+
+    def _store(self, name, key, components, output, seconds):
+        stage_dir = self._stage_dir(name)
+        path = os.path.join(stage_dir, key)
+        record = {'stage': name, 'key': key, 'components': components, 'seconds': seconds,
+                  'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        if isinstance(output, pd.DataFrame):
+            write_columnar(output, path)
+        else:
+            import joblib
+            tmp_dir = os.path.join(stage_dir, f".tmp-{uuid.uuid4().hex}")
+            os.makedirs(tmp_dir)
+            try:
+                joblib.dump(output, os.path.join(tmp_dir, RESULT_FILE))
+                os.rename(tmp_dir, path)
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                if not os.path.isdir(path):
+                    raise
+        # stage.json marks the entry as complete
+        with open(os.path.join(path, STAGE_FILE), 'w') as f:
+            json.dump(record, f, indent=2)
+        tmp_latest = os.path.join(stage_dir, f"{LATEST_FILE}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_latest, 'w') as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_latest, os.path.join(stage_dir, LATEST_FILE))
+
+    def _execute(self, name, key, components, outputs):
+        stage = self.stages[name]
+        kwargs = {input_name: source.path if isinstance(source, FileInput) else outputs[source]
+                  for input_name, source in stage.inputs.items()}
+        logger.info(f"Running stage {name}...")
+        start = time.perf_counter()
+        output = stage.func(**kwargs, **stage.params)
+        seconds = time.perf_counter() - start
+        logger.info(f"Stage {name} completed in {seconds:.2f}s.")
+        if stage.cache:
+            self._store(name, key, components, output, seconds)
+        return output
+
+    def run(self, targets=None, force=()):
+        """
+        Run the targets (all stages by default), loading unchanged stages from the cache.
+        Stages named in `force` are recomputed regardless. Returns {stage name: output} for
+        the targets, or for the final stages when no targets are given.
+        """
+        try:
+            plan = self._plan(targets)
+            keys = {name: key for name, key, _ in plan}
+            components = {name: parts for name, _, parts in plan}
+            dependencies = {name: {source for source in self.stages[name].inputs.values() if not isinstance(source, FileInput)}
+                            for name in keys}
+            # A stage's output is only needed if some stage that runs consumes it,
+            # so cached stages are loaded lazily, right before their consumers run
+            outputs, loaded = {}, set()
+
+            def ensure_loaded(name):
+                if name not in loaded:
+                    outputs[name] = self._load(name, keys[name])
+                    loaded.add(name)
+
+            to_run = []
+            for name in keys:
+                stage = self.stages[name]
+                if stage.cache and name not in force and self._cached(name, keys[name]):
+                    logger.info(f"Stage {name} is cached ({keys[name][:12]}).")
+                else:
+                    to_run.append(name)
+
+            pending, running = list(to_run), {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                while pending or running:
+                    for name in list(pending):
+                        if any(source in running or source in pending for source in dependencies[name]):
+                            continue
+                        for source in dependencies[name]:
+                            ensure_loaded(source)
+                        pending.remove(name)
+                        running[name] = pool.submit(self._execute, name, keys[name], components[name], outputs)
+                    done, _ = wait(list(running.values()), return_when=FIRST_COMPLETED)
+                    for name, future in list(running.items()):
+                        if future in done:
+                            outputs[name] = future.result()
+                            loaded.add(name)
+                            del running[name]
+
+            # Without explicit targets, return the outputs no other stage consumes
+            if not targets:
+                consumed = set().union(*dependencies.values())
+                targets = [name for name in keys if name not in consumed]
+            for name in targets:
+                ensure_loaded(name)
+            return {name: outputs[name] for name in targets}
+
+        except PipelineException:
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred while running the pipeline: {str(e)}")
+            raise PipelineException("Failed to run the pipeline.", errors=e)
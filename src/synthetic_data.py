@@ -0,0 +1,141 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataIngestionException
+
+logger = get_logger(__name__)
+
+# Marginal distributions measured on data/raw/Datasets.csv.
+# Amounts are log-normal per transaction type: (share of rows, log mean, log std, fraud rate).
+TRANSACTION_TYPES = {
+    'PAYMENT': (0.547, 8.46, 1.20, 0.0),
+    'CASH_IN': (0.193, 11.61, 1.08, 0.0),
+    'CASH_OUT': (0.132, 11.57, 1.13, 0.0262),
+    'TRANSFER': (0.093, 12.36, 1.39, 0.0349),
+    'DEBIT': (0.035, 7.84, 0.93, 0.0)
+}
+TOP_BRANCHES = {
+    'Estados Unidos': 0.127, 'Francia': 0.073, 'Mexico': 0.066, 'Australia': 0.063, 'Alemania': 0.049,
+    'China': 0.045, 'Brasil': 0.044, 'India': 0.039, 'Reino Unido': 0.037, 'Indonesia': 0.031,
+    'Italia': 0.031, 'Espana': 0.019, 'El Salvador': 0.018, 'Republica Dominicana': 0.018, 'Turquia': 0.018,
+    'Honduras': 0.018, 'Filipinas': 0.017, 'Guatemala': 0.015, 'Cuba': 0.015, 'Nicaragua': 0.014
+}
+# The remaining probability mass is spread over a long tail of smaller branches
+LONG_TAIL_BRANCHES = ['Colombia', 'Nueva Zelanda', 'Argentina', 'Nigeria', 'Paises Bajos', 'Rusia', 'Iran',
+                      'Austria', 'Irak', 'Ucrania', 'Tailandia', 'Panama', 'Arabia Saudi', 'Vietnam', 'Canada',
+                      'Japon', 'SudAfrica', 'Suecia', 'Corea del Sur', 'Peru', 'Marruecos', 'Venezuela', 'Egipto',
+                      'Pakistan', 'Polonia', 'Banglades', 'Chile', 'Singapur', 'Belgica', 'Malasia']
+ACCOUNT_TYPES = {'Savings': 0.69, 'Current': 0.31}
+TIMES_OF_DAY = {'Afternoon': 0.358, 'Night': 0.325, 'Morning': 0.317}
+# Log-normal (mean, std) of non-zero opening balances, and the share of zero balances per type
+ORIG_BALANCE = (11.20, 2.79)
+DEST_BALANCE = (12.98, 2.11)
+ZERO_ORIG_BALANCE = {'PAYMENT': 0.20, 'CASH_IN': 0.01, 'CASH_OUT': 0.66, 'TRANSFER': 0.48, 'DEBIT': 0.01}
+ZERO_DEST_BALANCE = {'PAYMENT': 1.0, 'CASH_IN': 0.01, 'CASH_OUT': 0.03, 'TRANSFER': 0.16, 'DEBIT': 0.0}
+STEPS_PER_DAY = 24
+
+COLUMNS = ['Unnamed: 0', 'step', 'type', 'branch', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig',
+           'nameDest', 'oldbalanceDest', 'newbalanceDest', 'unusuallogin', 'isFlaggedFraud', 'Acct type',
+           'Date of transaction', 'Time of day', 'isFraud']
+
+
+class SyntheticTransactionGenerator:
+    def __init__(self, seed=42, rows_per_step=1500, n_accounts=None):
+        """
+        Seeded generator of transactions with the schema and rough distributions of Datasets.csv.
+        Rows are generated in chunks, so files of 100M+ rows can be written in bounded memory;
+        the same seed and chunk size always reproduce the same file.
+        """
+        self.seed = seed
+        self.rows_per_step = rows_per_step
+        self.n_accounts = n_accounts
+        branches = dict(TOP_BRANCHES)
+        tail_share = (1.0 - sum(branches.values())) / len(LONG_TAIL_BRANCHES)
+        branches.update({branch: tail_share for branch in LONG_TAIL_BRANCHES})
+        self.branches = np.array(list(branches))
+        self.branch_p = np.array(list(branches.values()))
+        self.types = np.array(list(TRANSACTION_TYPES))
+        self.type_p = np.array([spec[0] for spec in TRANSACTION_TYPES.values()])
+        self.type_p = self.type_p / self.type_p.sum()
+        self.zero_orig_p = np.array([ZERO_ORIG_BALANCE[name] for name in self.types])
+        self.zero_dest_p = np.array([ZERO_DEST_BALANCE[name] for name in self.types])
+
+    def generate_chunk(self, start_row, n_rows, total_rows):
+        """
+        Generate rows [start_row, start_row + n_rows) of a dataset with total_rows rows.
+        """
+        rng = np.random.default_rng([self.seed, start_row])
+        n_accounts = self.n_accounts or max(total_rows, 1000)
+        row_ids = np.arange(start_row, start_row + n_rows)
+        steps = row_ids // self.rows_per_step + 1
+
+        type_index = rng.choice(len(self.types), size=n_rows, p=self.type_p)
+        types = self.types[type_index]
+        specs = np.array(list(TRANSACTION_TYPES.values()))
+        amounts = np.round(np.exp(rng.normal(specs[type_index, 1], specs[type_index, 2])), 2)
+        is_fraud = (rng.random(n_rows) < specs[type_index, 3]).astype(np.float64)
+
+        zero_orig = rng.random(n_rows) < self.zero_orig_p[type_index]
+        old_orig = np.where(zero_orig, 0.0, np.round(np.exp(rng.normal(*ORIG_BALANCE, n_rows)), 2))
+        # Fraudulent transfers and cash-outs empty the originating account
+        old_orig = np.where(is_fraud == 1, amounts, old_orig)
+        incoming = types == 'CASH_IN'
+        new_orig = np.where(incoming, old_orig + amounts, np.maximum(old_orig - amounts, 0.0))
+
+        zero_dest = rng.random(n_rows) < self.zero_dest_p[type_index]
+        old_dest = np.where(zero_dest, 0.0, np.round(np.exp(rng.normal(*DEST_BALANCE, n_rows)), 2))
+        new_dest = np.where(types == 'PAYMENT', 0.0, np.where(incoming, np.maximum(old_dest - amounts, 0.0), old_dest + amounts))
+
+        dest_prefix = np.where(types == 'PAYMENT', 'M', 'C')
+        days = (steps - 1) // STEPS_PER_DAY
+        dates = pd.DatetimeIndex(np.datetime64('2018-01-01') + (days + rng.integers(0, 28, n_rows)).astype('timedelta64[D]'))
+        date_strings = (pd.Series(dates.day.astype(str)) + '/' + pd.Series(dates.month.astype(str)) + '/' + pd.Series(dates.year.astype(str))).to_numpy()
+
+        return pd.DataFrame({
+            'Unnamed: 0': row_ids,
+            'step': steps,
+            'type': types,
+            'branch': self.branches[rng.choice(len(self.branches), size=n_rows, p=self.branch_p)],
+            'amount': amounts,
+            'nameOrig': np.char.add('C', rng.integers(1e8, 1e8 + n_accounts, n_rows).astype(str)),
+            'oldbalanceOrg': old_orig,
+            'newbalanceOrig': np.round(new_orig, 2),
+            'nameDest': np.char.add(dest_prefix, rng.integers(1e8, 1e8 + n_accounts, n_rows).astype(str)),
+            'oldbalanceDest': old_dest,
+            'newbalanceDest': np.round(new_dest, 2),
+            'unusuallogin': rng.integers(0, 21, n_rows),
+            'isFlaggedFraud': np.zeros(n_rows, dtype=np.int64),
+            'Acct type': rng.choice(list(ACCOUNT_TYPES), size=n_rows, p=list(ACCOUNT_TYPES.values())),
+            'Date of transaction': date_strings,
+            'Time of day': rng.choice(list(TIMES_OF_DAY), size=n_rows, p=list(TIMES_OF_DAY.values())),
+            'isFraud': is_fraud
+        }, columns=COLUMNS)
+
+    def generate(self, n_rows, chunk_rows=1000000):
+        """
+        Generate an in-memory DataFrame of n_rows transactions.
+        """
+        chunks = [self.generate_chunk(start, min(chunk_rows, n_rows - start), n_rows) for start in range(0, n_rows, chunk_rows)]
+        return pd.concat(chunks, ignore_index=True) if chunks else self.generate_chunk(0, 0, 0)
+
+    def write_csv(self, output_path, n_rows, chunk_rows=1000000):
+        """
+        Write n_rows transactions to a CSV file chunk by chunk.
+        """
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            for start in range(0, n_rows, chunk_rows):
+                chunk = self.generate_chunk(start, min(chunk_rows, n_rows - start), n_rows)
+                chunk.to_csv(output_path, index=False, mode='w' if start == 0 else 'a', header=(start == 0))
+                logger.info(f"Generated {start + len(chunk)} of {n_rows} synthetic transactions.")
+            logger.info(f"Synthetic dataset with {n_rows} rows written to {output_path}")
+
+        except Exception as e:
+            logger.error(f"An error occurred while generating synthetic data: {str(e)}")
+            raise DataIngestionException("Failed to generate synthetic data.", errors=e)
@@ -0,0 +1,292 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import DataModellingException
+
+logger = get_logger(__name__)
+
+META_FILE = 'meta.json'
+NODE_ARRAYS = ['feature', 'threshold', 'children', 'missing_left', 'value', 'roots']
+# Inputs needing at most this many (row, tree, level) steps are walked node by node in
+# Python, which avoids the fixed cost of the vectorized level loop
+MAX_WALK_STEPS = 1024
+# Above this many rows per call sklearn's own traversal is faster than the vectorized level
+# loop, so calls this large go to the estimator when it is available
+MAX_COMPILED_ROWS = 64
+
+
+def _flatten_trees(trees, leaf_values):
+    """
+    Concatenate sklearn Tree objects into flat node arrays with global child indices.
+    Children are interleaved as [left, right] pairs so one gather picks the next node.
+    Leaves point to themselves, which marks them for the evaluator.
+    """
+    features, thresholds, children, missing_left, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree, value in zip(trees, leaf_values):
+        n_nodes = tree.node_count
+        left = tree.children_left.astype(np.int64)
+        right = tree.children_right.astype(np.int64)
+        is_leaf = left < 0
+        own = np.arange(n_nodes, dtype=np.int64)
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+        children.append(np.column_stack([np.where(is_leaf, own, left), np.where(is_leaf, own, right)]).ravel() + offset)
+        # Trees fitted on data with NaNs record which side missing values take
+        missing_left.append(np.asarray(getattr(tree, 'missing_go_to_left', np.zeros(n_nodes)), dtype=bool))
+        values.append(value)
+        roots.append(offset)
+        offset += n_nodes
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'children': np.concatenate(children).astype(np.int32),
+        'missing_left': np.concatenate(missing_left),
+        'value': np.concatenate(values),
+        'roots': np.asarray(roots, dtype=np.int32)
+    }
+
+
+class CompiledTreeEnsemble:
+    """
+    Flat, array-backed form of a fitted DecisionTreeClassifier, RandomForestClassifier or
+    binary GradientBoostingClassifier, for low-latency scoring of single transactions and
+    small batches. Small inputs are walked node by node over plain lists; larger ones descend
+    all trees together, one level per vectorized step. Skipping sklearn's input validation and
+    thread dispatch makes it faster than the estimator up to about 64 rows per call (256 for
+    a random forest; a single row is 5-20x faster). Beyond that sklearn's compiled traversal
+    is 3-5x faster, so calls over MAX_COMPILED_ROWS rows are passed to the estimator: the one
+    compiled by from_model, or the pickle at estimator_path, loaded on first use. Without
+    either, large inputs still go through the (slower) level loop.
+    Inputs are compared in float32 and tree values are summed in sklearn's order, so
+    predictions match it exactly.
+    """
+
+    def __init__(self, arrays, meta, estimator=None, estimator_path=None):
+        self.arrays = arrays
+        self.meta = meta
+        self.estimator = estimator
+        self.estimator_path = estimator_path
+        self.classes_ = np.asarray(meta['classes'])
+        for name in NODE_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.is_leaf = self.children[0::2] == np.arange(len(self.feature))
+        # For float32 inputs, x <= t holds exactly when x <= the largest float32 not above t,
+        # which lets the evaluator compare in float32 without changing any decision
+        threshold32 = np.asarray(self.threshold).astype(np.float32)
+        self.threshold32 = np.where(threshold32 > self.threshold, np.nextafter(threshold32, np.float32(-np.inf)), threshold32)
+        self._node_lists = None
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Compile a fitted sklearn tree model, or one wrapped in a PriorCorrectedClassifier
+        (trained on downsampled negatives), whose correction is applied to predict_proba.
+        """
+        estimator, negative_rate = model, None
+        if type(model).__name__ == 'PriorCorrectedClassifier':
+            negative_rate, model = float(model.negative_rate), model.model
+        kind = type(model).__name__
+        if kind == 'DecisionTreeClassifier':
+            trees = [model.tree_]
+        elif kind == 'RandomForestClassifier':
+            trees = [estimator.tree_ for estimator in model.estimators_]
+        elif kind == 'GradientBoostingClassifier':
+            if model.estimators_.shape[1] != 1:
+                raise DataModellingException("Only binary GradientBoostingClassifier models can be compiled.")
+            trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        else:
+            raise DataModellingException(f"Cannot compile model of type {kind}.")
+
+        if kind == 'GradientBoostingClassifier':
+            leaf_values = [tree.value[:, 0, 0] * model.learning_rate for tree in trees]
+            # The init estimator's raw score does not depend on X, so take it from a zero row
+            init_raw = float(model._raw_predict_init(np.zeros((1, model.n_features_in_)))[0, 0])
+        else:
+            # Normalize leaf class weights to probabilities, as predict_proba does
+            leaf_values = []
+            for tree in trees:
+                value = tree.value[:, 0, :].astype(np.float64)
+                totals = value.sum(axis=1, keepdims=True)
+                leaf_values.append(value / np.where(totals == 0, 1.0, totals))
+            init_raw = 0.0
+
+        arrays = _flatten_trees(trees, leaf_values)
+        meta = {
+            'kind': kind,
+            'classes': model.classes_.tolist(),
+            'n_features': int(model.n_features_in_),
+            'n_trees': len(trees),
+            'max_depth': int(max(tree.max_depth for tree in trees)),
+            'init_raw': init_raw,
+            'negative_rate': negative_rate,
+            'feature_names': [str(name) for name in getattr(model, 'feature_names_in_', [])]
+        }
+        logger.info(f"Compiled {kind} with {meta['n_trees']} trees and {len(arrays['feature'])} nodes.")
+        return cls(arrays, meta, estimator=estimator)
+
+    def save(self, output_dir):
+        """
+        Save the node arrays as .npy files plus a JSON metadata file.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        for name in NODE_ARRAYS:
+            np.save(os.path.join(output_dir, f"{name}.npy"), np.ascontiguousarray(self.arrays[name]))
+        with open(os.path.join(output_dir, META_FILE), 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        logger.info(f"Compiled model saved to {output_dir}")
+
+    @classmethod
+    def load(cls, model_dir, mmap_mode='r', estimator_path=None):
+        """
+        Load a compiled model; node arrays are memory-mapped and shared between processes.
+        estimator_path is the pickled estimator that scores inputs over MAX_COMPILED_ROWS rows.
+        """
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mmap_mode) for name in NODE_ARRAYS}
+        return cls(arrays, meta, estimator_path=estimator_path)
+
+    def _large_input_estimator(self, X):
+        """
+        The estimator to score X with instead, when X has more than MAX_COMPILED_ROWS rows.
+        """
+        if self._n_rows(X) <= MAX_COMPILED_ROWS:
+            return None
+        if self.estimator is None and self.estimator_path:
+            import joblib
+            self.estimator = joblib.load(self.estimator_path)
+        return self.estimator
+
+    def _walk(self, X):
+        """
+        Leaf indices of a few rows, following each row down each tree in plain Python.
+        """
+        if self._node_lists is None:
+            # float32 values converted to Python floats compare exactly as in float32
+            self._node_lists = (self.feature.tolist(), self.threshold32.tolist(), self.children.tolist(),
+                                self.missing_left.tolist(), self.is_leaf.tolist(), self.roots.tolist())
+        feature, threshold, children, missing_left, is_leaf, roots = self._node_lists
+        leaves = []
+        for row in X.tolist():
+            row_leaves = []
+            for node in roots:
+                while not is_leaf[node]:
+                    value = row[feature[node]]
+                    go_left = value <= threshold[node] or (value != value and missing_left[node])
+                    node = children[2 * node + (not go_left)]
+                row_leaves.append(node)
+            leaves.append(row_leaves)
+        return np.array(leaves, dtype=np.int64).reshape(len(leaves), len(roots))
+
+    def apply(self, X):
+        """
+        Return the leaf index reached in every tree, shape (n_rows, n_trees).
+        Each level advances only the (row, tree) pairs that have not reached a leaf yet,
+        so the work is the total path length rather than rows x trees x max depth.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        if n_rows * n_trees * max(self.meta['max_depth'], 1) <= MAX_WALK_STEPS:
+            return self._walk(X)
+        flat_X = np.ascontiguousarray(X).ravel()
+        has_missing = np.isnan(flat_X).any()
+
+        # Pairs are laid out tree-major so consecutive pairs read the same tree's nodes
+        nodes = np.repeat(np.asarray(self.roots), n_rows)
+        pending = np.flatnonzero(~self.is_leaf[nodes])
+        current = nodes[pending]
+        offsets = (pending % n_rows) * n_features
+        while pending.size:
+            values = flat_X[offsets + self.feature[current]]
+            go_left = values <= self.threshold32[current]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[current]
+            current = self.children[2 * current + ~go_left]
+            reached = self.is_leaf[current]
+            if reached.any():
+                nodes[pending[reached]] = current[reached]
+                keep = ~reached
+                pending, current, offsets = pending[keep], current[keep], offsets[keep]
+        return nodes.reshape(n_trees, n_rows).T
+
+    def _leaf_scores(self, X, block_size):
+        """
+        Yield (row slice, leaf values reduced over trees) for row blocks of X, bounding the
+        (rows x trees) working set.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        block_size = max(block_size // max(len(self.roots), 1), 64)
+        boosted = self.meta['kind'] == 'GradientBoostingClassifier'
+        for start in range(0, X.shape[0], block_size):
+            leaves = self.apply(X[start:start + block_size])
+            # Add the trees one at a time from the first, as sklearn does; a pairwise sum
+            # rounds differently
+            total = np.full(len(leaves), self.meta['init_raw']) if boosted else np.zeros((len(leaves),) + self.value.shape[1:])
+            for tree_leaves in leaves.T:
+                total += self.value[tree_leaves]
+            if not boosted:
+                total /= leaves.shape[1]
+            yield slice(start, start + block_size), total
+
+    def _n_rows(self, X):
+        return 1 if np.ndim(X) == 1 else len(X)
+
+    def decision_function(self, X, block_size=65536):
+        """
+        Raw boosting score; only defined for compiled GradientBoostingClassifier models.
+        """
+        if self.meta['kind'] != 'GradientBoostingClassifier':
+            raise DataModellingException("decision_function is only available for gradient boosting models.")
+        estimator = self._large_input_estimator(X)
+        if estimator is not None:
+            # A prior correction does not change the raw score
+            return getattr(estimator, 'model', estimator).decision_function(X)
+        out = np.empty(self._n_rows(X), dtype=np.float64)
+        for rows, raw in self._leaf_scores(X, block_size):
+            out[rows] = raw
+        return out
+
+    def predict_proba(self, X, block_size=65536):
+        """
+        Class probabilities, matching the compiled model's predict_proba.
+        """
+        estimator = self._large_input_estimator(X)
+        if estimator is not None:
+            return estimator.predict_proba(X)
+        if self.meta['kind'] == 'GradientBoostingClassifier':
+            # sklearn maps raw scores to probabilities with scipy's expit
+            from scipy.special import expit
+            positive = expit(self.decision_function(X, block_size))
+            out = np.column_stack([1.0 - positive, positive])
+        else:
+            out = np.empty((self._n_rows(X), len(self.classes_)), dtype=np.float64)
+            for rows, proba in self._leaf_scores(X, block_size):
+                out[rows] = proba
+
+        rate = self.meta.get('negative_rate')
+        if rate:
+            positive = rate * out[:, 1] / (rate * out[:, 1] + 1.0 - out[:, 1])
+            out = np.column_stack([1.0 - positive, positive])
+        return out
+
+    def predict(self, X):
+        estimator = self._large_input_estimator(X)
+        if estimator is not None:
+            return estimator.predict(X)
+        if self.meta.get('negative_rate'):
+            return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+        if self.meta['kind'] == 'GradientBoostingClassifier':
+            return self.classes_[(self.decision_function(X) >= 0).astype(int)]
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,335 @@
+import numpy as np
+import pandas as pd
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+from src.logger import get_logger
+from src.exception import FeatureEngineeringException
+
+logger = get_logger(__name__)
+
+
+class VelocityStateStore:
+    def __init__(self, window, capacity=1024):
+        """
+        Array-backed per-account state for sliding-window aggregates over the last `window` steps.
+        Each account owns a slot holding one (count, amount) bucket per step of the window plus
+        running totals, so an update costs O(1) amortized regardless of account history.
+        Accounts whose window has emptied are evicted when the store runs out of slots.
+        Events arriving after their account has moved a full window past their step are
+        counted in late_events and ignored.
+        """
+        self.window = int(window)
+        self.slots = {}
+        self.accounts = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        self.bucket_steps = np.full((capacity, self.window), -1, dtype=np.int64)
+        self.bucket_counts = np.zeros((capacity, self.window), dtype=np.int64)
+        self.bucket_sums = np.zeros((capacity, self.window), dtype=np.float64)
+        self.total_counts = np.zeros(capacity, dtype=np.int64)
+        self.total_sums = np.zeros(capacity, dtype=np.float64)
+        self.last_steps = np.full(capacity, -1, dtype=np.int64)
+        self.current_step = -1
+        self.late_events = 0
+
+    def __setstate__(self, state):
+        # Stores pickled before late events were counted
+        state.setdefault('late_events', 0)
+        self.__dict__.update(state)
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def capacity(self):
+        return len(self.accounts)
+
+    def _grow(self):
+        old = self.capacity
+        new = old * 2
+        self.accounts.extend([None] * old)
+        self.free.extend(range(new - 1, old - 1, -1))
+        self.bucket_steps = np.vstack([self.bucket_steps, np.full((old, self.window), -1, dtype=np.int64)])
+        self.bucket_counts = np.vstack([self.bucket_counts, np.zeros((old, self.window), dtype=np.int64)])
+        self.bucket_sums = np.vstack([self.bucket_sums, np.zeros((old, self.window), dtype=np.float64)])
+        self.total_counts = np.concatenate([self.total_counts, np.zeros(old, dtype=np.int64)])
+        self.total_sums = np.concatenate([self.total_sums, np.zeros(old, dtype=np.float64)])
+        self.last_steps = np.concatenate([self.last_steps, np.full(old, -1, dtype=np.int64)])
+        logger.info(f"Velocity state store grown to {new} slots.")
+
+    def evict_idle(self, current_step=None):
+        """
+        Release the slots of accounts with no event inside the window ending at current_step.
+        Their aggregates are all zero, so eviction loses no information.
+        """
+        current_step = self.current_step if current_step is None else current_step
+        idle = np.flatnonzero((self.last_steps >= 0) & (self.last_steps <= current_step - self.window))
+        for slot in idle:
+            del self.slots[self.accounts[slot]]
+            self.accounts[slot] = None
+            self.free.append(slot)
+        self.bucket_steps[idle] = -1
+        self.bucket_counts[idle] = 0
+        self.bucket_sums[idle] = 0.0
+        self.total_counts[idle] = 0
+        self.total_sums[idle] = 0.0
+        self.last_steps[idle] = -1
+        return len(idle)
+
+    def _slot(self, account):
+        slot = self.slots.get(account)
+        if slot is None:
+            if not self.free and not self.evict_idle():
+                self._grow()
+            slot = self.free.pop()
+            self.slots[account] = slot
+            self.accounts[slot] = account
+        return slot
+
+    def _expire(self, slot, step):
+        last = self.last_steps[slot]
+        if last < 0:
+            return
+        if step - last >= self.window:
+            # Every bucket has left the window
+            self.bucket_steps[slot] = -1
+            self.bucket_counts[slot] = 0
+            self.bucket_sums[slot] = 0.0
+            self.total_counts[slot] = 0
+            self.total_sums[slot] = 0.0
+            return
+        # Only buckets for steps in (last - window, step - window] can have left the window
+        first = max(last - self.window + 1, 0)
+        for expired_step in range(first, step - self.window + 1):
+            bucket = expired_step % self.window
+            if self.bucket_steps[slot, bucket] == expired_step:
+                self.total_counts[slot] -= self.bucket_counts[slot, bucket]
+                self.total_sums[slot] -= self.bucket_sums[slot, bucket]
+                self.bucket_steps[slot, bucket] = -1
+                self.bucket_counts[slot, bucket] = 0
+                self.bucket_sums[slot, bucket] = 0.0
+
+    def update(self, account, step, amount):
+        """
+        Return the (count, amount sum) of the account's earlier events within the window
+        ending at `step`, then add the current event to its state. An event older than the
+        account's latest step only counts the buckets still held up to its own step; one older than
+        the whole window returns zeros and leaves the state unchanged.
+        """
+        slot = self.slots.get(account)
+        last = -1 if slot is None else self.last_steps[slot]
+        if last >= 0 and step <= last - self.window:
+            self.late_events += 1
+            return 0, 0.0
+        slot = self._slot(account)
+        if step < last:
+            earlier = (self.bucket_steps[slot] >= 0) & (self.bucket_steps[slot] <= step)
+            count, amount_sum = int(self.bucket_counts[slot, earlier].sum()), float(self.bucket_sums[slot, earlier].sum())
+        else:
+            self._expire(slot, step)
+            count, amount_sum = int(self.total_counts[slot]), float(self.total_sums[slot])
+
+        bucket = step % self.window
+        if self.bucket_steps[slot, bucket] != step:
+            self.total_counts[slot] -= self.bucket_counts[slot, bucket]
+            self.total_sums[slot] -= self.bucket_sums[slot, bucket]
+            self.bucket_steps[slot, bucket] = step
+            self.bucket_counts[slot, bucket] = 0
+            self.bucket_sums[slot, bucket] = 0.0
+        self.bucket_counts[slot, bucket] += 1
+        self.bucket_sums[slot, bucket] += amount
+        self.total_counts[slot] += 1
+        self.total_sums[slot] += amount
+        self.last_steps[slot] = max(self.last_steps[slot], step)
+        self.current_step = max(self.current_step, step)
+        return count, amount_sum
+
+    def load_history(self, accounts, steps, amounts, counts=None):
+        """
+        Add historical events to the store so streaming continues where a batch left off.
+        counts gives the number of events each row stands for (one when omitted), as in the
+        rows of state_history(). Only the (account, step) buckets still inside the window of
+        the latest step are kept; the events should not precede the store's current state.
+        """
+        history = pd.DataFrame({'account': accounts, 'step': steps, 'amount': amounts,
+                                'count': 1 if counts is None else counts}).dropna(subset=['account'])
+        if history.empty:
+            return
+        latest = max(int(history['step'].max()), self.current_step)
+        history = history[history['step'] > latest - self.window]
+        buckets = history.groupby(['account', 'step'], sort=True).agg(count=('count', 'sum'), amount=('amount', 'sum')).reset_index()
+        for account, step, count, amount_sum in buckets.itertuples(index=False):
+            slot = self._slot(account)
+            self._expire(slot, step)
+            bucket = step % self.window
+            if self.bucket_steps[slot, bucket] != step:
+                self.total_counts[slot] -= self.bucket_counts[slot, bucket]
+                self.total_sums[slot] -= self.bucket_sums[slot, bucket]
+                self.bucket_steps[slot, bucket] = step
+                self.bucket_counts[slot, bucket] = 0
+                self.bucket_sums[slot, bucket] = 0.0
+            self.bucket_counts[slot, bucket] += count
+            self.bucket_sums[slot, bucket] += amount_sum
+            self.total_counts[slot] += count
+            self.total_sums[slot] += amount_sum
+            self.last_steps[slot] = max(self.last_steps[slot], step)
+        self.current_step = latest
+
+    def state_history(self):
+        """
+        The buckets inside the window of the current step as a DataFrame of account, step,
+        count and amount (sum) rows, one per (account, step).
+        """
+        slots, buckets = np.nonzero((self.bucket_steps >= 0) & (self.bucket_steps > self.current_step - self.window))
+        accounts = np.asarray(self.accounts, dtype=object)
+        return pd.DataFrame({'account': accounts[slots], 'step': self.bucket_steps[slots, buckets],
+                             'count': self.bucket_counts[slots, buckets], 'amount': self.bucket_sums[slots, buckets]})
+
+
+class VelocityFeatures:
+    """
+    Per-account velocity features: the number and total amount of an account's earlier
+    transactions within the last `window` steps, for both the originating and destination
+    account. Batch and streaming modes produce identical values for step-ordered input.
+    compute_batch only sees the events it is given: pass state_history() as its history to
+    continue from the streaming state.
+    """
+    ACCOUNT_COLUMNS = {'nameOrig': 'orig', 'nameDest': 'dest'}
+
+    def __init__(self, window=24, capacity=1024):
+        self.window = int(window)
+        self.capacity = capacity
+        self.stores = {column: VelocityStateStore(self.window, capacity) for column in self.ACCOUNT_COLUMNS}
+        self.feature_names = []
+        for prefix in self.ACCOUNT_COLUMNS.values():
+            self.feature_names += [f"{prefix}_txn_count_{self.window}", f"{prefix}_amount_sum_{self.window}"]
+
+    @property
+    def history_columns(self):
+        return ['step', 'amount', *self.ACCOUNT_COLUMNS]
+
+    def trim_history(self, events):
+        """
+        Keep the rows of an event DataFrame whose step is inside the window of its latest step,
+        i.e. the history a following batch of step-ordered events needs (see compute_batch).
+        """
+        steps = pd.to_numeric(events['step'], errors='coerce')
+        if steps.isna().all():
+            return events.iloc[:0]
+        return events[(steps > steps.max() - self.window).to_numpy()]
+
+    def compute_batch(self, data, history=None):
+        """
+        Vectorized batch computation over a DataFrame with 'step', 'amount' and account columns.
+        Rows are stably sorted by (account, step); a cumulative sum and a searchsorted lower
+        bound then give every row's window aggregates in O(n log n) without a Python loop.
+        history holds events preceding the batch, e.g. the trim_history() tail of the previous
+        chunk of a file: they count towards the windows of the batch rows but get no output
+        row, so chunk by chunk computation matches one pass over the whole file. A 'count'
+        column in history, as in state_history(), weights its rows.
+        """
+        try:
+            logger.info(f"Computing velocity features over a {self.window}-step window...")
+            index = data.index
+            n_history = 0 if history is None else len(history)
+            weights = np.ones(n_history + len(data), dtype=np.int64)
+            if n_history:
+                if 'count' in history:
+                    weights[:n_history] = history['count'].fillna(1).to_numpy(dtype=np.int64)
+                data = pd.concat([history[self.history_columns], data[self.history_columns]], ignore_index=True)
+            steps, no_step = self._steps(data)
+            amounts = pd.to_numeric(data['amount'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+            n_rows = len(data)
+            features = {}
+
+            for column, prefix in self.ACCOUNT_COLUMNS.items():
+                codes, _ = pd.factorize(data[column])
+                # Rows without a step join the missing-account group, which gets no features
+                codes[no_step] = -1
+                order = np.lexsort((steps, codes))
+                sorted_codes, sorted_steps, sorted_amounts = codes[order], steps[order], amounts[order]
+
+                if n_rows:
+                    low = sorted_steps.min()
+                    span = int(sorted_steps.max() - low) + self.window + 1
+                    keys = sorted_codes.astype(np.int64) * span + (sorted_steps - low)
+                else:
+                    keys = np.zeros(0, dtype=np.int64)
+                positions = np.arange(n_rows)
+                first = np.searchsorted(keys, keys - self.window + 1, side='left')
+                cumulative = np.concatenate([[0.0], np.cumsum(sorted_amounts)])
+                cumulative_counts = np.concatenate([[0], np.cumsum(weights[order])])
+
+                counts = np.empty(n_rows, dtype=np.int64)
+                sums = np.empty(n_rows, dtype=np.float64)
+                counts[order] = cumulative_counts[positions] - cumulative_counts[first]
+                sums[order] = cumulative[positions] - cumulative[first]
+                missing = codes < 0
+                counts[missing] = 0
+                sums[missing] = 0.0
+
+                features[f"{prefix}_txn_count_{self.window}"] = counts
+                features[f"{prefix}_amount_sum_{self.window}"] = sums
+
+            return pd.DataFrame({name: values[n_history:] for name, values in features.items()}, index=index)[self.feature_names]
+
+        except Exception as e:
+            logger.error(f"Error in computing velocity features: {str(e)}")
+            raise FeatureEngineeringException("Failed to compute velocity features.", errors=e)
+
+    def state_history(self):
+        """
+        The streaming state as weighted history rows for compute_batch: the history columns
+        plus a 'count' column, with the other account column empty on each row.
+        """
+        frames = []
+        for column, store in self.stores.items():
+            buckets = store.state_history()
+            frame = pd.DataFrame({'step': buckets['step'], 'amount': buckets['amount'], 'count': buckets['count']})
+            for other in self.ACCOUNT_COLUMNS:
+                frame[other] = buckets['account'] if other == column else None
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)[[*self.history_columns, 'count']]
+
+    @staticmethod
+    def _steps(data):
+        """
+        Steps as int64 (0 where missing) and the mask of rows without a step.
+        """
+        steps = pd.to_numeric(data['step'], errors='coerce')
+        no_step = steps.isna().to_numpy()
+        return steps.fillna(0).to_numpy(dtype=np.int64), no_step
+
+    def update(self, record):
+        """
+        Streaming mode: return the velocity features of one transaction dict as a NumPy array
+        and fold it into the per-account state. Records without a step get zero features.
+        """
+        features = np.zeros(len(self.feature_names), dtype=np.float64)
+        step = record.get('step')
+        if step is None or step != step:
+            return features
+        step = int(step)
+        amount = record.get('amount')
+        amount = 0.0 if amount is None or amount != amount else float(amount)
+        for i, column in enumerate(self.ACCOUNT_COLUMNS):
+            account = record.get(column)
+            if account is None or account != account:
+                continue
+            features[2 * i], features[2 * i + 1] = self.stores[column].update(account, step, amount)
+        return features
+
+    def load_history(self, data):
+        """
+        Add a historical DataFrame, e.g. the training data or a scored batch, to the streaming
+        state. A 'count' column weights the rows as in compute_batch.
+        """
+        steps, no_step = self._steps(data)
+        amounts = pd.to_numeric(data['amount'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+        counts = data['count'].to_numpy(dtype=np.int64) if 'count' in data else None
+        for column, store in self.stores.items():
+            accounts = data[column].to_numpy(dtype=object)
+            accounts[no_step] = None
+            store.load_history(accounts, steps, amounts, counts=counts)
+        logger.info(f"Velocity state seeded with {sum(len(store) for store in self.stores.values())} active accounts.")
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import joblib
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src import batch_scoring
+from src.batch_scoring import BatchScorer
+from src.data_modelling import create_model
+from src.feature_engineering import FeatureTransformer
+from src.synthetic_data import SyntheticTransactionGenerator
+
+
+def fitted_model(tmp_path, data):
+    transformer = FeatureTransformer().fit(data)
+    model = create_model('Decision Tree Classifier').fit(transformer.transform(data), data['isFraud'])
+    model_path = str(tmp_path / 'model.pkl')
+    joblib.dump(model, model_path)
+    transformer.save(FeatureTransformer.path_for_model(model_path))
+    return model_path
+
+
+def test_resume_skips_rows_in_bounded_chunks(tmp_path):
+    input_path = tmp_path / 'input.csv'
+    SyntheticTransactionGenerator(seed=3).write_csv(str(input_path), 1000)
+    scorer = BatchScorer(str(tmp_path / 'unused.pkl'), chunksize=300)
+
+    chunks = list(scorer._read_chunks(str(input_path), 450))
+    assert [len(chunk) for chunk in chunks] == [150, 300, 100]
+    assert chunks[0].index[0] == 450 and chunks[-1].index[-1] == 999
+    expected = pd.read_csv(input_path).iloc[450:]
+    pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+
+def test_rewritten_input_does_not_resume_a_stale_checkpoint(tmp_path, monkeypatch):
+    data = SyntheticTransactionGenerator(seed=3).generate(600)
+    model_path = fitted_model(tmp_path, data)
+    input_path, output_path = str(tmp_path / 'input.csv'), str(tmp_path / 'scores.csv')
+    scorer = BatchScorer(model_path, chunksize=200, n_workers=1)
+
+    # Keep the checkpoint of a finished run, as if it had been interrupted after the last chunk
+    monkeypatch.setattr(batch_scoring.os, 'remove', lambda path: None)
+    data.iloc[:300].to_csv(input_path, index=False)
+    scorer.score_file(input_path, output_path)
+    data.to_csv(input_path, index=False)
+    assert scorer.score_file(input_path, output_path) == 600
+    assert len(pd.read_csv(output_path)) == 600
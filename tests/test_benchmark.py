@@ -0,0 +1,30 @@
+import sys
+
+sys.path.append('../fraud_detection_system')
+
+from src.benchmark import BenchmarkSuite, compare_results
+from src.synthetic_data import SyntheticTransactionGenerator
+
+
+def stage(rows_per_s, spread, peak_rss_mb=100.0):
+    return {'rows_per_s': rows_per_s, 'peak_rss_mb': peak_rss_mb,
+            'spread': {'rows_per_s': spread, 'peak_rss_mb': 0.0}}
+
+
+def test_changes_within_the_run_to_run_spread_are_not_regressions():
+    baseline = {'stages': {'fit': stage(1000.0, 0.02), 'predict': stage(1000.0, 0.1)}}
+    results = {'fit': stage(800.0, 0.02), 'predict': stage(800.0, 0.1, peak_rss_mb=120.0)}
+
+    regressions = compare_results(results, baseline, tolerance=0.1)
+    assert [(regression['stage'], regression['metric']) for regression in regressions] == [('fit', 'rows_per_s')]
+    assert regressions[0]['allowed'] == 0.1
+
+
+def test_suite_times_the_feature_engineering_stages(tmp_path):
+    data_path = str(tmp_path / 'data.csv')
+    SyntheticTransactionGenerator(seed=2).write_csv(data_path, 500)
+    results = BenchmarkSuite(rows=500, data_path=data_path, repeats=2, latency_samples=5).run()
+
+    assert {'create_features', 'encode', 'fit_transformer', 'transform'} <= set(results)
+    assert results['create_features']['runs'] == 2
+    assert set(results['encode']['spread']) == {'rows_per_s', 'peak_rss_mb'}
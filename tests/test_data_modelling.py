@@ -0,0 +1,88 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append('../fraud_detection_system')
+
+from src.data_modelling import DataModelling, PriorCorrectedClassifier, downsample_negatives
+from src.exception import DataModellingException
+from src.model_registry import ModelRegistry
+
+
+def splits(n_rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, 5)), columns=[f"f{i}" for i in range(5)])
+    y = (X['f0'] + rng.normal(scale=0.5, size=n_rows) > 1).astype(int)
+    half = n_rows // 2
+    return X.iloc[:half], X.iloc[half:], y.iloc[:half], y.iloc[half:]
+
+
+def test_parallel_training_reports_timed_out_models_as_failures():
+    modelling = DataModelling({'Slow Forest': RandomForestClassifier(n_estimators=20000, n_jobs=1, random_state=0),
+                               'Decision Tree': DecisionTreeClassifier(random_state=0)})
+    start = time.monotonic()
+    with pytest.raises(DataModellingException) as error:
+        modelling.train_in_parallel(*splits(), n_workers=2, cpu_budget=2, timeout=1)
+
+    assert time.monotonic() - start < 30
+    assert list(error.value.errors) == ['Slow Forest']
+    assert 'timeout' in error.value.errors['Slow Forest']
+    assert list(modelling.results) == ['Decision Tree']
+
+
+def registered_forest(tmp_path):
+    X_train, X_test, y_train, y_test = splits()
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X_train, y_train)
+    registry.register('fraud_detection', model, promote=True)
+    return registry, X_test, y_test
+
+
+def test_an_update_that_keeps_the_score_is_promoted(tmp_path):
+    registry, X, y = registered_forest(tmp_path)
+    result = DataModelling().update_registered_model(registry, 'fraud_detection', X, y, max_degradation=0.05)
+
+    assert (result['version'], result['parent_version'], result['promoted']) == (2, 1, True)
+    assert registry.production_version('fraud_detection') == 2
+    assert registry.metadata('fraud_detection', 2)['parent_version'] == 1
+    assert len(registry.load('fraud_detection').model.estimators_) == 20
+
+
+def test_an_update_that_degrades_the_score_is_registered_but_not_promoted(tmp_path):
+    registry, X, y = registered_forest(tmp_path)
+    # Trees fitted on flipped labels outvote the original ones
+    result = DataModelling().update_registered_model(registry, 'fraud_detection', X, 1 - y, validation_data=(X, y),
+                                                     max_degradation=0.0, n_new_estimators=30)
+
+    assert result['score_after'] < result['score_before']
+    assert (result['version'], result['parent_version'], result['promoted']) == (2, 1, False)
+    assert registry.production_version('fraud_detection') == 1
+    assert registry.metadata('fraud_detection', 2)['metrics']['validation']['passed'] is False
+
+
+def test_downsampling_keeps_positives_and_the_rate_within_each_stratum():
+    y = pd.Series(np.r_[np.zeros(800), np.zeros(200), np.ones(50)].astype(int))
+    X = pd.DataFrame({'type': ['CASH_OUT'] * 800 + ['TRANSFER'] * 200 + ['CASH_OUT'] * 50, 'amount': np.arange(1050.0)})
+    X_sampled, y_sampled, rate = downsample_negatives(X, y, 0.1, strata='type')
+
+    assert rate == 0.1
+    assert y_sampled.sum() == 50
+    assert X_sampled[y_sampled == 0]['type'].value_counts().to_dict() == {'CASH_OUT': 80, 'TRANSFER': 20}
+    assert X_sampled.index.is_monotonic_increasing and X_sampled.index.equals(y_sampled.index)
+
+
+def test_prior_correction_restores_the_full_data_fraud_rate():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200000, 1))
+    y = (rng.random(len(X)) < 1 / (1 + np.exp(-(2 * X[:, 0] - 4)))).astype(int)
+    X_sampled, y_sampled, rate = downsample_negatives(X, y, 0.05)
+    model = PriorCorrectedClassifier(LogisticRegression().fit(X_sampled, y_sampled), rate)
+
+    assert model.model.predict_proba(X)[:, 1].mean() > 3 * y.mean()
+    assert model.predict_proba(X)[:, 1].mean() == pytest.approx(y.mean(), rel=0.05)
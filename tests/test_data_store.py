@@ -0,0 +1,18 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.data_store import read_columnar, write_columnar
+
+
+def test_columnar_round_trip_keeps_index(tmp_path):
+    data = pd.DataFrame({'amount': np.arange(4.0), 'step': pd.array([1, None, 3, 4], dtype='Int32'),
+                         'type': pd.Categorical(['CASH_IN', 'DEBIT', 'CASH_IN', 'DEBIT'])},
+                        index=pd.Index([10, 3, 7, 8], name='row'))
+    for frame in (data, data.reset_index(drop=True), data.iloc[[1, 3]]):
+        write_columnar(frame, tmp_path / 'artifact')
+        loaded = read_columnar(tmp_path / 'artifact', mmap_mode='c')
+        pd.testing.assert_frame_equal(loaded.copy(), frame, check_index_type=False, check_column_type=False)
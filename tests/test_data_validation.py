@@ -0,0 +1,53 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.data_validation import DataValidator, SortedRunKeySet
+
+
+def transactions(n, start=0):
+    return pd.DataFrame({'step': np.arange(start, start + n) + 1, 'amount': np.full(n, 10.0)})
+
+
+def test_key_set_ignores_empty_runs():
+    keys = SortedRunKeySet()
+    keys.add(np.array([], dtype=np.uint64))
+    keys.add(np.array([3, 7], dtype=np.uint64))
+    keys.add(np.array([], dtype=np.uint64))
+    assert len(keys) == 2
+    assert keys.contains(np.array([3, 5, 7], dtype=np.uint64)).tolist() == [True, False, True]
+
+
+def test_repeated_chunks_are_duplicates():
+    validator = DataValidator()
+    data = transactions(4)
+    for _ in range(3):
+        validator.validate_chunk(data)
+    report = validator.report()
+    assert report['rows'] == 12
+    assert report['duplicates'] == 8
+
+
+def test_empty_chunks():
+    validator = DataValidator()
+    validator.validate_chunk(transactions(0))
+    validator.validate_chunk(transactions(3))
+    validator.validate_chunk(transactions(0))
+    validator.validate_chunk(transactions(2, start=2))
+    report = validator.report()
+    assert report['rows'] == 5
+    assert report['chunks'] == 4
+    assert report['duplicates'] == 1
+
+
+def test_reset_forgets_seen_rows():
+    for validator in (DataValidator(), DataValidator(bloom_capacity=100)):
+        validator.validate_chunk(transactions(4))
+        validator.reset()
+        validator.validate_chunk(transactions(4))
+        report = validator.report()
+        assert report['rows'] == 4
+        assert report['duplicates'] == 0
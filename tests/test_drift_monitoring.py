@@ -0,0 +1,57 @@
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append('../fraud_detection_system')
+
+from src.drift_monitoring import PSI_ALERT, SCORE_FEATURE, DriftMonitor
+from src.synthetic_data import SyntheticTransactionGenerator
+
+
+def transactions(n_rows, seed):
+    data = SyntheticTransactionGenerator(seed=seed).generate(n_rows)
+    scores = np.random.default_rng(seed).beta(1, 20, size=n_rows)
+    return data, scores
+
+
+def test_only_shifted_columns_raise_alerts():
+    reference = DriftMonitor.fit(*transactions(5000, seed=0))
+    data, scores = transactions(5000, seed=1)
+
+    unshifted = reference.empty_like()
+    unshifted.update(data, scores)
+    report = unshifted.compare(reference)
+    assert report['alerts'] == []
+    assert all(stats['psi'] < 0.1 for stats in report['features'].values())
+
+    shifted = reference.empty_like()
+    data = data.assign(amount=data['amount'] * 5, type='TRANSFER')
+    shifted.update(data, np.minimum(scores * 10, 1.0))
+    report = shifted.compare(reference)
+    assert set(report['alerts']) == {'amount', 'type', SCORE_FEATURE}
+    assert report['features']['amount']['psi'] > PSI_ALERT
+    assert report['flagged_rate'] > report['reference_flagged_rate']
+
+
+def test_merged_worker_monitors_match_one_monitor_over_all_rows():
+    reference = DriftMonitor.fit(*transactions(2000, seed=0))
+    data, scores = transactions(1000, seed=1)
+    single = reference.empty_like()
+    single.update(data, scores)
+
+    # One worker scores whole chunks, the other serves records a few at a time; states travel as JSON
+    batch_worker, record_worker = reference.empty_like(), reference.empty_like()
+    batch_worker.update(data.iloc[:600], scores[:600])
+    records = data.iloc[600:].to_dict('records')
+    for start in range(0, len(records), 4):
+        record_worker.update_records(records[start:start + 4], scores[600 + start:600 + start + 4])
+    merged = DriftMonitor.from_dict(batch_worker.to_dict()).merge(DriftMonitor.from_dict(record_worker.to_dict()))
+
+    assert merged.flagged == single.flagged and merged.scored == single.scored == 1000
+    for name, sketch in single.sketches.items():
+        assert merged.sketches[name].count == sketch.count and merged.sketches[name].missing == sketch.missing
+        np.testing.assert_array_equal(merged.sketches[name].counts, sketch.counts)
+    merged_report, single_report = merged.compare(reference), single.compare(reference)
+    for name, stats in single_report['features'].items():
+        assert merged_report['features'][name]['psi'] == pytest.approx(stats['psi'])
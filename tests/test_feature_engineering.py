@@ -0,0 +1,35 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.feature_engineering import FeatureEngineering, FeatureTransformer
+from src.synthetic_data import SyntheticTransactionGenerator
+
+
+def test_fractional_median_fills_nullable_integer_column():
+    data = pd.DataFrame({'step': pd.array([1, 2, None, 3, 4], dtype='Int32'),
+                         'unusuallogin': pd.array([0, 1, None, 0, 1], dtype='Int8'),
+                         'amount': [1.0, np.nan, 3.0, 4.0, 5.0]})
+    filled = FeatureEngineering().check_and_handle_missing_values(data)
+
+    assert str(filled['step'].dtype) == 'Int32' and str(filled['unusuallogin'].dtype) == 'Int8'
+    assert filled['step'].tolist() == [1, 2, 2, 3, 4]
+    assert not filled.isna().any().any()
+    assert filled['amount'][1] == 3.5
+
+
+def test_transform_records_matches_transform():
+    data = SyntheticTransactionGenerator(seed=4).generate(300)
+    transformer = FeatureTransformer().fit(data)
+    data = data.astype({'amount': object, 'oldbalanceOrg': object})
+    data.loc[data.index[:3], 'amount'] = ['n/a', '125.5', None]
+    data.loc[data.index[3], 'oldbalanceOrg'] = np.nan
+    data.loc[data.index[4], 'type'] = None
+
+    expected = transformer.transform(data).to_numpy()
+    np.testing.assert_array_equal(transformer.transform_records(data.to_dict('records')), expected)
+    assert expected[0, transformer.numeric_columns.index('amount')] == transformer.medians_['amount']
+    assert expected[1, transformer.numeric_columns.index('amount')] == 125.5
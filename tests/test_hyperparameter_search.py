@@ -0,0 +1,47 @@
+import itertools
+import sys
+
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append('../fraud_detection_system')
+
+from src.hyperparameter_search import HyperparameterSearch
+
+SEARCH_SPACE = {"Decision Tree Classifier": {'max_depth': [1, 2, 4], 'min_samples_leaf': [1, 5, 25]}}
+
+
+def training_data(n_rows=900, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 4))
+    y = (X[:, 0] * X[:, 1] + X[:, 2] + rng.normal(scale=0.3, size=n_rows) > 0).astype(int)
+    return X, y
+
+
+def decision_tree_search(**options):
+    return HyperparameterSearch({"Decision Tree Classifier": DecisionTreeClassifier(random_state=0)},
+                                search_spaces=SEARCH_SPACE, n_candidates=9, eta=3, min_resource=100, **options)
+
+
+def test_best_third_of_each_rung_is_promoted_to_three_times_the_rows():
+    search = decision_tree_search()
+    best = search.search(*training_data())
+
+    rungs = [[entry for entry in search.history if entry['rung'] == rung] for rung in range(3)]
+    assert [len(entries) for entries in rungs] == [9, 3, 1]
+    assert [entries[0]['rows'] for entries in rungs] == [100, 300, 900]
+    for previous, promoted in zip(rungs, rungs[1:]):
+        top = sorted(previous, key=lambda entry: entry['score'], reverse=True)[:len(promoted)]
+        assert [entry['params'] for entry in promoted] == [entry['params'] for entry in top]
+    assert best["Decision Tree Classifier"][0] == rungs[2][0]['params']
+
+
+def test_search_stops_once_the_budget_is_spent():
+    search = decision_tree_search(budget_seconds=10)
+    # Every clock reading advances one second
+    search.clock = itertools.count().__next__
+    best = search.search(*training_data())
+
+    assert 0 < len(search.history) < 9
+    assert {entry['rung'] for entry in search.history} == {0}
+    assert best["Decision Tree Classifier"][2] == 100
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'check_import_time.py')
+
+
+def test_scoring_modules_import_within_budget():
+    # Shared test machines are slower and noisier than a workstation, so the budgets are doubled
+    result = subprocess.run([sys.executable, SCRIPT_PATH, '--repeats', '5', '--scale', '2'],
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout + result.stderr
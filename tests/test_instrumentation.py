@@ -0,0 +1,48 @@
+import sys
+import threading
+
+sys.path.append('../fraud_detection_system')
+
+from src.instrumentation import MetricsRegistry
+
+
+def stage_entry(registry, name):
+    return next(entry for entry in registry.snapshot()['stages'] if entry['stage'] == name)
+
+
+def test_captured_metrics_merge_into_the_parent_totals():
+    registry = MetricsRegistry()
+    with registry.stage('fit', rows=10):
+        pass
+    with registry.capture() as snapshot:
+        with registry.stage('fit', rows=5):
+            pass
+    assert stage_entry(registry, 'fit')['calls'] == 1
+
+    registry.merge(snapshot)
+    fit = stage_entry(registry, 'fit')
+    assert (fit['calls'], fit['rows']) == (2, 15)
+
+
+def test_concurrent_stages_are_left_out_of_memory_maxima():
+    registry = MetricsRegistry()
+    started, release = threading.Event(), threading.Event()
+
+    def background():
+        with registry.stage('background'):
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    started.wait(5)
+    with registry.stage('foreground'), registry.stage('nested'):
+        pass
+    release.set()
+    thread.join()
+
+    assert stage_entry(registry, 'foreground')['overlapped_calls'] == 1
+    assert stage_entry(registry, 'background')['overlapped_calls'] == 1
+    with registry.stage('alone'):
+        pass
+    assert stage_entry(registry, 'alone')['overlapped_calls'] == 0
@@ -0,0 +1,36 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+sys.path.append('../fraud_detection_system')
+
+from src.model_registry import ModelRegistry
+from src.synthetic_data import SyntheticTransactionGenerator
+
+PIPELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'pipeline.py')
+
+
+def load_pipeline():
+    spec = importlib.util.spec_from_file_location('pipeline', PIPELINE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_downsampled_pipeline_registers_once_per_rate(tmp_path, monkeypatch):
+    # The pipeline writes under ../fraud_detection_system relative to the working directory
+    (tmp_path / 'fraud_detection_system' / 'models').mkdir(parents=True)
+    (tmp_path / 'run').mkdir()
+    monkeypatch.chdir(tmp_path / 'run')
+    SyntheticTransactionGenerator(seed=1).write_csv('data.csv', 3000)
+    pipeline = load_pipeline()
+
+    for negative_rate in (0.2, 0.2, 0.5):
+        pipeline.run_pipeline('data.csv', 'model.pkl', models=['Decision Tree Classifier'], negative_rate=negative_rate)
+
+    registry = ModelRegistry()
+    assert registry.list_versions('fraud_detection') == [1, 2]
+    assert registry.metadata('fraud_detection', 1)['metrics']['negative_rate'] == pytest.approx(0.2, abs=0.01)
+    assert registry.metadata('fraud_detection', 2)['metrics']['negative_rate'] == pytest.approx(0.5, abs=0.01)
@@ -0,0 +1,80 @@
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append('../fraud_detection_system')
+
+from src.exception import InvalidRecordsException, ScoringException
+from src.scoring_service import MicroBatcher
+
+
+class AmountModel:
+    # Scores a transaction by its amount, which the transform passes through
+    def predict_proba(self, features):
+        scores = np.asarray(features, dtype=np.float64)[:, 0]
+        return np.column_stack([1.0 - scores, scores])
+
+
+class AmountTransform:
+    def transform_records(self, records):
+        return np.array([[float(record['amount'])] for record in records])
+
+
+class CappedAmountModel(AmountModel):
+    # Rejects any batch holding an amount above 1
+    def predict_proba(self, features):
+        if (np.asarray(features)[:, 0] > 1).any():
+            raise ValueError("amount out of range")
+        return super().predict_proba(features)
+
+
+def test_scores_come_with_the_threshold_of_their_model():
+    batcher = MicroBatcher(AmountModel(), AmountTransform(), max_wait_ms=1.0, threshold=0.5)
+    try:
+        scores, threshold = batcher.submit([{'amount': 0.7}]).result(timeout=5)
+        assert threshold == 0.5 and scores.tolist() == [0.7]
+        batcher.swap(AmountModel(), AmountTransform(), threshold=0.9)
+        scores, threshold = batcher.submit([{'amount': 0.7}]).result(timeout=5)
+        assert threshold == 0.9
+    finally:
+        batcher.stop()
+
+
+def test_a_full_batch_is_flushed_without_waiting():
+    batcher = MicroBatcher(AmountModel(), AmountTransform(), max_batch_size=3, max_wait_ms=10000.0)
+    try:
+        futures = [batcher.submit([{'amount': 0.1 * i}]) for i in range(1, 4)]
+        assert [future.result(timeout=5)[0].tolist() for future in futures] == [[0.1], [0.2], [pytest.approx(0.3)]]
+        assert batcher.batch_sizes.values().tolist() == [3.0]
+    finally:
+        batcher.stop()
+
+
+def test_a_partial_batch_is_flushed_after_max_wait():
+    batcher = MicroBatcher(AmountModel(), AmountTransform(), max_batch_size=100, max_wait_ms=20.0)
+    try:
+        scores, _ = batcher.submit([{'amount': 0.4}, {'amount': 0.6}]).result(timeout=5)
+        assert scores.tolist() == [0.4, 0.6]
+        assert batcher.batch_sizes.values().tolist() == [2.0]
+    finally:
+        batcher.stop()
+
+
+def test_failing_requests_do_not_fail_the_rest_of_their_batch():
+    batcher = MicroBatcher(CappedAmountModel(), AmountTransform(), max_batch_size=4, max_wait_ms=10000.0)
+    try:
+        good = batcher.submit([{'amount': 0.2}])
+        malformed = batcher.submit([{'amount': 'not a number'}])
+        rejected = batcher.submit([{'amount': 5.0}])
+        other = batcher.submit([{'amount': 0.3}])
+
+        assert good.result(timeout=5)[0].tolist() == [0.2]
+        assert other.result(timeout=5)[0].tolist() == [0.3]
+        with pytest.raises(InvalidRecordsException):
+            malformed.result(timeout=5)
+        with pytest.raises(ScoringException) as error:
+            rejected.result(timeout=5)
+        assert not isinstance(error.value, InvalidRecordsException)
+    finally:
+        batcher.stop()
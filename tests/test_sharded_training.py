@@ -0,0 +1,44 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+import pytest
+
+sys.path.append('../fraud_detection_system')
+
+from src.exception import DataModellingException
+from src.sharded_training import FOREST_FILE, ShardedForestTrainer, load_shard, shard_path, write_shards
+
+
+def training_data(n_rows=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 4))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=n_rows) > 1.5).astype(int)
+    return X, y
+
+
+def test_merged_forest_holds_every_sub_forest_tree(tmp_path):
+    X, y = training_data()
+    write_shards(X, y, str(tmp_path), 3, chunksize=500)
+    trainer = ShardedForestTrainer(str(tmp_path), n_estimators=10, model_params={'max_depth': 4})
+    merged = trainer.train(n_workers=2)
+
+    sub_forests = [joblib.load(os.path.join(shard_path(str(tmp_path), shard), FOREST_FILE)) for shard in range(3)]
+    assert [forest.n_estimators for forest in sub_forests] == [4, 3, 3]
+    assert merged.n_estimators == len(merged.estimators_) == 10
+    expected = np.mean([tree.predict_proba(X) for tree in merged.estimators_], axis=0)
+    np.testing.assert_allclose(merged.predict_proba(X), expected)
+    # Every shard gets its share of the fraud class
+    assert [load_shard(shard_path(str(tmp_path), shard))[1].sum() for shard in range(3)] == pytest.approx([y.sum() / 3] * 3, abs=1)
+
+
+def test_merge_waits_for_every_shard(tmp_path):
+    write_shards(*training_data(), str(tmp_path), 2)
+    trainer = ShardedForestTrainer(str(tmp_path), n_estimators=4)
+    assert trainer.run_worker(max_shards=1) == [0]
+
+    with pytest.raises(DataModellingException):
+        trainer.merge()
+    assert trainer.run_worker() == [1]
+    assert trainer.merge().n_estimators == 4
@@ -0,0 +1,50 @@
+import sys
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append('../fraud_detection_system')
+
+from src.tree_compiler import MAX_COMPILED_ROWS, CompiledTreeEnsemble
+
+
+def training_data(n_rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=n_rows) > 0.5).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize('model', [
+    DecisionTreeClassifier(random_state=0),
+    RandomForestClassifier(n_estimators=30, random_state=0),
+    GradientBoostingClassifier(n_estimators=50, random_state=0)
+])
+@pytest.mark.parametrize('n_rows', [1, 20, 500])
+def test_compiled_predictions_equal_sklearn(model, n_rows):
+    X, y = training_data()
+    model.fit(X, y)
+    X_new = training_data(n_rows, seed=1)[0]
+    # Without the estimator every size goes through the compiled traversal
+    full = CompiledTreeEnsemble.from_model(model)
+    compiled = CompiledTreeEnsemble(full.arrays, full.meta)
+
+    np.testing.assert_array_equal(compiled.predict_proba(X_new), model.predict_proba(X_new))
+    np.testing.assert_array_equal(compiled.predict(X_new), model.predict(X_new))
+
+
+def test_large_inputs_are_scored_by_the_estimator(tmp_path, monkeypatch):
+    X, y = training_data()
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    joblib.dump(model, tmp_path / 'model.pkl')
+    CompiledTreeEnsemble.from_model(model).save(str(tmp_path / 'compiled'))
+    compiled = CompiledTreeEnsemble.load(str(tmp_path / 'compiled'), estimator_path=str(tmp_path / 'model.pkl'))
+
+    np.testing.assert_array_equal(compiled.predict_proba(X[:MAX_COMPILED_ROWS]), model.predict_proba(X[:MAX_COMPILED_ROWS]))
+    assert compiled.estimator is None
+    monkeypatch.setattr(compiled, 'apply', lambda X: pytest.fail('large input walked the compiled trees'))
+    np.testing.assert_array_equal(compiled.predict_proba(X), model.predict_proba(X))
+    assert compiled.estimator is not None
@@ -0,0 +1,43 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append('../fraud_detection_system')
+
+from src.velocity_features import VelocityFeatures, VelocityStateStore
+
+
+def events(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'step': np.sort(rng.integers(0, 150, n)), 'amount': rng.random(n) * 100,
+                         'nameOrig': rng.choice([f"C{i}" for i in range(40)], n),
+                         'nameDest': rng.choice([f"M{i}" for i in range(40)], n)})
+
+
+def test_batch_continues_the_streaming_state():
+    data = events()
+    expected = VelocityFeatures(window=10).compute_batch(data).to_numpy()
+
+    velocity = VelocityFeatures(window=10)
+    velocity.load_history(data.iloc[:700])
+    velocity.load_history(data.iloc[700:1200])
+    batch = velocity.compute_batch(data.iloc[1200:], history=velocity.state_history()).to_numpy()
+    stream = np.array([velocity.update(record) for record in data.iloc[1200:].to_dict('records')])
+
+    np.testing.assert_allclose(batch, expected[1200:], atol=1e-6)
+    np.testing.assert_allclose(stream, expected[1200:], atol=1e-6)
+
+
+def test_out_of_order_events():
+    store = VelocityStateStore(window=10)
+    for step in (5, 12):
+        store.update('C1', step, 1.0)
+
+    # Within the window: only the buckets up to the event's own step count
+    assert store.update('C1', 6, 2.0) == (1, 1.0)
+    assert store.update('C1', 13, 1.0) == (3, 4.0)
+    # A full window behind the account's latest step: ignored
+    assert store.update('C1', 3, 5.0) == (0, 0.0)
+    assert store.late_events == 1
+    assert store.update('C1', 13, 1.0) == (4, 5.0)